@@ -1,10 +1,18 @@
 from flask_admin.contrib.sqla import ModelView
 from flask_admin import BaseView, expose
-from flask import redirect, url_for, request, flash, session, render_template
+from flask import redirect, url_for, request, flash, session, render_template, jsonify, Response, stream_with_context, current_app
 from extensions import db, admin
 from models import User, Collaborator, Service, Product, Sale, Expense, SaleItem
-from sqlalchemy import func
+from sqlalchemy import func, inspect
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
+import cache
+import events
+import instrumentation
+import replica
+from services import reports, balances, sales, stock, payroll, receipts, exports, importer, summary
 from datetime import datetime, timedelta
+import io
 
 
 class SecureModelView(ModelView):
@@ -41,7 +49,7 @@ class CollaboratorView(SecureModelView):
         return ''
     
     def _format_total_earnings(view, context, model, name):
-        total = sum(s.total_commission for s in model.sales)
+        total = model.total_earnings or 0.0
         return Markup(f'R$ {total:.2f}')
 
     column_formatters = {
@@ -50,6 +58,10 @@ class CollaboratorView(SecureModelView):
     }
 
     def on_model_change(self, form, model, is_created):
+        if not is_created and inspect(model).attrs.is_owner.history.has_changes():
+            # Past sales move between the team and the VIP totals
+            summary.rebuild_collaborator(model.id)
+
         if is_created and not model.token:
             import uuid
             model.token = str(uuid.uuid4())
@@ -133,13 +145,23 @@ class VipRoomView(SecureBaseView):
                 prod = Product.query.get(item_id)
                 item = SaleItem(sale=sale, product_id=prod.id, item_name=prod.name, price=price, commission=0.0)
                 db.session.add(item)
+                db.session.flush() # Get sale ID for the stock ledger
+                try:
+                    stock.take([(prod, 1)], sale_id=sale.id)
+                except stock.OutOfStock as e:
+                    db.session.rollback()
+                    flash(str(e), 'error')
+                    return redirect(url_for('vip.index'))
+
+            sales.register(sale, owner)
             
             db.session.commit()
             flash('Atendimento VIP registrado com sucesso!', 'success')
             return redirect(url_for('vip.index'))
 
         # Recent VIP Activity
-        recent_vip_sales = Sale.query.filter_by(collaborator_id=owner.id).order_by(Sale.date.desc()).limit(10).all()
+        recent_vip_sales = Sale.query.options(selectinload(Sale.items))\
+            .filter_by(collaborator_id=owner.id).order_by(Sale.date.desc()).limit(10).all()
         
         # VIP Stats (Today)
         now = datetime.now()
@@ -154,153 +176,107 @@ class VipRoomView(SecureBaseView):
                          recent=recent_vip_sales,
                          today_total=today_total)
 
+# Tables read by the cached aggregates of each screen (see cache.py)
+DASHBOARD_TABLES = ('sale', 'daily_summary', 'collaborator', 'expense', 'cash_advance', 'supplier', 'supplier_payment')
+FINANCIAL_TABLES = ('sale', 'daily_summary', 'collaborator')
+
 class DashboardView(SecureBaseView):
     @expose('/')
+    @replica.read_only
     def index(self):
         # Filter Logic
         period = request.args.get('period', 'month')
-        now = datetime.now()
-        start_date = None
-        
-        if period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif period == 'week':
-             start_date = now - timedelta(days=7)
-        elif period == 'month':
-            start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        # Base Queries
-        sales_query = Sale.query
-        expenses_query = Expense.query
-        
-        if start_date:
-            sales_query = sales_query.filter(Sale.date >= start_date)
-            expenses_query = expenses_query.filter(Expense.date >= start_date.date())
 
-        sales = sales_query.all()
-        expenses = expenses_query.all()
-        
-        # Split Sales into VIP and Team
-        # We need to check is_owner for each sale's collaborator
-        # Ideally we join, but python loop is fine for MVP size
-        vip_sales = [s for s in sales if s.collaborator.is_owner]
-        team_sales = [s for s in sales if not s.collaborator.is_owner]
-
-        # 1. KPIs
-        vip_revenue = sum(s.total_amount for s in vip_sales)
-        team_revenue = sum(s.total_amount for s in team_sales)
+        # KPIs and reports: cached until a sale, expense, advance or supplier payment is written
+        key = (period if period in reports.PERIODS else 'all', datetime.now().date(), replica.in_use(db))
+        data = cache.fetch('dashboard', key, DASHBOARD_TABLES, lambda: self._aggregates(period))
+
+        # Recent appointments
+        recent_sales = Sale.query.options(joinedload(Sale.collaborator), selectinload(Sale.items))\
+            .order_by(Sale.date.desc()).limit(10).all()
+
+        return self.render('admin/dashboard.html', period=period, recent_sales=recent_sales, **data)
+
+    def _aggregates(self, period):
+        start_date = reports.period_start(period)
+
+        # 1. KPIs (aggregated in the database, split into VIP and Team)
+        totals = reports.sales_totals(start_date)
+        vip_revenue = totals['vip']['revenue']
+        team_revenue = totals['team']['revenue']
         total_revenue = vip_revenue + team_revenue
-        
-        total_expenses = sum(e.amount for e in expenses)
-        
+
+        total_expenses = reports.expenses_total(start_date.date() if start_date else None)
+
         # Commissions (Only from Team)
-        total_commissions = sum(s.total_commission for s in team_sales)
-        
-        total_services = len(sales)
+        total_commissions = totals['team']['commission']
+
+        total_services = totals['vip']['count'] + totals['team']['count']
 
         # Net Profit = (Team Rev - Team Comm) + VIP Rev - Expenses
         # Or simply Total Rev - Total Comm - Expenses
         net_profit = total_revenue - total_expenses - total_commissions
-        
-        # 2. Detailed Commission Stats (Team Only)
-        collab_stats = []
-        collabs = Collaborator.query.filter_by(is_owner=False).all() # Only regular staff
-        
-        for c in collabs:
-            c_sales = [s for s in team_sales if s.collaborator_id == c.id]
-            gross_revenue = sum(s.total_amount for s in c_sales)
-            comm_generated = sum(s.total_commission for s in c_sales)
-            
-            if gross_revenue > 0:
-                collab_stats.append({
-                    'name': c.name,
-                    'gross_revenue': gross_revenue,
-                    'commission_percent': c.commission_percent,
-                    'commission_generated': comm_generated
-                })
 
-        # Recent appointments
-        recent_sales = Sale.query.order_by(Sale.date.desc()).limit(10).all()
+        # 2. Detailed Commission Stats (Team Only)
+        collab_stats = reports.collaborator_stats(start_date)
 
         # Chart Data (Last 7 Days)
-        dates = [datetime.now().date() - timedelta(days=i) for i in range(6, -1, -1)]
-        daily_labels = [d.strftime('%d/%m') for d in dates]
-        daily_values = []
-        
-        for d in dates:
-             # Sum sales for this specific day
-             day_total = db.session.query(func.sum(Sale.total_amount))\
-                .filter(func.date(Sale.date) == d).scalar() or 0.0
-             daily_values.append(day_total)
+        series = reports.revenue_series(7)
+        daily_labels = [d.strftime('%d/%m') for d, _ in series]
+        daily_values = [total for _, total in series]
 
         # Suppliers Debt
         from models import Supplier
-        suppliers = Supplier.query.all()
-        total_supplier_debt = sum(s.current_balance for s in suppliers)
+        total_supplier_debt = db.session.query(func.coalesce(func.sum(Supplier.current_balance), 0.0)).scalar() or 0.0
 
         # 3. Monthly Financial Report (Full History)
-        all_sales = Sale.query.all()
-        all_expenses = Expense.query.all()
-        monthly_report = self._calculate_monthly_finance(all_sales, all_expenses)
-        report_7_days = self._calculate_last_7_days(all_sales, all_expenses)
-
-        return self.render('admin/dashboard.html', 
-                         period=period,
-                         total_revenue=total_revenue,
-                         vip_revenue=vip_revenue,
-                         team_revenue=team_revenue,
-                         total_expenses=total_expenses, 
-                         total_commissions=total_commissions,
-                         total_services=total_services,
-                         net_profit=net_profit,
-                         collab_stats=collab_stats,
-                         recent_sales=recent_sales,
-                         daily_labels=daily_labels,
-                         daily_values=daily_values,
-                         monthly_report=monthly_report,
-                         report_7_days=report_7_days,
-                         total_supplier_debt=total_supplier_debt)
-
-    def _calculate_last_7_days(self, sales, expenses):
-        now = datetime.now()
-        seven_days_ago = now - timedelta(days=7)
-        
-        # Helper to ensure datetime comparison
-        def to_dt(d):
-            return datetime.combine(d, datetime.min.time()) if isinstance(d, type(datetime.now().date())) else d
-
-        receita = sum(s.total_amount for s in sales if s.date >= seven_days_ago)
-        despesa = sum(e.amount for e in expenses if to_dt(e.date) >= seven_days_ago)
-        
-        return {"receita": receita, "despesa": despesa, "lucro": receita - despesa}
-
-    def _calculate_monthly_finance(self, sales, expenses):
-        from collections import defaultdict
-        
-        financeiro = defaultdict(lambda: {"receita": 0.0, "despesa": 0.0, "lucro": 0.0})
-
-        # Process Sales (Receita)
-        for sale in sales:
-            chave_mes = sale.date.strftime("%Y-%m")
-            financeiro[chave_mes]["receita"] += sale.total_amount
-
-        # Process Expenses (Despesa)
-        for expense in expenses:
-            chave_mes = expense.date.strftime("%Y-%m")
-            financeiro[chave_mes]["despesa"] += expense.amount
-
-        # Calculate Profit
-        for mes in financeiro:
-            financeiro[mes]["lucro"] = financeiro[mes]["receita"] - financeiro[mes]["despesa"]
-
-        # Sort by date descending (newest first)
-        return dict(sorted(financeiro.items(), reverse=True))
+        monthly_report = reports.monthly_finance()
+        week_start = datetime.now() - timedelta(days=7)
+        report_7_days = reports.finance_since(week_start)
+
+        return dict(total_revenue=total_revenue,
+                    vip_revenue=vip_revenue,
+                    team_revenue=team_revenue,
+                    total_expenses=total_expenses,
+                    total_commissions=total_commissions,
+                    total_services=total_services,
+                    net_profit=net_profit,
+                    collab_stats=collab_stats,
+                    daily_labels=daily_labels,
+                    daily_values=daily_values,
+                    monthly_report=monthly_report,
+                    report_7_days=report_7_days,
+                    total_supplier_debt=total_supplier_debt,
+                    # Live updates apply to the sales inside these windows (see events.py)
+                    period_start=start_date.isoformat() if start_date else None,
+                    week_start=week_start.isoformat(),
+                    live_since=events.head())
+
+    @expose('/series')
+    @replica.read_only
+    def series(self):
+        # Revenue time series for the chart: ?days=7|30|90&bucket=day|week|month
+        days = request.args.get('days', '7')
+        if not days.isdigit() or not 1 <= int(days) <= 730:
+            return jsonify({'error': 'Invalid days (1-730)'}), 400
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in reports.SERIES_BUCKETS:
+            return jsonify({'error': 'Invalid bucket'}), 400
+
+        series = reports.revenue_series(int(days), bucket)
+        label_format = reports.SERIES_BUCKETS[bucket]
+        return jsonify({
+            'labels': [start.strftime(label_format) for start, _ in series],
+            'values': [total for _, total in series],
+        })
 
     @expose('/delete_sale/<int:id>', methods=['POST'])
     def delete_sale(self, id):
         sale = Sale.query.get_or_404(id)
         
         try:
+            sales.unregister(sale)
+
             # Delete items first (manual cascade safety)
             SaleItem.query.filter_by(sale_id=sale.id).delete()
             
@@ -379,6 +355,14 @@ class ProductView(SecureModelView):
         if price > 0:
              # Equiv percent = (Fixed / Price) * 100
              model.commission_percent = (comm_fixed / price) * 100
+
+        # 1. Stock ledger: record what the form changed (new stock or manual adjustment)
+        history = inspect(model).attrs.quantity.history
+        old_qty = (history.deleted[0] if history.deleted else 0) or 0
+        delta = (model.quantity or 0) - (0 if is_created else old_qty)
+        if delta:
+            db.session.flush() # Get product ID
+            stock.record([(model.id, delta, stock.PURCHASE if is_created else stock.ADJUSTMENT, None)])
         
         # 2. Update Supplier Debt (Only on creation to avoid double counting edits)
         if is_created and model.supplier:
@@ -423,6 +407,18 @@ class CashAdvanceView(SecureModelView):
     form_columns = ('collaborator', 'amount', 'description', 'date')
     column_filters = ('collaborator.name', 'is_paid')
 
+    def on_model_change(self, form, model, is_created):
+        # Keep the collaborators' open advance totals in sync (old and new owner on edits)
+        history = inspect(model).attrs.collaborator.history
+        affected = {model.collaborator.id if model.collaborator else None}
+        affected |= {c.id for c in history.deleted if c is not None}
+        db.session.flush()
+        balances.refresh_advances(affected)
+
+    def after_model_delete(self, model):
+        balances.refresh_advances([model.collaborator_id])
+        db.session.commit()
+
 class PaymentRecordView(SecureModelView):
     can_create = False
     can_edit = False
@@ -442,135 +438,160 @@ class PaymentRecordView(SecureModelView):
     }
     column_list = ('date', 'collaborator', 'total_commission', 'total_advances', 'net_amount', 'admin_name', 'receipt')
 
+    @expose('/')
+    @replica.read_only
+    def index_view(self):
+        return super().index_view()
+
 class WeeklyPaymentView(SecureBaseView):
     @expose('/')
     def index(self):
         # Only show staff that are NOT owners for payment processing
         from models import PaymentRecord
         collabs = Collaborator.query.filter_by(active=True, is_owner=False).all()
-        recent_payments = PaymentRecord.query.order_by(PaymentRecord.date.desc()).limit(20).all()
+        recent_payments = PaymentRecord.query.options(joinedload(PaymentRecord.collaborator))\
+            .order_by(PaymentRecord.date.desc()).limit(20).all()
         return self.render('admin/weekly_payment.html', collabs=collabs, recent_payments=recent_payments)
 
     @expose('/confirm/<int:id>', methods=['POST'])
     def confirm_payment(self, id):
-        from models import CashAdvance, PaymentRecord # Local import to avoid circular issues if any
         collab = Collaborator.query.get_or_404(id)
         
-        # Get pending items
-        pending_sales = Sale.query.filter_by(collaborator_id=id, commission_paid=False).all()
-        pending_advances = CashAdvance.query.filter_by(collaborator_id=id, is_paid=False).all()
-        
-        total_comm = sum(s.total_commission for s in pending_sales)
-        total_adv = sum(a.amount for a in pending_advances)
-        net = total_comm - total_adv
+        # Pending totals straight from SQL
+        totals = payroll.pending(id)
+        net = totals.total_commission - totals.total_advances
         
         if net < 0:
             flash(f'Saldo negativo (R$ {net:.2f}). Não é possível fechar pagamento.', 'error')
             return redirect(url_for('.index'))
             
-        if total_comm == 0 and total_adv == 0:
+        if totals.total_commission == 0 and totals.total_advances == 0:
              flash('Nada a pagar.', 'warning')
              return redirect(url_for('.index'))
 
-        # Determine period dates from sales
-        start_date = min([s.date for s in pending_sales]).date() if pending_sales else datetime.utcnow().date()
-        end_date = max([s.date for s in pending_sales]).date() if pending_sales else datetime.utcnow().date()
-
-        # Create Record
-        payment = PaymentRecord(
-            collaborator_id=id,
-            total_commission=total_comm,
-            total_advances=total_adv,
-            net_amount=net,
-            admin_name='Administrador',
-            start_date=start_date,
-            end_date=end_date
-        )
-        db.session.add(payment)
-        db.session.flush() # Get ID
-        
-        # Update items
-        for s in pending_sales:
-            s.commission_paid = True
-            s.payment_record_id = payment.id # Link sale to this receipt
-            
-        for a in pending_advances:
-            a.is_paid = True
-            a.payment_record_id = payment.id # Link advance to this receipt
+        # Create Record and link the pending sales/advances to it
+        try:
+            payment = payroll.close(id, totals)
+        except payroll.PendingChanged as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('.index'))
             
         db.session.commit()
         
         flash(f'Pagamento de R$ {net:.2f} realizado com sucesso!', 'success')
         return redirect(url_for('payments.receipt_view', id=payment.id))
 
+    @expose('/confirm-all', methods=['POST'])
+    def confirm_all(self):
+        collabs = Collaborator.query.filter_by(active=True, is_owner=False).order_by(Collaborator.name).all()
+        
+        # All closings share one transaction: either every payment is saved or none
+        try:
+            results = payroll.close_all(collabs)
+        except payroll.PendingChanged as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('.index'))
+            
+        db.session.commit()
+        
+        paid = [r for r in results if r[1] == 'pago']
+        flash(f'{len(paid)} pagamentos fechados (R$ {sum(r[2] for r in paid):.2f}).', 'success' if paid else 'warning')
+        return self.render('admin/weekly_payment_summary.html', results=results)
+
+    @expose('/export')
+    def export_receipts(self):
+        """Printable batch of receipts: ?ids=1,2,3 or a date range (default last 7 days)."""
+        from models import PaymentRecord
+        mode = request.args.get('mode', 'admin')
+        if mode not in receipts.MODES:
+            return jsonify({'error': f'mode must be one of {receipts.MODES}'}), 400
+
+        query = db.session.query(PaymentRecord.id)
+        if request.args.get('ids'):
+            try:
+                ids = [int(i) for i in request.args['ids'].split(',') if i.strip()]
+            except ValueError:
+                return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+            query = query.filter(PaymentRecord.id.in_(ids))
+            title = 'Comprovantes selecionados'
+        else:
+            try:
+                end = datetime.strptime(request.args['end'], '%Y-%m-%d') if request.args.get('end') else datetime.utcnow()
+                start = datetime.strptime(request.args['start'], '%Y-%m-%d') if request.args.get('start') else end - timedelta(days=7)
+            except ValueError:
+                return jsonify({'error': 'start/end must be YYYY-MM-DD'}), 400
+            end = end.replace(hour=23, minute=59, second=59)
+            query = query.filter(PaymentRecord.date >= start, PaymentRecord.date <= end)
+            title = f"Comprovantes de {start.strftime('%d/%m/%Y')} a {end.strftime('%d/%m/%Y')}"
+        if request.args.get('collaborator_id', type=int):
+            query = query.filter(PaymentRecord.collaborator_id == request.args.get('collaborator_id', type=int))
+
+        payment_ids = [pid for (pid,) in query.order_by(PaymentRecord.date, PaymentRecord.id)]
+        filename = f"comprovantes_{mode}_{datetime.utcnow().strftime('%Y%m%d')}.html"
+        return receipts.batch(payment_ids, mode, title, filename)
+
     @expose('/receipt/<int:id>')
     def receipt_view(self, id):
         from models import PaymentRecord
         payment = PaymentRecord.query.get_or_404(id)
         # ADMIN MODE: Shows Revenue, Profit, Gross
-        return render_template('receipt_unified.html', payment=payment, mode='admin')
+        return receipts.serve(payment, 'admin')
 
     @expose('/collab_report/<int:id>')
     def collab_report_view(self, id):
         from models import PaymentRecord
         payment = PaymentRecord.query.get_or_404(id)
         # COLLAB MODE: Hides Revenue, Profit. Shows only Commission & Discounts.
-        return render_template('receipt_unified.html', payment=payment, mode='collab')
+        return receipts.serve(payment, 'collab')
 
 
 class FinancialControlView(SecureBaseView):
     @expose('/')
+    @replica.read_only
     def index(self):
+        key = (datetime.now().date(), replica.in_use(db))
+        data = cache.fetch('financial', key, FINANCIAL_TABLES, self._aggregates)
+        return self.render('admin/financial_control.html', **data)
+
+    def _aggregates(self):
         # Time ranges
         now = datetime.now()
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         week_start = now - timedelta(days=7) # Or week start: now - timedelta(days=now.weekday())
 
-        # 1. Daily Control by Payment Method
-        # Aggregate manually for flexibility
-        todays_sales = Sale.query.filter(Sale.date >= today_start).all()
-        
+        # 1. Daily Control by Payment Method (from the daily summary)
+        daily_rollup = reports.sales_rollup(today_start, by=('payment_method', 'collaborator_id'))
+        weekly_rollup = reports.sales_rollup(week_start, by=('collaborator_id',), payment_method='Dinheiro')
+
+        names = reports.collaborator_names(
+            {cid for _, cid in daily_rollup} | {cid for (cid,) in weekly_rollup})
+
         methods = ['Dinheiro', 'Pix', 'Débito', 'Crédito']
         daily_control = {m: {'total': 0.0, 'breakdown': []} for m in methods}
         
-        # Populate Daily Data
-        for sale in todays_sales:
-            method = sale.payment_method
+        # Populate Daily Data, grouped by collaborator
+        for (method, collab_id), data in daily_rollup.items():
             if method in daily_control:
-                daily_control[method]['total'] += sale.total_amount
-                # Add to breakdown (we will group by collab later or just list them)
+                daily_control[method]['total'] += data['revenue']
                 daily_control[method]['breakdown'].append({
-                    'collab': sale.collaborator.name,
-                    'amount': sale.total_amount
+                    'name': names.get(collab_id),
+                    'amount': data['revenue']
                 })
-        
-        # Group breakdown by collaborator
-        for m in methods:
-            raw_list = daily_control[m]['breakdown']
-            grouped = {}
-            for item in raw_list:
-                name = item['collab']
-                grouped[name] = grouped.get(name, 0.0) + item['amount']
-            
-            # Convert back to list of dicts
-            daily_control[m]['breakdown'] = [{'name': k, 'amount': v} for k, v in grouped.items()]
-
 
         # 2. Weekly Money Control
-        weekly_sales = Sale.query.filter(Sale.date >= week_start, Sale.payment_method == 'Dinheiro').all()
-        weekly_money_total = sum(s.total_amount for s in weekly_sales)
-        
-        weekly_money_breakdown = {}
-        for s in weekly_sales:
-            name = s.collaborator.name
-            weekly_money_breakdown[name] = weekly_money_breakdown.get(name, 0.0) + s.total_amount
-            
-        weekly_money_breakdown_list = [{'name': k, 'amount': v} for k, v in weekly_money_breakdown.items()]
-
-        return self.render('admin/financial_control.html',
-                           daily_control=daily_control,
-                           weekly_money_total=weekly_money_total,
-                           weekly_money_breakdown=weekly_money_breakdown_list)
+        weekly_money_total = sum(data['revenue'] for data in weekly_rollup.values())
+        weekly_money_breakdown_list = [{'name': names.get(collab_id), 'amount': data['revenue']}
+                                       for (collab_id,), data in weekly_rollup.items()]
+
+        return dict(daily_control=daily_control,
+                    weekly_money_total=weekly_money_total,
+                    weekly_money_breakdown=weekly_money_breakdown_list,
+                    # Live updates apply to the sales inside these windows (see events.py)
+                    today_start=today_start.isoformat(),
+                    week_start=week_start.isoformat(),
+                    live_since=events.head())
 
 class SupplierView(SecureModelView):
     column_list = ('name', 'initial_debt', 'current_balance')
@@ -630,6 +651,76 @@ class SupplierPaymentView(SecureModelView):
                 db.session.add(supplier)
                 flash(f'Pagamento de R$ {payment_amount:.2f} registrado. Novo saldo de {supplier.name}: R$ {supplier.current_balance:.2f}', 'success')
 
+class ExportView(SecureBaseView):
+    @expose('/')
+    def index(self):
+        collabs = Collaborator.query.order_by(Collaborator.name).all()
+        return self.render('admin/exports.html', datasets=exports.DATASETS, collabs=collabs)
+
+    @expose('/<dataset>.csv')
+    @replica.read_only
+    def download(self, dataset):
+        # ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive)&collaborator_id=N
+        try:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+        except ValueError:
+            return jsonify({'error': 'start/end must be YYYY-MM-DD'}), 400
+        try:
+            stmt = exports.statement(dataset, start, end, request.args.get('collaborator_id', type=int))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        filename = f"{dataset}_{start or 'inicio'}_{end or datetime.now().date()}.csv"
+        return Response(stream_with_context(exports.rows(dataset, stmt)), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+class ImportView(SecureBaseView):
+    @expose('/', methods=['GET', 'POST'])
+    def index(self):
+        result = None
+        kind = request.form.get('kind', 'sales')
+        if request.method == 'POST':
+            upload = request.files.get('file')
+            if not upload or not upload.filename:
+                flash('Selecione um arquivo CSV.', 'error')
+                return redirect(url_for('.index'))
+            try:
+                stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+                result = importer.run(kind, stream)
+            except (ValueError, UnicodeDecodeError, SQLAlchemyError) as e:
+                db.session.rollback()
+                # Chunks committed before the error are kept: refresh what they feed
+                importer.finish(kind)
+                flash(f'Erro na importação: {e}', 'error')
+                return redirect(url_for('.index'))
+            importer.finish(kind)
+            flash(f'{result.inserted} registros importados, {result.skipped} linhas ignoradas.',
+                  'success' if not result.skipped else 'warning')
+        return self.render('admin/import.html', kinds=importer.KINDS, kind=kind, result=result)
+
+class MetricsView(SecureBaseView):
+    def is_visible(self):
+        return False # Scraped by Prometheus, not a menu page
+
+    @expose('/')
+    def index(self):
+        token = current_app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Não autorizado\n', status=401, mimetype='text/plain')
+        return Response(instrumentation.metrics_text(), mimetype='text/plain; version=0.0.4')
+
+class LiveView(SecureBaseView):
+    def is_visible(self):
+        return False # EventSource of the dashboard and the financial control
+
+    @expose('/')
+    def index(self):
+        # ?since=<event id> when the page opens it, Last-Event-ID when the browser reconnects
+        since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+        return Response(stream_with_context(events.stream(since)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # Function to register views explicitly
 def init_admin(admin):
     from models import CashAdvance, PaymentRecord, Supplier, SupplierPayment
@@ -651,4 +742,8 @@ def init_admin(admin):
     
     admin.add_view(SupplierView(Supplier, db.session, name='Fornecedores'))
     admin.add_view(SupplierPaymentView(SupplierPayment, db.session, name='Pagamentos Fornec.', endpoint='supplierpayment'))
+    admin.add_view(ExportView(name='Exportar (CSV)', endpoint='exports'))
+    admin.add_view(ImportView(name='Importar (CSV)', endpoint='imports'))
+    admin.add_view(MetricsView(name='Métricas', endpoint='metrics'))
+    admin.add_view(LiveView(name='Ao Vivo', endpoint='live'))
 
@@ -1,21 +1,40 @@
 from flask import Flask
 from extensions import db, admin
+import cache
+import config
+import database
+import events
+import instrumentation
+import replica
 import os
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     
-    # Configuration
-    app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
-    # Use SQLite for now, easy to switch to MySQL
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    db_path = os.path.join(basedir, 'instance', 'barber.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Configuration: defaults < instance/config.py < environment (see config.py)
+    app.config.from_object(config.Config)
+    app.config.from_pyfile(os.path.join(app.instance_path, 'config.py'), silent=True)
+    config.from_env(app.config)
+
+    if test_config:
+        app.config.update(test_config)
+
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', database.engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        pool_size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_MAX_OVERFLOW'],
+        pool_recycle=app.config['DB_POOL_RECYCLE'],
+        lock_timeout=app.config['DB_LOCK_TIMEOUT'],
+        statement_timeout=app.config['DB_STATEMENT_TIMEOUT']))
+
+    replica.configure(app)
 
-    # Initialize extensions with app
     # Initialize extensions with app
     db.init_app(app)
+    database.init_app(app, db)
+    instrumentation.init_app(app, db)
+    cache.init_app(app, db)
+    events.init_app(app, db)
     
     # Initialize Babel for translations
     from flask_babel import Babel
@@ -41,11 +60,13 @@ def create_app():
         from admin_panel import init_admin
         init_admin(admin)
 
-        # Create DB tables
-        db.create_all()
+        # Create DB tables (skipped by default: run `python migrate.py` instead)
+        if app.config['AUTO_CREATE_TABLES']:
+            db.create_all()
 
     return app
 
 if __name__ == '__main__':
+    # Development server only (FLASK_DEBUG=1 turns the debugger on); production: python serve.py
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)
@@ -0,0 +1,175 @@
+"""Index benchmark on a synthetic database.
+
+Builds a throwaway SQLite file with the app schema and N sales (default
+1,000,000), then times the hot dashboard, weekly payment and collaborator
+dashboard queries without the composite indexes and again after running
+the same index list as migrations.py. The query plan of each query is
+printed so it is visible which index SQLite picked.
+
+    python benchmarks/bench_indexes.py --sales 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from extensions import db  # noqa: E402
+import models  # noqa: E402,F401  (registers the tables on db.metadata)
+from migrations import INDEXES  # noqa: E402
+
+COLLABORATORS = 10
+METHODS = ['Dinheiro', 'Pix', 'Débito', 'Crédito']
+
+
+def build_database(path, n_sales, seed=42):
+    engine = create_engine('sqlite:///' + path)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    for name, _, _ in INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+
+    rnd = random.Random(seed)
+    cur.executemany(
+        "INSERT INTO collaborator (id, name, commission_percent, active, is_owner) VALUES (?, ?, 50.0, 1, ?)",
+        [(i, f'Barbeiro {i}', 1 if i == 1 else 0) for i in range(1, COLLABORATORS + 1)])
+
+    now = datetime.now()
+    span = 3 * 365 * 24 * 3600
+    payment_id = 0
+    batch_sales, batch_items = [], []
+    for sale_id in range(1, n_sales + 1):
+        collab = rnd.randint(1, COLLABORATORS)
+        age = span * (1 - sale_id / n_sales)  # ids grow with time
+        date = (now - timedelta(seconds=age)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        paid = age > 7 * 24 * 3600  # only the last week is still open
+        record = None
+        if paid:
+            record = (sale_id // 500) + 1
+            payment_id = max(payment_id, record)
+        batch_sales.append((sale_id, collab, date, 40.0, 20.0, rnd.choice(METHODS), int(paid), record))
+        batch_items.append((sale_id, sale_id, 'Corte', 40.0, 20.0))
+        if len(batch_sales) >= 50000:
+            _flush(cur, batch_sales, batch_items)
+    _flush(cur, batch_sales, batch_items)
+
+    cur.executemany(
+        "INSERT INTO payment_record (id, collaborator_id, date, total_commission, total_advances, net_amount) "
+        "VALUES (?, ?, ?, 0, 0, 0)",
+        [(i, (i % COLLABORATORS) + 1, now.strftime('%Y-%m-%d %H:%M:%S.%f')) for i in range(1, payment_id + 1)])
+    cur.executemany(
+        "INSERT INTO cash_advance (collaborator_id, amount, description, date, is_paid) VALUES (?, 10.0, 'Vale', ?, ?)",
+        [((i % COLLABORATORS) + 1, now.date().isoformat(), int(i > 50)) for i in range(n_sales // 100)])
+    conn.commit()
+    return conn
+
+
+def _flush(cur, sales, items):
+    cur.executemany(
+        "INSERT INTO sale (id, collaborator_id, date, total_amount, total_commission, payment_method, "
+        "commission_paid, payment_record_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", sales)
+    cur.executemany(
+        "INSERT INTO sale_item (id, sale_id, item_name, price, commission) VALUES (?, ?, ?, ?, ?)", items)
+    sales.clear()
+    items.clear()
+
+
+def queries(now):
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_ago = now - timedelta(days=7)
+    fmt = lambda d: d.strftime('%Y-%m-%d %H:%M:%S.%f')  # noqa: E731
+    return [
+        ('dashboard: partial-day totals',
+         "SELECT collaborator.is_owner, sum(sale.total_amount), count(sale.id) FROM sale "
+         "JOIN collaborator ON sale.collaborator_id = collaborator.id "
+         "WHERE sale.date >= ? AND sale.date < ? GROUP BY collaborator.is_owner",
+         (fmt(week_ago), fmt(week_ago.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)))),
+        ('dashboard: recent sales',
+         "SELECT id FROM sale ORDER BY date DESC LIMIT 10", ()),
+        ('financial: weekly cash',
+         "SELECT collaborator_id, sum(total_amount) FROM sale "
+         "WHERE payment_method = ? AND date >= ? GROUP BY collaborator_id", ('Dinheiro', fmt(week_ago))),
+        ('weekly payment: pending commission',
+         "SELECT sum(total_commission), min(date), max(date) FROM sale "
+         "WHERE collaborator_id = ? AND commission_paid = 0", (3,)),
+        ('weekly payment: pending advances',
+         "SELECT sum(amount) FROM cash_advance WHERE collaborator_id = ? AND is_paid = 0", (3,)),
+        ('collab dashboard: unpaid balance',
+         "SELECT sum(total_commission) FROM sale WHERE collaborator_id = ? AND commission_paid = 0", (3,)),
+        ('collab dashboard: recent sales',
+         "SELECT id FROM sale WHERE collaborator_id = ? ORDER BY date DESC LIMIT 10", (3,)),
+        ('collab dashboard: today',
+         "SELECT sum(total_amount) FROM sale WHERE collaborator_id = ? AND date >= ?", (1, fmt(today))),
+        ('receipt: sales of a payment',
+         "SELECT id FROM sale WHERE payment_record_id = ?", (7,)),
+        ('receipt: items of a sale',
+         "SELECT id FROM sale_item WHERE sale_id IN (?, ?, ?)", (10, 20, 30)),
+        ('payments: history of a collaborator',
+         "SELECT id FROM payment_record WHERE collaborator_id = ? ORDER BY date DESC LIMIT 20", (3,)),
+    ]
+
+
+def run(cur, now, repeat):
+    results = {}
+    for label, sql, params in queries(now):
+        plan = ' | '.join(row[-1] for row in cur.execute("EXPLAIN QUERY PLAN " + sql, params))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cur.execute(sql, params).fetchall()
+        results[label] = ((time.perf_counter() - start) / repeat * 1000, plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sales', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', help='SQLite file to create (default: a temp file)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    if os.path.exists(path):
+        os.remove(path)
+
+    print(f"Generating {args.sales} sales in {path}...")
+    start = time.perf_counter()
+    conn = build_database(path, args.sales)
+    print(f"Generated in {time.perf_counter() - start:.1f}s")
+
+    cur = conn.cursor()
+    now = datetime.now()
+    before = run(cur, now, args.repeat)
+
+    start = time.perf_counter()
+    for name, table, columns in INDEXES:
+        cur.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    cur.execute("ANALYZE")
+    conn.commit()
+    print(f"Indexes created in {time.perf_counter() - start:.1f}s")
+    after = run(cur, now, args.repeat)
+
+    print()
+    print(f"{'query':40} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label in before:
+        b, _ = before[label]
+        a, plan = after[label]
+        print(f"{label:40} {b:10.2f} {a:10.2f} {b / a if a else 0:7.0f}x")
+        print(f"    plan: {plan}")
+
+    conn.close()
+    if not args.db:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
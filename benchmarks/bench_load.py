@@ -0,0 +1,141 @@
+"""Load test of the production server at 1, 4 and 8 workers.
+
+Builds a throwaway synthetic database (benchmarks/synthetic.py) with N
+historical sales, then for each worker count starts
+``serve.py`` on it and runs client threads for a fixed time: half of them
+post checkouts to /sale/new as logged-in collaborators, the other half
+open /admin/dashboard/. Prints requests/s and latency per endpoint.
+
+    python benchmarks/bench_load.py --workers 1 4 8 --clients 16 --seconds 15
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import synthetic  # noqa: E402
+from services import stock  # noqa: E402
+
+STOCK = 10_000_000  # Enough pomades that no checkout runs out during the test
+
+
+def build_database(path, n_sales):
+    """Synthetic shop; returns the barbers' login tokens and the service/product to sell."""
+    synthetic.build(path, n_sales, out=lambda line: None)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute('UPDATE product SET quantity = quantity + ? WHERE id = 1', (STOCK,))
+        conn.execute('INSERT INTO stock_movement (product_id, quantity, reason, date) VALUES (1, ?, ?, ?)',
+                     (STOCK, stock.PURCHASE, datetime.now()))
+    conn.close()
+    tokens = [f'synthetic-{i}' for i in range(1, 8)]
+    return tokens, 1, 1
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def client(base, kind, token, cart, stop, results, lock):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    if kind == 'sale':
+        opener.open(urllib.request.Request(f'{base}/login/{token}', data=f'password={synthetic.PASSWORD}'.encode()))
+        body = json.dumps({'items': cart, 'payment_method': 'Pix', 'client_name': 'Carga'}).encode()
+    timings, errors = [], 0
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        try:
+            if kind == 'sale':
+                request = urllib.request.Request(f'{base}/sale/new', data=body,
+                                                 headers={'Content-Type': 'application/json'})
+            else:
+                request = f'{base}/admin/dashboard/'
+            with opener.open(request, timeout=60) as response:
+                response.read()
+        except Exception:
+            errors += 1
+            continue
+        timings.append(time.perf_counter() - start)
+    with lock:
+        results[kind][0].extend(timings)
+        results[kind][1] += errors
+
+
+def run(port, workers, threads, clients, seconds, db_url, tokens, cart):
+    env = dict(os.environ, DATABASE_URL=db_url)
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py'), '--host', '127.0.0.1',
+                               '--port', str(port), '--workers', str(workers), '--threads', str(threads)],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        base = f'http://127.0.0.1:{port}'
+        urllib.request.urlopen(f'{base}/admin/dashboard/').read()  # warm up
+        results = {'sale': [[], 0], 'dashboard': [[], 0]}
+        lock = threading.Lock()
+        stop = time.perf_counter() + seconds
+        pool = [threading.Thread(target=client, args=(base, 'sale' if i % 2 == 0 else 'dashboard',
+                                                       tokens[i % len(tokens)], cart, stop, results, lock))
+                for i in range(clients)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return results
+    finally:
+        server.terminate()  # SIGTERM: graceful shutdown
+        server.wait(timeout=60)
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--threads', type=int, default=1, help='threads per worker')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--sales', type=int, default=50_000)
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    print(f'Generating {args.sales} sales in {path}...')
+    tokens, service_id, product_id = build_database(path, args.sales)
+    cart = [{'type': 'service', 'id': service_id, 'quantity': 1},
+            {'type': 'product', 'id': product_id, 'quantity': 1}]
+
+    print(f"{'workers':>7} {'endpoint':17} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        results = run(args.port, workers, args.threads, args.clients, args.seconds,
+                      'sqlite:///' + path, tokens, cart)
+        for kind, (timings, errors) in results.items():
+            label = '/sale/new' if kind == 'sale' else '/admin/dashboard'
+            print(f"{workers:7d} {label:17} {len(timings) / args.seconds:8.1f} "
+                  f"{_percentile(timings, 0.5) * 1000:8.1f} {_percentile(timings, 0.95) * 1000:8.1f} {errors:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Concurrent reader/writer benchmark for the SQLite settings.
+
+Builds a throwaway SQLite file with the app schema and N sales, then runs
+reader threads (the dashboard's daily totals query) next to writer
+threads (a checkout: one sale + one item per transaction) for a fixed
+time, once with the old defaults (rollback journal, no pragmas) and once
+with the WAL profile from database.py. Prints reads/s, writes/s, the
+slowest operation and how many operations failed with
+"database is locked".
+
+    python benchmarks/bench_sqlite_concurrency.py --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+import database  # noqa: E402
+from extensions import db  # noqa: E402
+import models  # noqa: E402,F401  (registers the tables on db.metadata)
+
+COLLABORATORS = 10
+
+PROFILES = {
+    # What create_app used before: pysqlite's 5s lock wait, rollback journal
+    'default': ({}, {'journal_mode': 'DELETE'}),
+    'tuned': (database.engine_options('sqlite://'), database.SQLITE_PRAGMAS),
+}
+
+READ = text("SELECT collaborator_id, sum(total_amount), count(id) FROM sale "
+            "WHERE date >= :since GROUP BY collaborator_id")
+WRITE_SALE = text("INSERT INTO sale (collaborator_id, date, total_amount, total_commission, payment_method, "
+                  "commission_paid) VALUES (:collab, :date, 40.0, 20.0, 'Pix', 0)")
+WRITE_ITEM = text("INSERT INTO sale_item (sale_id, item_name, quantity, price, commission) "
+                  "VALUES (:sale_id, 'Corte', 1, 40.0, 20.0)")
+
+
+def build_database(path, n_sales, seed=42):
+    engine = create_engine('sqlite:///' + path)
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    rnd = random.Random(seed)
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO collaborator (id, name, commission_percent, active, is_owner) VALUES (?, ?, 50.0, 1, 0)",
+        [(i, f'Barbeiro {i}') for i in range(1, COLLABORATORS + 1)])
+    conn.executemany(
+        "INSERT INTO sale (id, collaborator_id, date, total_amount, total_commission, payment_method, "
+        "commission_paid) VALUES (?, ?, ?, 40.0, 20.0, 'Pix', 1)",
+        [(i, rnd.randint(1, COLLABORATORS),
+          (now - timedelta(minutes=n_sales - i)).strftime('%Y-%m-%d %H:%M:%S.%f')) for i in range(1, n_sales + 1)])
+    conn.commit()
+    conn.close()
+
+
+def run_profile(path, profile, readers, writers, seconds):
+    options, pragmas = PROFILES[profile]
+    engine = create_engine('sqlite:///' + path, pool_size=readers + writers, **options)
+    database.tune_sqlite(engine, pragmas)
+    since = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    stats = {'read': [], 'write': [], 'locked': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+    barrier = threading.Barrier(readers + writers)
+
+    def reader():
+        timings = []
+        barrier.wait()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(READ, {'since': since}).fetchall()
+            except OperationalError:
+                with lock:
+                    stats['locked'] += 1
+                continue
+            timings.append(time.perf_counter() - start)
+        with lock:
+            stats['read'].extend(timings)
+
+    def writer(n):
+        timings = []
+        rnd = random.Random(n)
+        barrier.wait()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    sale_id = conn.execute(WRITE_SALE, {
+                        'collab': rnd.randint(1, COLLABORATORS),
+                        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}).lastrowid
+                    conn.execute(WRITE_ITEM, {'sale_id': sale_id})
+            except OperationalError:
+                with lock:
+                    stats['locked'] += 1
+                continue
+            timings.append(time.perf_counter() - start)
+        with lock:
+            stats['write'].extend(timings)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sales', type=int, default=100_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'profile':10} {'reads/s':>10} {'writes/s':>10} {'max read ms':>12} {'max write ms':>13} {'locked':>7}")
+    for profile in PROFILES:
+        # A fresh file per profile: journal_mode=WAL is persistent
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        build_database(path, args.sales)
+        stats = run_profile(path, profile, args.readers, args.writers, args.seconds)
+        reads, writes = stats['read'], stats['write']
+        print(f"{profile:10} {len(reads) / args.seconds:10.0f} {len(writes) / args.seconds:10.0f} "
+              f"{max(reads, default=0) * 1000:12.1f} {max(writes, default=0) * 1000:13.1f} {stats['locked']:7d}")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""End-to-end benchmark of the main pages at several data sizes.
+
+For every size a synthetic database is generated (benchmarks/synthetic.py)
+and the key entry points are called through the Flask test client:
+
+- routes.new_sale (POST a checkout) and routes.dashboard;
+- DashboardView.index, FinancialControlView.index;
+- WeeklyPaymentView.confirm_payment (once per barber, on the open week);
+- the admin receipt: first view (freezes the snapshot), frozen view,
+  live ``?group=day`` view, and the collaborator's copy.
+
+Each size runs in its own process (create_app can only run once per
+process). Wall time (median, p95, min) and the number of SQL statements
+of each entry point go to a JSON file, together with the git commit, so
+two runs can be compared:
+
+    python benchmarks/bench_suite.py --sizes 1000 100000 1000000 --out bench.json
+    python benchmarks/bench_suite.py --compare old.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+REGRESSION = 1.25  # --compare flags entry points at least 25% slower
+
+
+def _measure(run, repeat, engine):
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings, status = [], None
+    for i in range(repeat):
+        del statements[:]
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        start = time.perf_counter()
+        try:
+            status = run(i)
+        finally:
+            elapsed = time.perf_counter() - start
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+        timings.append(elapsed * 1000)
+    timings.sort()
+    return {
+        'median_ms': round(timings[len(timings) // 2], 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'min_ms': round(timings[0], 2),
+        'runs': len(timings),
+        'queries': len(statements),
+        'status': status,
+    }
+
+
+def time_entry_points(path, repeat):
+    from app import create_app
+    from extensions import db
+    from models import Collaborator, Service, Product, PaymentRecord
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+    results = {}
+    with app.app_context():
+        engine = db.engine
+        team = [c.id for c in Collaborator.query.filter_by(is_owner=False).order_by(Collaborator.id)]
+        barber = team[0]
+        service = Service.query.order_by(Service.id).first().id
+        product = Product.query.order_by(Product.id).first().id
+        payments = [p.id for p in PaymentRecord.query.filter_by(collaborator_id=barber)
+                    .order_by(PaymentRecord.id.desc()).limit(repeat * 3)]
+        db.session.remove()
+
+    admin = app.test_client()
+    collab = app.test_client()
+    with collab.session_transaction() as sess:
+        sess['collab_id'] = barber
+    cart = {'items': [{'type': 'service', 'id': service, 'quantity': 1},
+                      {'type': 'product', 'id': product, 'quantity': 1}],
+            'payment_method': 'Pix', 'client_name': 'Benchmark'}
+
+    def get(client, url):
+        return lambda i: client.get(url).status_code
+
+    entry_points = [
+        ('routes.new_sale', lambda i: collab.post('/sale/new', json=cart).status_code, repeat),
+        ('routes.dashboard', get(collab, '/dashboard'), repeat),
+        ('DashboardView.index', get(admin, '/admin/dashboard/'), repeat),
+        ('FinancialControlView.index', get(admin, '/admin/financial/'), repeat),
+        ('receipt: first view (freeze)',
+         lambda i: admin.get(f'/admin/payments/receipt/{payments[i]}').status_code, min(repeat, len(payments))),
+        ('receipt: frozen', get(admin, f'/admin/payments/receipt/{payments[0]}'), repeat),
+        ('receipt: live by day', get(admin, f'/admin/payments/receipt/{payments[0]}?group=day'), repeat),
+        ('routes.receipt_detail', get(collab, f'/my-receipts/{payments[0]}'), repeat),
+        # Closes the open week of a different barber each time
+        ('WeeklyPaymentView.confirm_payment',
+         lambda i: admin.post(f'/admin/payments/confirm/{team[i]}').status_code, len(team)),
+    ]
+    for name, run, times in entry_points:
+        if times:
+            results[name] = _measure(run, times, engine)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old_path} ({old['meta'].get('commit')}) -> {new_path} ({new['meta'].get('commit')})")
+    print(f"{'size':>9} {'entry point':36} {'old ms':>9} {'new ms':>9} {'ratio':>6}")
+    regressions = 0
+    for size, entries in new['results'].items():
+        for name, result in entries.items():
+            before = old['results'].get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else 0
+            flag = '  <-- mais lento' if ratio >= REGRESSION else ''
+            regressions += bool(flag)
+            print(f"{size:>9} {name:36} {before['median_ms']:9.1f} {result['median_ms']:9.1f} {ratio:6.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--collaborators', type=int, default=8)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    # Internal: each step runs in a fresh process (one create_app per process)
+    parser.add_argument('--generate', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--time-db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    if args.generate is not None:
+        import synthetic
+        synthetic.build(args.db, args.generate, collaborators=args.collaborators, out=lambda line: None)
+        return
+    if args.time_db:
+        print(json.dumps(time_entry_points(args.time_db, args.repeat)))
+        return
+
+    results = {}
+    for size in args.sizes:
+        print(f'{size} vendas...', flush=True)
+        path = os.path.join(tempfile.mkdtemp(), 'suite.db')
+        start = time.perf_counter()
+        subprocess.run([sys.executable, __file__, '--generate', str(size), '--db', path,
+                        '--collaborators', str(args.collaborators)], cwd=ROOT, check=True, stderr=subprocess.DEVNULL)
+        print(f'  banco gerado em {time.perf_counter() - start:.1f}s')
+        output = subprocess.check_output([sys.executable, __file__, '--time-db', path, '--repeat', str(args.repeat)],
+                                         cwd=ROOT, text=True, stderr=subprocess.DEVNULL)
+        results[str(size)] = json.loads(output.strip().splitlines()[-1])
+        os.remove(path)
+        for name, result in results[str(size)].items():
+            print(f"  {name:36} {result['median_ms']:9.1f} ms  p95 {result['p95_ms']:9.1f}  "
+                  f"{result['queries']:3d} consultas  HTTP {result['status']}")
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Resultados em {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Seeded synthetic data for benchmarks.
+
+Fills an empty (migrated) database with a shop that looks like a real
+one: an owner and N barbers with different workloads, a service menu
+where a few items dominate, products with stock and fixed commissions,
+suppliers with debts and payments, and ``sales`` sales spread over
+``days`` days. Busy evenings and weekends, closed Sundays, 1-3 items per
+sale, one sale in six with a product, a Pix-heavy mix of payment
+methods. Every past week is closed with a PaymentRecord per barber, and
+that barber's sales and advances are linked to it, like the weekly
+closing does. Only the current week is still open. Rent, utilities and
+product purchases are monthly/weekly expenses.
+
+The same seed always gives the same database. Rows go in with
+executemany INSERTs of ``chunk_size`` rows, and then the daily summary,
+balances and stock ledger are rebuilt from them.
+
+    python benchmarks/synthetic.py --sales 2000000 --db /tmp/barbearia.db
+
+Collaborators log in with token ``synthetic-<n>`` and password PASSWORD.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'bench'
+
+SERVICES = [  # name, price, popularity
+    ('Corte', 40.0, 40), ('Barba', 25.0, 18), ('Corte + Barba', 60.0, 22), ('Sobrancelha', 15.0, 8),
+    ('Pezinho', 10.0, 6), ('Corte Infantil', 35.0, 6), ('Pigmentação', 50.0, 3), ('Luzes', 120.0, 1),
+    ('Platinado', 150.0, 1), ('Relaxamento', 70.0, 1), ('Hidratação', 45.0, 2), ('Barboterapia', 55.0, 2),
+]
+PRODUCTS = [  # name, price
+    ('Pomada Modeladora', 35.0), ('Pomada Efeito Seco', 38.0), ('Óleo para Barba', 45.0),
+    ('Balm para Barba', 40.0), ('Shampoo Anticaspa', 30.0), ('Shampoo para Barba', 32.0),
+    ('Cera', 28.0), ('Gel Fixador', 20.0), ('Tônico Capilar', 55.0), ('Minoxidil', 90.0),
+    ('Pente de Madeira', 15.0), ('Loção Pós-Barba', 42.0),
+]
+SUPPLIERS = ['Distribuidora Central', 'Cosméticos Barber', 'Atacado Beleza', 'Importadora Navalha',
+             'Papelaria do Bairro']
+METHODS = [('Pix', 45), ('Dinheiro', 20), ('Débito', 20), ('Crédito', 15)]
+FIRST_NAMES = ['João', 'Pedro', 'Lucas', 'Gabriel', 'Mateus', 'Rafael', 'Bruno', 'Felipe', 'Gustavo',
+               'Carlos', 'André', 'Thiago', 'Diego', 'Vinícius', 'Rodrigo', 'Marcos', 'Eduardo', 'Caio',
+               'Leonardo', 'Daniel', 'Henrique', 'Arthur', 'Samuel', 'Davi', 'Miguel']
+# Relative traffic per weekday (Monday first; closed on Sundays) and per opening hour
+WEEKDAYS = [0.6, 0.8, 0.9, 1.0, 1.3, 1.5, 0.0]
+HOURS = {9: 3, 10: 5, 11: 7, 12: 8, 13: 6, 14: 5, 15: 5, 16: 6, 17: 8, 18: 10, 19: 9, 20: 5}
+MONTHLY_EXPENSES = [('Aluguel', 'Aluguel', 2500.0, 5), ('Luz', 'Energia', 450.0, 10), ('Água', 'Água', 120.0, 10),
+                    ('Internet', 'Internet', 100.0, 15), ('Contador', 'Serviços', 350.0, 20)]
+
+
+def _pick(rnd, weighted):
+    values, weights = zip(*weighted)
+    return rnd.choices(values, weights)[0]
+
+
+class _Writer:
+    """Buffers rows per table and writes them chunk_size at a time."""
+
+    def __init__(self, chunk_size):
+        from extensions import db
+        self.db = db
+        self.chunk_size = chunk_size
+        self.rows = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.rows.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self, model=None):
+        # Tables in first-seen order, so parents (sales) always go in before children (items)
+        for m in ([model] if model else list(self.rows)):
+            rows = self.rows.get(m)
+            if rows:
+                self.db.session.execute(m.__table__.insert(), rows)
+                self.counts[m.__tablename__] = self.counts.get(m.__tablename__, 0) + len(rows)
+                rows.clear()
+        self.db.session.commit()
+
+
+def generate(sales=100_000, collaborators=8, days=None, seed=42, chunk_size=20_000, today=None, out=print):
+    """Fill the empty database of the current app context; returns row counts per table.
+
+    ``days`` defaults to enough history for ~60 sales per open day.
+    """
+    from werkzeug.security import generate_password_hash
+
+    from extensions import db
+    from models import (Collaborator, Service, Product, Sale, SaleItem, Expense, CashAdvance, PaymentRecord,
+                        Supplier, SupplierPayment)
+    from services import summary, balances, stock
+
+    rnd = random.Random(seed)
+    today = today or date.today()
+    if days is None:
+        days = max(7, math.ceil(sales / 60 * 7 / 6))
+    first_day = today - timedelta(days=days - 1)
+    writer = _Writer(chunk_size)
+
+    # --- Catalog -----------------------------------------------------------
+    password_hash = generate_password_hash(PASSWORD)
+    team = []
+    writer.add(Collaborator, {'id': 1, 'name': 'Dono', 'is_owner': True, 'commission_percent': 0.0, 'active': True,
+                              'token': 'synthetic-0', 'password_hash': password_hash, 'start_date': first_day})
+    for i in range(1, collaborators):
+        team.append((i + 1, rnd.choice([40.0, 45.0, 50.0, 50.0, 60.0]), rnd.uniform(0.5, 1.5)))
+        writer.add(Collaborator, {'id': i + 1, 'name': f'{rnd.choice(FIRST_NAMES)} Barbeiro {i}',
+                                  'commission_percent': team[-1][1], 'active': True, 'is_owner': False,
+                                  'token': f'synthetic-{i}', 'password_hash': password_hash,
+                                  'start_date': first_day})
+    workload = [(1, 0.15 * sum(w for _, _, w in team) / 0.85)] + [(cid, w) for cid, _, w in team]
+    commission = {1: 0.0, **{cid: pct for cid, pct, _ in team}}
+
+    for i, (name, price, _) in enumerate(SERVICES, start=1):
+        writer.add(Service, {'id': i, 'name': name, 'price': price})
+    for i, name in enumerate(SUPPLIERS, start=1):
+        writer.add(Supplier, {'id': i, 'name': name, 'initial_debt': 0.0, 'current_balance': 0.0})
+    products = []
+    for i, (name, price) in enumerate(PRODUCTS, start=1):
+        fixed = round(price * 0.1, 2)
+        products.append((i, name, price, fixed))
+        writer.add(Product, {'id': i, 'name': name, 'price': price, 'cost_price': round(price * rnd.uniform(0.4, 0.6), 2),
+                             'commission_percent': 10.0, 'commission_fixed_value': fixed,
+                             'quantity': rnd.randint(5, 80), 'supplier_id': rnd.randint(1, len(SUPPLIERS))})
+    writer.flush()
+    service_weights = [(i, popularity) for i, (_, _, popularity) in enumerate(SERVICES, start=1)]
+
+    # --- History, one week at a time ----------------------------------------
+    open_days = sum(WEEKDAYS[(first_day + timedelta(days=d)).weekday()] for d in range(days))
+    per_day = sales / open_days if open_days else 0
+    current_week = today - timedelta(days=today.weekday())
+    sale_id = item_id = advance_id = payment_id = 0
+    made = 0
+    report = 100_000
+    start = time.perf_counter()
+
+    day = first_day
+    while day <= today and made < sales:
+        week_start = day - timedelta(days=day.weekday())
+        week_end = min(week_start + timedelta(days=6), today)
+        closed = week_start < current_week
+        week_sales = {}  # collaborator id -> [(sale row, item rows)]
+        week_advances = {}
+
+        while day <= week_end and made < sales:
+            count = min(sales - made, round(per_day * WEEKDAYS[day.weekday()] * rnd.uniform(0.8, 1.2)))
+            if day == today:
+                count = sales - made  # Land exactly on the requested size
+            times = sorted(datetime.combine(day, datetime.min.time())
+                           + timedelta(hours=_pick(rnd, HOURS.items()), minutes=rnd.randrange(60),
+                                       seconds=rnd.randrange(60))
+                           for _ in range(count))
+            for when in times:
+                sale_id += 1
+                cid = _pick(rnd, workload)
+                total = comm = 0.0
+                items = []
+                for _ in range(rnd.choices([1, 2, 3], [70, 25, 5])[0]):
+                    service = _pick(rnd, service_weights)
+                    _, price, _ = SERVICES[service - 1]
+                    unit_comm = round(price * commission[cid] / 100.0, 2)
+                    items.append({'service_id': service, 'product_id': None, 'item_name': SERVICES[service - 1][0],
+                                  'quantity': 1, 'price': price, 'commission': unit_comm})
+                if rnd.random() < 1 / 6:
+                    pid, name, price, fixed = rnd.choice(products)
+                    items.append({'service_id': None, 'product_id': pid, 'item_name': name,
+                                  'quantity': rnd.choices([1, 2], [85, 15])[0], 'price': price,
+                                  'commission': 0.0 if cid == 1 else fixed})
+                for item in items:
+                    item_id += 1
+                    item.update(id=item_id, sale_id=sale_id)
+                    total += item['price'] * item['quantity']
+                    comm += item['commission'] * item['quantity']
+                row = {'id': sale_id, 'collaborator_id': cid, 'date': when, 'total_amount': total,
+                       'total_commission': comm, 'payment_method': _pick(rnd, METHODS),
+                       'client_name': '' if rnd.random() < 0.3 else f'{rnd.choice(FIRST_NAMES)} {chr(65 + rnd.randrange(26))}.',
+                       'commission_paid': cid == 1, 'payment_record_id': None}
+                week_sales.setdefault(cid, []).append((row, items))
+            made += count
+
+            # Advances: about one every two weeks per barber
+            for cid, _, _ in team:
+                if WEEKDAYS[day.weekday()] and rnd.random() < 1 / 12:
+                    advance_id += 1
+                    week_advances.setdefault(cid, []).append({
+                        'id': advance_id, 'collaborator_id': cid, 'amount': float(rnd.choice([20, 50, 50, 100, 150, 200])),
+                        'description': 'Vale', 'date': day, 'is_paid': False, 'payment_record_id': None})
+
+            for description, category, amount, month_day in MONTHLY_EXPENSES:
+                if day.day == month_day:
+                    writer.add(Expense, {'description': description, 'category': category, 'date': day,
+                                         'amount': round(amount * rnd.uniform(0.85, 1.15), 2)})
+            if day.weekday() == 1:
+                writer.add(Expense, {'description': 'Reposição de produtos', 'category': 'Produtos', 'date': day,
+                                     'amount': round(rnd.uniform(150, 600), 2)})
+            if day.day == 1:
+                supplier = rnd.randint(1, len(SUPPLIERS))
+                writer.add(SupplierPayment, {'supplier_id': supplier, 'amount': round(rnd.uniform(300, 1500), 2),
+                                             'date': datetime.combine(day, datetime.min.time()) + timedelta(hours=10),
+                                             'description': 'Pagamento mensal'})
+            day += timedelta(days=1)
+
+        # Close the week: one payment per barber, like WeeklyPaymentView.confirm_all on Saturday night
+        for cid, _, _ in team:
+            lines, advances = week_sales.get(cid, []), week_advances.get(cid, [])
+            if closed and (lines or advances):
+                payment_id += 1
+                commission_total = sum(row['total_commission'] for row, _ in lines)
+                advance_total = sum(a['amount'] for a in advances)
+                for row, _ in lines:
+                    row.update(commission_paid=True, payment_record_id=payment_id)
+                for advance in advances:
+                    advance.update(is_paid=True, payment_record_id=payment_id)
+                writer.add(PaymentRecord, {
+                    'id': payment_id, 'collaborator_id': cid,
+                    'date': datetime.combine(week_start + timedelta(days=5), datetime.min.time()) + timedelta(hours=21),
+                    'start_date': min(row['date'] for row, _ in lines).date() if lines else week_start,
+                    'end_date': max(row['date'] for row, _ in lines).date() if lines else week_end,
+                    'total_commission': commission_total, 'total_advances': advance_total,
+                    'net_amount': commission_total - advance_total, 'admin_name': 'Administrador'})
+        writer.flush(PaymentRecord)
+        for cid in sorted(week_sales):
+            for row, items in week_sales[cid]:
+                writer.add(Sale, row)
+                for item in items:
+                    writer.add(SaleItem, item)
+        for advances in week_advances.values():
+            for advance in advances:
+                writer.add(CashAdvance, advance)
+        if made >= report:
+            out(f'  {made} vendas ({time.perf_counter() - start:.0f}s)')
+            report += 100_000
+    writer.flush()
+
+    # Suppliers owe what they were paid plus a remaining balance
+    paid = dict(db.session.query(SupplierPayment.supplier_id, db.func.sum(SupplierPayment.amount))
+                .group_by(SupplierPayment.supplier_id))
+    for supplier in Supplier.query:
+        balance = round(rnd.uniform(0, 3000), 2)
+        supplier.initial_debt = (paid.get(supplier.id) or 0.0) + balance
+        supplier.current_balance = balance
+    db.session.commit()
+
+    out('  Recalculando resumo diário, saldos e estoque...')
+    summary.rebuild()
+    balances.check(fix=True)
+    stock.check(opening=True)
+    return writer.counts
+
+
+def build(path, sales, collaborators=8, seed=42, out=print):
+    """Create a SQLite file at ``path`` with the app schema and synthetic data.
+
+    Creates its own app, so it can only be used once per process.
+    """
+    from app import create_app
+    from extensions import db
+    import migrations
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+    with app.app_context():
+        migrations.run(db.engine, out=lambda line: None)
+        return generate(sales=sales, collaborators=collaborators, seed=seed, out=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sales', type=int, default=100_000)
+    parser.add_argument('--collaborators', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite file to create (default: a temp file)')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'synthetic.db')
+    if os.path.exists(path):
+        os.remove(path)
+    print(f'Gerando {args.sales} vendas em {path}...')
+    start = time.perf_counter()
+    counts = build(path, args.sales, args.collaborators, args.seed)
+    print(f'Pronto em {time.perf_counter() - start:.1f}s: ' + ', '.join(f'{t}={n}' for t, n in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""Cache for the report aggregates of the admin screens.
+
+The dashboard and the financial control are left open on the front-desk
+screen and reloaded all day; their numbers only change when someone
+writes a sale, an expense, an advance or a supplier payment. ``fetch``
+keeps what a view computed under a key made of the view, its arguments
+(period, day) and the *generation* of every table the view reads:
+
+- a commit that wrote to a table bumps its generation (SQLAlchemy session
+  events, so ORM flushes and bulk ``insert``/``update``/``delete`` both
+  count), and the next load misses and recomputes; the entries of the old
+  generation are never read again and age out;
+- CACHE_TTL (seconds) bounds an entry's life anyway, e.g. writes made by
+  another process when the backend is per process; ``CACHE_TTL = 0``
+  turns caching off.
+
+Backends (CACHE_URL):
+
+- empty (default): ``LocalBackend``, an LRU dict inside the process. With
+  several gunicorn workers each one has its own entries and generations,
+  so a write is seen at once by the worker that made it and by the others
+  within CACHE_TTL;
+- ``sqlite:////var/cache/barbearia.db``: ``SqliteBackend``, a key-value
+  file shared by all the workers of the machine (generations included).
+
+A backend is any object with ``get``, ``set``, ``incr``, ``counters`` and
+``clear`` (see ``LocalBackend``).
+"""
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+TTL = 60
+MAX_ENTRIES = 512
+ALL_TABLES = '*'  # raw SQL writes: every table
+
+log = logging.getLogger('barbearia.cache')
+
+
+class LocalBackend:
+    """In-process LRU of MAX_ENTRIES entries with per-entry expiry."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires, value)
+        self.generations = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def incr(self, key):
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+
+    def counters(self, keys):
+        with self.lock:
+            return [self.generations.get(key, 0) for key in keys]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generations.clear()
+
+
+class SqliteBackend:
+    """Entries and generations in a SQLite file shared by the workers of one machine."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entry '
+                         '(key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_generation (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute('SELECT expires, value FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return pickle.loads(row[1])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO cache_entry (key, expires, value) VALUES (?, ?, ?)',
+                         (key, now + ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+            conn.execute('DELETE FROM cache_entry WHERE expires < ? OR key IN '
+                         '(SELECT key FROM cache_entry ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+                         (now, self.max_entries))
+
+    def incr(self, key):
+        with self._connection() as conn:
+            conn.execute('INSERT INTO cache_generation (key, value) VALUES (?, 1) '
+                         'ON CONFLICT(key) DO UPDATE SET value = value + 1', (key,))
+
+    def counters(self, keys):
+        rows = dict(self._connection().execute(
+            f'SELECT key, value FROM cache_generation WHERE key IN ({",".join("?" * len(keys))})', keys))
+        return [rows.get(key, 0) for key in keys]
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM cache_entry')
+            conn.execute('DELETE FROM cache_generation')
+
+
+def backend_from_url(url, max_entries=MAX_ENTRIES):
+    if not url:
+        return LocalBackend(max_entries)
+    if url.startswith('sqlite:///'):
+        return SqliteBackend(url[len('sqlite:///'):], max_entries)
+    raise ValueError(f'CACHE_URL não suportada: {url!r} (use vazio ou sqlite:///caminho)')
+
+
+backend = LocalBackend()
+
+
+def _generation_keys(tables):
+    return ['gen:' + ALL_TABLES] + ['gen:' + table for table in tables]
+
+
+def fetch(view, args, tables, compute):
+    """``compute()``'s value for ``view``/``args``, cached until one of ``tables`` is written.
+
+    ``args`` (a tuple of str/int/dates) tells entries of the same view apart,
+    ``tables`` are the names of the tables ``compute`` reads. The value must
+    be picklable (plain dicts, lists and numbers, not ORM objects).
+    """
+    ttl = current_app.config['CACHE_TTL']
+    if not ttl:
+        return compute()
+    generations = backend.counters(_generation_keys(tables))
+    key = ':'.join([view, *map(str, args), '.'.join(map(str, generations))])
+    value = backend.get(key)
+    if value is None:
+        value = compute()
+        backend.set(key, value, ttl)
+    return value
+
+
+def invalidate(tables):
+    """Drop every entry that reads one of ``tables`` (``ALL_TABLES`` for all)."""
+    for key in _generation_keys(()) if ALL_TABLES in tables else _generation_keys(tables)[1:]:
+        backend.incr(key)
+
+
+# --- Session events --------------------------------------------------------
+
+def _written(session):
+    return session.info.setdefault('cache_written', set())
+
+
+def _after_flush(session, flush_context):
+    written = _written(session)
+    for obj in session.new | session.deleted:
+        written.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            written.add(obj.__table__.name)
+
+
+def _do_orm_execute(state):
+    # Bulk insert/update/delete (services.balances, summary, sales...) bypass the flush
+    statement = state.statement
+    if isinstance(statement, UpdateBase):
+        _written(state.session).add(statement.table.name)
+    elif not state.is_select and not getattr(statement, 'is_select', False):
+        _written(state.session).add(ALL_TABLES)
+
+
+def _after_commit(session):
+    written = session.info.pop('cache_written', None)
+    if written:
+        try:
+            invalidate(written)
+        except Exception:
+            # The data is committed; an entry that outlives it expires with CACHE_TTL
+            log.exception('Falha ao invalidar o cache (%s)', ', '.join(sorted(written)))
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:  # Rolled back: nothing was written
+        session.info.pop('cache_written', None)
+
+
+def init_app(app, db):
+    """Pick the backend from CACHE_URL and watch the writes of ``db.session``."""
+    global backend
+    backend = backend_from_url(app.config['CACHE_URL'], app.config['CACHE_MAX_ENTRIES'])
+    event.listen(db.session, 'after_flush', _after_flush)
+    event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_transaction_end', _after_transaction_end)
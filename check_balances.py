@@ -0,0 +1,24 @@
+from app import create_app
+from services.balances import check
+import sys
+
+app = create_app()
+
+def check_balances(fix):
+    with app.app_context():
+        print("Conferindo saldos dos colaboradores...")
+        mismatches = check(fix=fix)
+
+        for collab, field, stored, expected in mismatches:
+            print(f"  {collab.name} ({collab.id}) {field}: gravado R$ {stored:.2f}, correto R$ {expected:.2f}")
+
+        if not mismatches:
+            print("SUCESSO: Todos os saldos conferem.")
+        elif fix:
+            print(f"CORRIGIDO: {len(mismatches)} valores recalculados.")
+        else:
+            print(f"ATENÇÃO: {len(mismatches)} divergências. Rode com --fix para corrigir.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    check_balances('--fix' in sys.argv[1:])
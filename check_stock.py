@@ -0,0 +1,27 @@
+from app import create_app
+from services.stock import check
+import sys
+
+app = create_app()
+
+def check_stock(fix, opening):
+    with app.app_context():
+        print("Conferindo estoque contra o histórico de movimentações...")
+        mismatches = check(fix=fix, opening=opening)
+
+        for product, stored, ledger in mismatches:
+            print(f"  {product.name} ({product.id}): estoque {stored}, histórico {ledger}")
+
+        if not mismatches:
+            print("SUCESSO: Todo o estoque confere.")
+        elif opening:
+            print(f"REGISTRADO: saldo inicial lançado para {len(mismatches)} produtos.")
+        elif fix:
+            print(f"CORRIGIDO: {len(mismatches)} produtos recalculados a partir do histórico.")
+        else:
+            print(f"ATENÇÃO: {len(mismatches)} divergências. Rode com --opening (primeira vez) ou --fix.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    check_stock('--fix' in args, '--opening' in args)
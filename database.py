@@ -0,0 +1,90 @@
+"""Engine settings for SQLite (the default) and MySQL.
+
+SQLite runs in WAL mode so the dashboards can read while a checkout is
+being written: readers no longer block the writer and the writer no
+longer blocks readers; only two writers wait for each other, up to
+``busy_timeout`` ms instead of failing at once with "database is locked".
+The pragmas are applied on every new connection (most of them only last
+for the connection) and can be changed through ``SQLITE_PRAGMAS``.
+
+For MySQL the pool is sized, connections are pinged before use and
+recycled before the server's wait_timeout drops them, and each session
+gets the lock wait and statement time limits from the config.
+"""
+from sqlalchemy import event
+
+# Applied in this order on every SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',       # Persistent: readers and the writer stop blocking each other
+    'busy_timeout': 5000,        # ms a writer waits for the lock before "database is locked"
+    'synchronous': 'NORMAL',     # Safe with WAL: a power cut can only lose the last commits
+    'cache_size': -20000,        # Negative = KiB, so ~20 MB of page cache per connection
+    'mmap_size': 268435456,      # Read the first 256 MB through memory mapping
+    'temp_store': 'MEMORY',      # Sorts/GROUP BY temp tables in RAM
+}
+
+POOL_SIZE = 10
+MAX_OVERFLOW = 20
+POOL_RECYCLE = 280  # Below MySQL's default wait_timeout on shared hosts (300s)
+
+
+def is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def engine_options(uri, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_recycle=POOL_RECYCLE,
+                   pool_pre_ping=True, lock_timeout=None, statement_timeout=0):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI.
+
+    ``lock_timeout`` and ``statement_timeout`` are in ms. SQLite has no
+    statement timeout; its lock wait is the busy_timeout pragma.
+    """
+    if is_sqlite(uri):
+        # pysqlite's lock wait (seconds), in force before init_app's pragmas run; the
+        # busy_timeout pragma then sets the same value again
+        if lock_timeout is None:
+            lock_timeout = SQLITE_PRAGMAS['busy_timeout']
+        return {'connect_args': {'timeout': lock_timeout / 1000}}
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+    }
+    if uri.startswith('mysql'):
+        session = []
+        if lock_timeout:
+            session.append(f'innodb_lock_wait_timeout={max(1, -(-lock_timeout // 1000))}')  # whole seconds
+        if statement_timeout:
+            session.append(f'max_execution_time={int(statement_timeout)}')  # SELECTs only
+        if session:
+            options['connect_args'] = {'init_command': 'SET SESSION ' + ', '.join(session)}
+    return options
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def tune_sqlite(engine, pragmas=None):
+    """Apply ``pragmas`` (default SQLITE_PRAGMAS) to every new connection of ``engine``."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def init_app(app, db):
+    """Tune the engines of ``db`` (call after ``db.init_app(app)``)."""
+    pragmas = dict(app.config['SQLITE_PRAGMAS'], busy_timeout=app.config['DB_LOCK_TIMEOUT'])
+    with app.app_context():
+        for engine in db.engines.values():
+            tune_sqlite(engine, pragmas)
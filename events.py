@@ -0,0 +1,240 @@
+"""Live updates of the front-desk screens (server-sent events).
+
+The dashboard and the financial control open ``/admin/live/`` with an
+EventSource and apply each event to the page instead of reloading it:
+
+- ``services.sales.register``/``unregister`` (checkout, VIP room, sale
+  deletion) call ``publish_sale``, which adds a LiveEvent row in the same
+  transaction as the sale, so an event exists exactly when its sale was
+  committed. The payload carries the sale row and the deltas of the KPIs
+  and of the payment-method totals;
+- each worker process runs one ``Broker`` thread, only while some screen
+  is connected to it, that reads the new rows every POLL_SECONDS (at once
+  after a commit in the same process) and hands them to its streams. The
+  database work is one indexed query per poll and per worker, however
+  many screens are open or however often they would have reloaded, and
+  events written by any worker reach every screen;
+- a page renders the id of the newest event next to its numbers (``head``)
+  and subscribes from there, so nothing committed between the render and
+  the subscription is lost. A stream ends after LIVE_STREAM_SECONDS and
+  the browser reconnects from the last id it got (Last-Event-ID). A screen
+  that fell more than BUFFER events behind gets a ``reload`` event.
+
+Each open stream holds one server thread: keep WEB_THREADS above the
+number of screens left open on these pages.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func
+
+from extensions import db
+from models import LiveEvent, SaleItem
+
+POLL_SECONDS = 1.0
+KEEPALIVE_SECONDS = 15
+STREAM_SECONDS = 300
+BUFFER = 500       # events kept by the broker for slow streams
+LOOKBACK = 50      # ids re-read on each poll: on MySQL a lower id may commit after a higher one
+KEEP_HOURS = 24    # older events are deleted by the broker
+PRUNE_SECONDS = 3600
+
+log = logging.getLogger('barbearia.events')
+
+
+def head():
+    """Id of the newest event (0 when there are none)."""
+    return db.session.query(func.max(LiveEvent.id)).scalar() or 0
+
+
+def publish(kind, data):
+    """Queue an event in the current transaction; it is delivered if the transaction commits."""
+    db.session.add(LiveEvent(kind=kind, data=json.dumps(data)))
+    db.session.info['live_events'] = True
+
+
+def publish_sale(sale, collaborator, sign=1):
+    """A sale was registered (sign=1) or is about to be deleted (sign=-1)."""
+    items = db.session.query(SaleItem.item_name, SaleItem.quantity).filter(SaleItem.sale_id == sale.id)
+    total = sign * (sale.total_amount or 0.0)
+    commission = 0.0 if collaborator.is_owner else sign * (sale.total_commission or 0.0)
+    publish('sale' if sign > 0 else 'sale_deleted', {
+        'id': sale.id,
+        'date': sale.date.isoformat(timespec='seconds'),
+        'time': sale.date.strftime('%H:%M'),
+        'client_name': sale.client_name or '',
+        'collaborator_id': collaborator.id,
+        'collaborator': collaborator.name,
+        'is_owner': bool(collaborator.is_owner),
+        'payment_method': sale.payment_method,
+        'total_amount': sale.total_amount or 0.0,
+        'items': [[name, quantity or 1] for name, quantity in items],
+        # Changes to the screens' numbers, as computed by services.reports
+        'delta': {
+            'revenue': total,
+            'vip_revenue': total if collaborator.is_owner else 0.0,
+            'team_revenue': 0.0 if collaborator.is_owner else total,
+            'commission': commission,
+            'services': sign,
+            'net_profit': total - commission,
+        },
+    })
+
+
+class Broker:
+    """Polls LiveEvent for one worker process and fans the rows out to its streams."""
+
+    def __init__(self):
+        self.app = None
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=BUFFER)  # (seq, id, kind, data)
+        self.seq = 0
+        self.last_id = 0
+        self.window = set()  # ids read by the last poll
+        self.primed = False
+        self.subscribers = 0
+        self.thread = None
+        self.stop = None
+        self.wake = threading.Event()
+        self.pruned = time.time()  # First prune an hour after the process started
+
+    def subscribe(self):
+        """Register a stream; returns the sequence number it starts after."""
+        with self.cond:
+            self.subscribers += 1
+            if self.thread is None:
+                self.last_id = head()
+                self.window, self.primed = set(), False
+                self.wake.clear()  # Commits before now are covered by last_id
+                self.stop = threading.Event()
+                self.thread = threading.Thread(target=self._run, args=(self.stop,), name='live-events', daemon=True)
+                self.thread.start()
+            return self.seq
+
+    def unsubscribe(self):
+        """Unregister a stream; the last one stops the thread and gets it back to join."""
+        with self.cond:
+            self.subscribers -= 1
+            if self.subscribers or self.thread is None:
+                return None
+            thread, self.thread = self.thread, None
+            self.stop.set()
+            self.wake.set()
+            return thread
+
+    def _fetch(self):
+        with self.app.app_context():
+            rows = db.session.query(LiveEvent.id, LiveEvent.kind, LiveEvent.data)\
+                .filter(LiveEvent.id > self.last_id - LOOKBACK)\
+                .order_by(LiveEvent.id).limit(BUFFER + LOOKBACK).all()
+            if time.time() - self.pruned > PRUNE_SECONDS:
+                self.pruned = time.time()
+                db.session.query(LiveEvent)\
+                    .filter(LiveEvent.created_at < datetime.utcnow() - timedelta(hours=KEEP_HOURS))\
+                    .delete(synchronize_session=False)
+                db.session.commit()
+        return rows
+
+    def _run(self, stop):
+        # ``stop`` belongs to this thread: a stream opened after it was set starts a new one
+        while True:
+            self.wake.wait(POLL_SECONDS)
+            self.wake.clear()
+            if stop.is_set():
+                return
+            try:
+                rows = self._fetch()
+            except Exception:
+                log.exception('Falha ao ler os eventos ao vivo')
+                stop.wait(POLL_SECONDS)
+                continue
+            with self.cond:
+                if stop.is_set():
+                    return
+                # Past the newest id, or a late commit inside the look-back window
+                new = [row for row in rows
+                       if row[0] not in self.window and (row[0] > self.last_id or self.primed)]
+                self.window = {row[0] for row in rows}
+                self.primed = True
+                for event_id, kind, data in new:
+                    self.seq += 1
+                    self.events.append((self.seq, event_id, kind, data))
+                    self.last_id = max(self.last_id, event_id)
+                if new:
+                    self.cond.notify_all()
+
+    def after(self, seq):
+        """Events queued after ``seq`` (None when some were already dropped from the buffer)."""
+        if self.events and self.events[0][0] > seq + 1:
+            return None
+        return [e for e in self.events if e[0] > seq]
+
+
+broker = Broker()
+
+
+def _sse(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+def stream(since):
+    """SSE text for the events after id ``since``, for LIVE_STREAM_SECONDS."""
+    deadline = time.monotonic() + current_app.config['LIVE_STREAM_SECONDS']
+    seq = broker.subscribe()
+    try:
+        yield 'retry: 3000\n\n'
+        # What was committed before the subscription; later events come from the broker
+        missed = db.session.query(LiveEvent.id, LiveEvent.kind, LiveEvent.data)\
+            .filter(LiveEvent.id > since).order_by(LiveEvent.id).limit(BUFFER + 1).all()
+        db.session.remove()  # Do not hold a connection for the life of the stream
+        if len(missed) > BUFFER:
+            yield _sse(since, 'reload', '{}')
+            return
+        sent = set()
+        for event_id, kind, data in missed:
+            sent.add(event_id)
+            yield _sse(event_id, kind, data)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            with broker.cond:
+                broker.cond.wait_for(lambda: broker.seq > seq, timeout=min(KEEPALIVE_SECONDS, remaining))
+                events = broker.after(seq)
+                seq = broker.seq
+            if events is None:
+                yield _sse(max(sent, default=since), 'reload', '{}')
+                return
+            if not events:
+                yield ': ping\n\n'
+            for _, event_id, kind, data in events:
+                if event_id not in sent and event_id > since:
+                    sent.add(event_id)
+                    yield _sse(event_id, kind, data)
+    finally:
+        thread = broker.unsubscribe()
+        if thread is not None:
+            thread.join()  # At most one poll in flight; no statement outlives the request
+
+
+def _after_commit(session):
+    if session.info.pop('live_events', False):
+        broker.wake.set()
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('live_events', None)
+
+
+def init_app(app, db):
+    """Give the broker ``app`` (for its own app context) and wake it on local commits."""
+    broker.app = app
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_transaction_end', _after_transaction_end)
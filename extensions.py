@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_admin import Admin
+from replica import RoutingSession
 
 # Initialize extensions here to avoid circular imports and dual-instance issues
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 admin = Admin(name='Barbearia JoeFelipe')
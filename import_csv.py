@@ -0,0 +1,49 @@
+from app import create_app
+from services import importer
+import argparse
+import csv
+import os
+import sys
+import time
+
+app = create_app()
+
+def import_csv(kind, path, chunk_size, restart):
+    checkpoint = path + '.checkpoint'
+    if restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    with app.app_context():
+        print(f"Importando {importer.KINDS[kind]} de {path}...")
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            try:
+                result = importer.run(kind, f, chunk_size=chunk_size, checkpoint=checkpoint)
+            except ValueError as e:
+                print(f"ERRO: {e}")
+                sys.exit(1)
+
+        if result.resumed_from:
+            print(f"  Retomado após a linha {result.resumed_from}.")
+        print("  Atualizando resumo diário e saldos...")
+        importer.finish(kind)
+        print(f"SUCESSO: {result.inserted} registros importados em {time.perf_counter() - start:.1f}s.")
+
+        if result.errors:
+            errors_path = path + '.erros.csv'
+            with open(errors_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['linha', 'erro'])
+                writer.writerows(result.errors)
+            for line, message in result.errors[:20]:
+                print(f"  linha {line}: {message}")
+            print(f"ATENÇÃO: {result.skipped} linhas ignoradas. Lista completa em {errors_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa histórico de vendas, despesas ou produtos de um CSV.")
+    parser.add_argument('kind', choices=sorted(importer.KINDS))
+    parser.add_argument('path')
+    parser.add_argument('--chunk', type=int, default=importer.CHUNK_SIZE, help="linhas por transação")
+    parser.add_argument('--restart', action='store_true', help="ignora o ponto de retomada salvo")
+    args = parser.parse_args()
+    import_csv(args.kind, args.path, args.chunk, args.restart)
@@ -0,0 +1,196 @@
+"""Per-request timing: wall time, SQL statements, SQL time and template time.
+
+``init_app`` hooks SQLAlchemy's cursor events on every engine and Flask's
+template signals, and records each request under its endpoint once its
+body has been sent (a streamed CSV export runs most of its SQL there):
+
+- requests slower than SLOW_REQUEST_MS are logged (logger ``barbearia.slow``)
+  with their slowest statements and the statements repeated most often,
+  which is how an N+1 loop shows up;
+- ``metrics_text`` renders the aggregates (p50/p90/p99 over the last
+  SAMPLES requests of each endpoint, plus totals) in the Prometheus text
+  format, served by the admin at /admin/metrics;
+- with METRICS_HEADER on (or in debug mode) every response gets
+  ``X-Debug-Queries: count=12; sql_ms=3.1; template_ms=8.0; total_ms=25.4``.
+
+Aggregates live in the process: with several gunicorn workers each one
+reports its own requests.
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+SLOW_REQUEST_MS = 500
+SAMPLES = 1000      # latencies kept per endpoint for the percentiles
+TOP_QUERIES = 5
+QUANTILES = (0.5, 0.9, 0.99)
+SKIP_ENDPOINTS = {'static', 'metrics.index', 'live.index'}  # live.index streams for minutes
+
+slow_log = logging.getLogger('barbearia.slow')
+
+
+class _Endpoint:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.samples = {name: deque(maxlen=SAMPLES) for name in ('seconds', 'queries', 'sql_seconds', 'template_seconds')}
+
+    def add(self, seconds, queries, sql_seconds, template_seconds):
+        self.count += 1
+        for name, value in (('seconds', seconds), ('queries', queries), ('sql_seconds', sql_seconds),
+                            ('template_seconds', template_seconds)):
+            setattr(self, name, getattr(self, name) + value)
+            self.samples[name].append(value)
+
+
+class Registry:
+    """Thread-safe per-endpoint aggregates."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, queries, sql_seconds, template_seconds):
+        with self.lock:
+            self.endpoints.setdefault(endpoint, _Endpoint()).add(seconds, queries, sql_seconds, template_seconds)
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def snapshot(self):
+        """``{endpoint: (count, totals, {metric: sorted samples})}`` copied under the lock."""
+        with self.lock:
+            return {name: (e.count,
+                           {'seconds': e.seconds, 'queries': e.queries, 'sql_seconds': e.sql_seconds,
+                            'template_seconds': e.template_seconds},
+                           {metric: sorted(values) for metric, values in e.samples.items()})
+                    for name, e in self.endpoints.items()}
+
+
+registry = Registry()
+
+
+def _quantile(values, q):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+# name: (help, metric in the samples/totals)
+METRICS = {
+    'barbearia_request_seconds': ('Tempo total da requisição por endpoint', 'seconds'),
+    'barbearia_request_queries': ('Comandos SQL por requisição', 'queries'),
+    'barbearia_request_sql_seconds': ('Tempo em SQL por requisição', 'sql_seconds'),
+    'barbearia_request_template_seconds': ('Tempo renderizando templates por requisição', 'template_seconds'),
+}
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_text():
+    """The aggregates in the Prometheus text exposition format."""
+    data = registry.snapshot()
+    lines = []
+    for name, (help_text, metric) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} summary')
+        for endpoint in sorted(data):
+            count, totals, samples = data[endpoint]
+            label = f'endpoint="{_label(endpoint)}"'
+            for q in QUANTILES:
+                lines.append(f'{name}{{{label},quantile="{q}"}} {_quantile(samples[metric], q):.6g}')
+            lines.append(f'{name}_sum{{{label}}} {totals[metric]:.6g}')
+            lines.append(f'{name}_count{{{label}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Hooks ---------------------------------------------------------------
+
+def _current():
+    return g.get('_instrumentation') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current()
+    started = getattr(context, '_instrumentation_start', None)
+    if current is not None and started is not None:
+        current['queries'].append((statement, time.perf_counter() - started))
+
+
+def _before_render(sender, template, context, **extra):
+    current = _current()
+    if current is not None:
+        current['render_start'].append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    current = _current()
+    if current is not None and current['render_start']:
+        elapsed = time.perf_counter() - current['render_start'].pop()
+        if not current['render_start']:  # A render started inside another one counts once
+            current['template_seconds'] += elapsed
+
+
+def _slow_report(name, seconds, queries):
+    repeated = Counter(statement for statement, _ in queries).most_common(TOP_QUERIES)
+    slowest = sorted(queries, key=lambda q: q[1], reverse=True)[:TOP_QUERIES]
+    lines = [f'{name} {seconds * 1000:.0f} ms, '
+             f'{len(queries)} comandos SQL, {sum(t for _, t in queries) * 1000:.0f} ms em SQL']
+    lines += [f'  {t * 1000:8.1f} ms  {" ".join(statement.split())[:300]}' for statement, t in slowest]
+    lines += [f'  {n:5d}x repetido  {" ".join(statement.split())[:300]}' for statement, n in repeated if n > 1]
+    return '\n'.join(lines)
+
+
+def init_app(app, db):
+    """Register the hooks on ``app`` and on the engines of ``db``."""
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def start_timer():
+        g._instrumentation = {'start': time.perf_counter(), 'queries': [], 'render_start': [],
+                              'template_seconds': 0.0}
+
+    def record(endpoint, name, current):
+        seconds = time.perf_counter() - current['start']
+        queries = current['queries']
+        registry.record(endpoint, seconds, len(queries), sum(t for _, t in queries), current['template_seconds'])
+        if seconds * 1000 >= app.config['SLOW_REQUEST_MS']:
+            slow_log.warning(_slow_report(name, seconds, queries))
+
+    @app.after_request
+    def finish(response):
+        current = g.get('_instrumentation')
+        endpoint = request.endpoint or 'desconhecido'
+        if current is None or endpoint in SKIP_ENDPOINTS:
+            return response
+        if app.config['METRICS_HEADER'] or app.debug:
+            # Sent before the body: a streamed response (CSV exports) runs most of its SQL later
+            queries = current['queries']
+            response.headers['X-Debug-Queries'] = (
+                f'count={len(queries)}; sql_ms={sum(t for _, t in queries) * 1000:.1f}; '
+                f'template_ms={current["template_seconds"] * 1000:.1f}; '
+                f'total_ms={(time.perf_counter() - current["start"]) * 1000:.1f}')
+        # Recorded once the body has been sent, so a streamed body's statements count too
+        name = f'{request.method} {request.path} ({endpoint})'
+        response.call_on_close(lambda: record(endpoint, name, current))
+        return response
@@ -0,0 +1,34 @@
+from app import create_app
+from extensions import db
+import migrations
+import argparse
+
+app = create_app()
+
+def migrate(dry_run, status):
+    with app.app_context():
+        print(f"Banco: {db.engine.url.render_as_string(hide_password=True)}")
+        todo = migrations.pending(db.engine)
+
+        if status:
+            done = migrations.applied_versions(db.engine)
+            for version, name, _, _ in sorted(migrations.STEPS):
+                print(f"  [{'x' if version in done else ' '}] {version:03d} {name}")
+            return
+
+        if not todo:
+            print("SUCESSO: O banco já está na versão mais recente.")
+            return
+
+        applied = migrations.run(db.engine, dry_run=dry_run)
+        if dry_run:
+            print(f"SIMULAÇÃO: {len(applied)} passos pendentes. Nada foi alterado.")
+        else:
+            print(f"SUCESSO: {len(applied)} passos aplicados.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica as migrações pendentes do banco de dados.")
+    parser.add_argument('--dry-run', action='store_true', help="mostra o que seria feito sem alterar o banco")
+    parser.add_argument('--status', action='store_true', help="lista os passos e quais já foram aplicados")
+    args = parser.parse_args()
+    migrate(args.dry_run, args.status)
@@ -0,0 +1,312 @@
+"""Versioned schema migrations (run with ``python migrate.py``).
+
+Every step has a version number and runs once: applied versions are
+recorded in the ``schema_version`` table. Steps are written to be
+idempotent (they check the live schema before touching it), so a
+database that was kept up to date with the old one-off migrate_*.py
+scripts simply gets every step recorded without changes, and a step that
+failed half-way (MySQL commits DDL implicitly) can be run again.
+
+Plain steps run in one transaction together with their version record.
+Steps marked ``chunked`` manage their own transactions: index builds
+commit one index at a time and backfills update ``chunk_size`` rows per
+transaction, so a large production table is never locked for the whole
+migration. With ``dry_run`` nothing is written; every pending change is
+printed instead.
+
+Works on SQLite and MySQL through the app's SQLAlchemy engine.
+"""
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+
+# (index name, table, columns) - keep in sync with __table_args__ in models.py
+INDEXES = [
+    ('ix_sale_collaborator_paid', 'sale', 'collaborator_id, commission_paid'),
+    ('ix_sale_collaborator_date', 'sale', 'collaborator_id, date'),
+    ('ix_sale_method_date', 'sale', 'payment_method, date'),
+    ('ix_sale_date', 'sale', 'date'),
+    ('ix_sale_payment_record', 'sale', 'payment_record_id'),
+    ('ix_sale_item_sale', 'sale_item', 'sale_id'),
+    ('ix_cash_advance_collaborator_paid', 'cash_advance', 'collaborator_id, is_paid'),
+    ('ix_cash_advance_payment_record', 'cash_advance', 'payment_record_id'),
+    ('ix_payment_record_collaborator_date', 'payment_record', 'collaborator_id, date'),
+]
+
+CHUNK_SIZE = 5000
+
+STEPS = []
+
+
+def step(version, name, chunked=False):
+    def register(fn):
+        STEPS.append((version, name, chunked, fn))
+        return fn
+    return register
+
+
+class Migrator:
+    """Schema helpers bound to an engine (and to the step's transaction)."""
+
+    def __init__(self, engine, dry_run=False, out=print, chunk_size=CHUNK_SIZE):
+        self.engine = engine
+        self.dry_run = dry_run
+        self.out = out
+        self.chunk_size = chunk_size
+        self.conn = None  # Set while a plain (transactional) step runs
+
+    @property
+    def dialect(self):
+        return self.engine.dialect.name
+
+    def _inspector(self):
+        # A fresh inspector each time: earlier statements may have changed the schema
+        return inspect(self.conn if self.conn is not None else self.engine)
+
+    def has_table(self, table):
+        return self._inspector().has_table(table)
+
+    def has_column(self, table, column):
+        if not self.has_table(table):
+            return True  # Created from the models, with every column, by step 1
+        return column in {c['name'] for c in self._inspector().get_columns(table)}
+
+    def has_index(self, table, name):
+        if not self.has_table(table):
+            return True
+        return name in {i['name'] for i in self._inspector().get_indexes(table)}
+
+    def execute(self, sql, **params):
+        self.out(f'    {" ".join(sql.split())}')
+        if self.dry_run:
+            return None
+        if self.conn is not None:
+            return self.conn.execute(text(sql), params)
+        with self.engine.begin() as conn:
+            return conn.execute(text(sql), params)
+
+    def add_column(self, table, column, ddl):
+        """ALTER TABLE ADD COLUMN unless the column exists. ``ddl`` is type + options."""
+        if not self.has_column(table, column):
+            self.execute(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+
+    def create_index(self, name, table, columns):
+        if self.has_index(table, name):
+            return
+        online = ' ALGORITHM=INPLACE LOCK=NONE' if self.dialect == 'mysql' else ''
+        self.execute(f'CREATE INDEX {name} ON {table} ({columns}){online}')
+
+    def create_tables(self):
+        """Create the model tables that do not exist yet (with their indexes)."""
+        missing = [t for t in db.metadata.sorted_tables if not self.has_table(t.name)]
+        for table in missing:
+            self.out(f'    CREATE TABLE {table.name}')
+        if missing and not self.dry_run:
+            db.metadata.create_all(self.conn if self.conn is not None else self.engine, tables=missing)
+
+    def analyze(self, tables):
+        if self.dialect == 'mysql':
+            self.execute(f"ANALYZE TABLE {', '.join(tables)}")
+        else:
+            self.execute('ANALYZE')
+
+    def backfill(self, table, assignment, where):
+        """UPDATE ``table`` SET ``assignment`` WHERE ``where`` in id ranges of chunk_size."""
+        if not self.has_table(table):
+            return
+        with self.engine.connect() as conn:
+            low, high, count = conn.execute(text(
+                f'SELECT MIN(id), MAX(id), COUNT(*) FROM {table} WHERE {where}')).one()
+        if not count:
+            return
+        self.out(f'    UPDATE {table} SET {assignment} WHERE {where}  -- {count} linhas, '
+                 f'{self.chunk_size} por transação')
+        if self.dry_run:
+            return
+        for start in range(low, high + 1, self.chunk_size):
+            with self.engine.begin() as conn:
+                conn.execute(text(f'UPDATE {table} SET {assignment} '
+                                  f'WHERE id >= :start AND id < :end AND ({where})'),
+                             {'start': start, 'end': start + self.chunk_size})
+
+
+# --- Steps (append only; never renumber) ---------------------------------
+
+@step(1, 'Tabelas do sistema')
+def create_missing_tables(m):
+    m.create_tables()
+
+
+@step(2, 'Venda: cliente e forma de pagamento')
+def sale_client_and_method(m):
+    m.add_column('sale', 'client_name', 'VARCHAR(100)')
+    m.add_column('sale', 'payment_method', "VARCHAR(50) DEFAULT 'Dinheiro'")
+
+
+@step(3, 'Colaborador: proprietário (Sala VIP)')
+def collaborator_owner(m):
+    m.add_column('collaborator', 'is_owner', 'BOOLEAN DEFAULT 0')
+
+
+@step(4, 'Venda: comissão paga')
+def sale_commission_paid(m):
+    m.add_column('sale', 'commission_paid', 'BOOLEAN DEFAULT 0')
+
+
+@step(5, 'Colaborador: senha')
+def collaborator_password(m):
+    m.add_column('collaborator', 'password_hash', 'VARCHAR(128)')
+
+
+@step(6, 'Notas: vínculo com vendas e vales')
+def payment_record_links(m):
+    m.add_column('sale', 'payment_record_id', 'INTEGER')
+    m.add_column('cash_advance', 'payment_record_id', 'INTEGER')
+
+
+@step(7, 'Produto: custo, fornecedor, comissão fixa e estoque')
+def product_columns(m):
+    m.add_column('product', 'cost_price', 'FLOAT DEFAULT 0.0')
+    m.add_column('product', 'supplier_id', 'INTEGER')
+    m.add_column('product', 'collaborator_id', 'INTEGER')
+    m.add_column('product', 'commission_fixed_value', 'FLOAT DEFAULT 0.0')
+    m.add_column('product', 'quantity', 'INTEGER DEFAULT 0')
+
+
+@step(8, 'Item de venda: quantidade')
+def sale_item_quantity(m):
+    m.add_column('sale_item', 'quantity', 'INTEGER NOT NULL DEFAULT 1')
+
+
+@step(9, 'Índices compostos de vendas, vales e notas', chunked=True)
+def composite_indexes(m):
+    # One statement (and one commit) per index
+    for name, table, columns in INDEXES:
+        m.create_index(name, table, columns)
+    m.analyze(sorted({table for _, table, _ in INDEXES}))
+
+
+@step(10, 'Colaborador: saldos acumulados')
+def collaborator_balances(m):
+    added = False
+    for column in ('unpaid_commission', 'total_earnings', 'outstanding_advances'):
+        if not m.has_column('collaborator', column):
+            m.add_column('collaborator', column, 'FLOAT DEFAULT 0.0')
+            added = True
+    if added:
+        m.execute("""
+            UPDATE collaborator SET
+                total_earnings = (SELECT COALESCE(SUM(total_commission), 0) FROM sale
+                                  WHERE sale.collaborator_id = collaborator.id),
+                unpaid_commission = (SELECT COALESCE(SUM(total_commission), 0) FROM sale
+                                     WHERE sale.collaborator_id = collaborator.id AND sale.commission_paid = 0),
+                outstanding_advances = (SELECT COALESCE(SUM(amount), 0) FROM cash_advance
+                                        WHERE cash_advance.collaborator_id = collaborator.id AND cash_advance.is_paid = 0)
+        """)
+
+
+@step(11, 'Item de venda: quantidade nula em itens antigos', chunked=True)
+def sale_item_quantity_backfill(m):
+    if not m.has_column('sale_item', 'quantity'):
+        return  # Dry run: step 8 adds it NOT NULL DEFAULT 1, nothing to fill
+    m.backfill('sale_item', 'quantity = 1', 'quantity IS NULL')
+
+
+@step(12, 'Resumo diário de vendas', chunked=True)
+def daily_summary(m):
+    from models import DailySummary, Sale
+    from services import summary
+    if m.dry_run and not m.has_table('daily_summary'):
+        m.out('    summary.rebuild()')
+        return
+    if DailySummary.query.first() is not None or Sale.query.first() is None:
+        return  # Already filled (kept up to date by the app) or nothing to summarize
+    m.out('    summary.rebuild()')
+    if not m.dry_run:
+        summary.rebuild()
+
+
+@step(13, 'Estoque: saldo inicial do histórico de movimentações', chunked=True)
+def stock_opening(m):
+    from models import StockMovement
+    from services import stock
+    if m.dry_run and not m.has_table('stock_movement'):
+        m.out('    stock.check(opening=True)')
+        return
+    if StockMovement.query.first() is not None:
+        return
+    m.out('    stock.check(opening=True)')
+    if not m.dry_run:
+        stock.check(opening=True)
+
+
+@step(14, 'Comprovantes congelados: LONGTEXT no MySQL')
+def receipt_snapshot_longtext(m):
+    # TEXT holds 64 KB on MySQL; SQLite's TEXT has no limit
+    if m.dialect != 'mysql' or not m.has_table('receipt_snapshot'):
+        return
+    for column in ('data', 'html_admin', 'html_collab'):
+        m.execute(f'ALTER TABLE receipt_snapshot MODIFY {column} LONGTEXT NOT NULL')
+
+
+@step(15, 'Eventos do painel ao vivo')
+def live_events(m):
+    m.create_tables()
+
+
+# --- Runner ----------------------------------------------------------------
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        if not inspect(conn).has_table('schema_version'):
+            conn.execute(text('CREATE TABLE schema_version ('
+                              'version INTEGER NOT NULL PRIMARY KEY, '
+                              'name VARCHAR(200) NOT NULL, '
+                              'applied_at DATETIME NOT NULL)'))
+
+
+def applied_versions(engine):
+    with engine.connect() as conn:
+        if not inspect(conn).has_table('schema_version'):
+            return set()
+        return {v for (v,) in conn.execute(text('SELECT version FROM schema_version'))}
+
+
+def pending(engine):
+    done = applied_versions(engine)
+    return [s for s in sorted(STEPS, key=lambda s: s[0]) if s[0] not in done]
+
+
+def _record(conn, version, name):
+    conn.execute(text('INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :at)'),
+                 {'v': version, 'n': name, 'at': datetime.utcnow()})
+
+
+def run(engine, dry_run=False, out=print, chunk_size=CHUNK_SIZE):
+    """Apply the pending steps in order; returns the versions applied (or due, on dry run).
+
+    Must run inside an app context (data steps use the models).
+    """
+    if not dry_run:
+        _ensure_version_table(engine)
+    m = Migrator(engine, dry_run=dry_run, out=out, chunk_size=chunk_size)
+    done = []
+    for version, name, chunked, fn in pending(engine):
+        out(f'[{version:03d}] {name}' + (' (simulação)' if dry_run else ''))
+        if dry_run or chunked:
+            fn(m)
+            if not dry_run:
+                with engine.begin() as conn:
+                    _record(conn, version, name)
+        else:
+            with engine.begin() as conn:
+                m.conn = conn
+                try:
+                    fn(m)
+                    _record(conn, version, name)
+                finally:
+                    m.conn = None
+        done.append(version)
+    return done
@@ -1,5 +1,9 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+# MySQL's TEXT stops at 64 KB; a receipt with hundreds of lines is bigger
+LongText = db.Text().with_variant(LONGTEXT(), 'mysql')
 
 class User(db.Model):
     """Admin user for the owner"""
@@ -22,6 +26,11 @@ class Collaborator(db.Model):
     token = db.Column(db.String(100), unique=True) # For Magic Link/QR Code
     password_hash = db.Column(db.String(128))
 
+    # Running totals maintained by services/balances.py
+    unpaid_commission = db.Column(db.Float, default=0.0)
+    total_earnings = db.Column(db.Float, default=0.0)
+    outstanding_advances = db.Column(db.Float, default=0.0)
+
     def set_password(self, password):
         from werkzeug.security import generate_password_hash
         self.password_hash = generate_password_hash(password)
@@ -34,11 +43,8 @@ class Collaborator(db.Model):
 
     @property
     def balance(self):
-        # Commissions
-        total_comm = sum(s.total_commission for s in self.sales if not s.commission_paid)
-        # Advances
-        total_adv = sum(a.amount for a in self.advances if not a.is_paid)
-        return total_comm - total_adv
+        # Unpaid commissions minus open advances (running totals, no history scan)
+        return (self.unpaid_commission or 0.0) - (self.outstanding_advances or 0.0)
 
     def __repr__(self):
         return f'<Collaborator {self.name}>'
@@ -73,6 +79,14 @@ class Product(db.Model):
 
 class Sale(db.Model):
     """Record of a service/product sale"""
+    __table_args__ = (
+        db.Index('ix_sale_collaborator_paid', 'collaborator_id', 'commission_paid'),
+        db.Index('ix_sale_collaborator_date', 'collaborator_id', 'date'),
+        db.Index('ix_sale_method_date', 'payment_method', 'date'),
+        db.Index('ix_sale_date', 'date'),
+        db.Index('ix_sale_payment_record', 'payment_record_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     collaborator_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=False)
     collaborator = db.relationship('Collaborator', backref=db.backref('sales', cascade='all, delete-orphan'))
@@ -91,6 +105,10 @@ class Sale(db.Model):
 
 class SaleItem(db.Model):
     """Individual items in a sale"""
+    __table_args__ = (
+        db.Index('ix_sale_item_sale', 'sale_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=False)
     
@@ -102,8 +120,17 @@ class SaleItem(db.Model):
     product = db.relationship('Product')
     
     item_name = db.Column(db.String(100)) # Snapshot of name
-    price = db.Column(db.Float) # Snapshot of price at time of sale
-    commission = db.Column(db.Float) # Calculated commission for this item
+    quantity = db.Column(db.Integer, default=1, nullable=False)
+    price = db.Column(db.Float) # Snapshot of unit price at time of sale
+    commission = db.Column(db.Float) # Calculated commission per unit
+
+    @property
+    def line_total(self):
+        return (self.price or 0.0) * (self.quantity or 1)
+
+    @property
+    def line_commission(self):
+        return (self.commission or 0.0) * (self.quantity or 1)
 
 class Expense(db.Model):
     """Operational Expenses"""
@@ -118,6 +145,11 @@ class Expense(db.Model):
 
 class CashAdvance(db.Model):
     """Vales/Adiantamentos"""
+    __table_args__ = (
+        db.Index('ix_cash_advance_collaborator_paid', 'collaborator_id', 'is_paid'),
+        db.Index('ix_cash_advance_payment_record', 'payment_record_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     collaborator_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=False)
     collaborator = db.relationship('Collaborator', backref=db.backref('advances', cascade='all, delete-orphan'))
@@ -131,6 +163,10 @@ class CashAdvance(db.Model):
 
 class PaymentRecord(db.Model):
     """Comprovante de Pagamento Semanal"""
+    __table_args__ = (
+        db.Index('ix_payment_record_collaborator_date', 'collaborator_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     collaborator_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=False)
     collaborator = db.relationship('Collaborator', backref=db.backref('payments', cascade='all, delete-orphan'))
@@ -167,3 +203,56 @@ class SupplierPayment(db.Model):
     description = db.Column(db.String(200)) # Opcional
 
 
+
+class DailySummary(db.Model):
+    """Resumo diário de vendas (dia x colaborador x forma de pagamento)"""
+    __table_args__ = (
+        db.UniqueConstraint('day', 'collaborator_id', 'payment_method', 'is_owner', name='uq_daily_summary_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    collaborator_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=False)
+    collaborator = db.relationship('Collaborator', backref=db.backref('daily_summaries', cascade='all, delete-orphan'))
+    payment_method = db.Column(db.String(50))
+    is_owner = db.Column(db.Boolean, default=False) # collaborator.is_owner (rows rebuilt when it changes)
+
+    sale_count = db.Column(db.Integer, default=0)
+    total_amount = db.Column(db.Float, default=0.0)
+    total_commission = db.Column(db.Float, default=0.0)
+
+class StockMovement(db.Model):
+    """Movimentação de Estoque (entrada/saída de produtos)"""
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_date', 'product_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    product = db.relationship('Product', backref=db.backref('movements', lazy=True, cascade='all, delete-orphan'))
+    quantity = db.Column(db.Integer, nullable=False) # Positive = entrada, negative = saída
+    reason = db.Column(db.String(50), nullable=False) # venda, estorno, compra, ajuste, saldo inicial
+    sale_id = db.Column(db.Integer, nullable=True) # Sale that caused it (kept after the sale is deleted)
+    date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StockMovement {self.product_id} {self.quantity:+d}>'
+
+class LiveEvent(db.Model):
+    """Evento do painel ao vivo (venda registrada ou excluída), lido pelo stream SSE (ver events.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.Text, nullable=False) # JSON
+
+class ReceiptSnapshot(db.Model):
+    """Cópia congelada de um comprovante (dados + HTML de cada via)"""
+    id = db.Column(db.Integer, primary_key=True)
+    payment_record_id = db.Column(db.Integer, db.ForeignKey('payment_record.id'), nullable=False, unique=True)
+    payment_record = db.relationship('PaymentRecord', backref=db.backref('snapshot', uselist=False, cascade='all, delete-orphan'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    etag = db.Column(db.String(64), nullable=False) # Hash of data + HTML
+
+    data = db.Column(LongText, nullable=False)        # JSON: header, totals, lines, advances
+    html_admin = db.Column(LongText, nullable=False)
+    html_collab = db.Column(LongText, nullable=False)
@@ -0,0 +1,13 @@
+from app import create_app
+from services.summary import rebuild
+
+app = create_app()
+
+def rebuild_daily_summary():
+    with app.app_context():
+        print("Recalculando resumo diário a partir das vendas...")
+        rows = rebuild()
+        print(f"SUCESSO: {rows} linhas de resumo gravadas.")
+
+if __name__ == "__main__":
+    rebuild_daily_summary()
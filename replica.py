@@ -0,0 +1,99 @@
+"""Read-replica routing for the report views.
+
+When REPLICA_DATABASE_URL is set, views decorated with ``read_only`` send
+their SELECTs to the ``replica`` bind, so month-end reports and exports
+do not compete with checkouts for the primary database. Everything else
+stays on the primary:
+
+- every write (flush, UPDATE/DELETE/INSERT, raw SQL) and every query of a
+  request after it has written (read-your-writes inside the request);
+- for REPLICA_STICKY_SECONDS after a request that wrote, the same browser
+  keeps reading from the primary even in read-only views, so an admin
+  who just closed a payment sees it in the history right away.
+
+With SQLite the replica is a copy of the file refreshed by
+``python snapshot_replica.py --every 300`` (see ``snapshot``).
+"""
+import functools
+import sqlite3
+import time
+
+from flask import g, has_request_context, session as http_session
+from flask_sqlalchemy.session import Session
+
+import database
+
+BIND = 'replica'
+STICKY_SECONDS = 60
+
+
+def _read_only_request():
+    return has_request_context() and g.get('db_read_only', False) and not g.get('db_wrote', False)
+
+
+class RoutingSession(Session):
+    """db.session class: SELECTs of read-only views go to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            is_read = not self._flushing and (clause is None or getattr(clause, 'is_select', False))
+            if not is_read:
+                if has_request_context():
+                    g.db_wrote = True
+            elif _read_only_request():
+                engine = self._db.engines.get(BIND)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def in_use(db):
+    """True when the SELECTs of the current request go to the replica."""
+    return _read_only_request() and BIND in db.engines
+
+
+def read_only(view):
+    """Run a view's queries on the replica (unless this browser just wrote)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = http_session.get('db_primary_until', 0) < time.time()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def configure(app):
+    """Register the replica bind from REPLICA_DATABASE_URL (call before ``db.init_app``)."""
+    url = app.config.get('REPLICA_DATABASE_URL')
+    if not url:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[BIND] = dict(database.engine_options(
+        url,
+        pool_size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_MAX_OVERFLOW'],
+        pool_recycle=app.config['DB_POOL_RECYCLE'],
+        lock_timeout=app.config['DB_LOCK_TIMEOUT'],
+        statement_timeout=app.config['DB_STATEMENT_TIMEOUT']), url=url)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            http_session['db_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+        return response
+
+
+def snapshot(primary_path, replica_path):
+    """Copy the primary SQLite file into the replica with the backup API.
+
+    The copy is consistent (one read transaction on the primary, which in
+    WAL mode does not hold up writers) and is written in place, so views
+    reading the replica see either the old or the new snapshot.
+    """
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
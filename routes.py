@@ -1,7 +1,10 @@
 from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify, flash
 from extensions import db
-from models import Collaborator, Service, Product, Sale, SaleItem
-from datetime import datetime
+from sqlalchemy.orm import selectinload
+from models import Collaborator, Service, Product, Sale
+from services import balances, payroll, receipts
+from services.sales import parse_cart, create_sale
+from services.stock import OutOfStock
 
 main_bp = Blueprint('main', __name__)
 
@@ -44,17 +47,16 @@ def dashboard():
     
     collab = Collaborator.query.get(session['collab_id'])
     
-    # Calculate total accumulated commission (History)
-    total_history = db.session.query(db.func.sum(Sale.total_commission)).filter(Sale.collaborator_id == collab.id).scalar() or 0.0
-
-    # Calculate current unpaid commission (Balance)
-    current_balance = db.session.query(db.func.sum(Sale.total_commission)).filter(Sale.collaborator_id == collab.id, Sale.commission_paid == False).scalar() or 0.0
+    # Total accumulated commission (History) and current unpaid commission (Balance)
+    total_history = collab.total_earnings or 0.0
+    current_balance = collab.unpaid_commission or 0.0
 
     # Calculate total paid
     total_paid = total_history - current_balance
 
     # Simple stats for the logged in user
-    sales = Sale.query.filter_by(collaborator_id=collab.id).order_by(Sale.date.desc()).limit(10).all()
+    sales = Sale.query.options(selectinload(Sale.items))\
+        .filter_by(collaborator_id=collab.id).order_by(Sale.date.desc()).limit(10).all()
     
     return render_template('collab_dashboard.html', 
                            collaborator=collab, 
@@ -72,11 +74,10 @@ def reset_commissions():
     
     # Update all unpaid sales to paid
     try:
-        sales = Sale.query.filter_by(collaborator_id=collab_id, commission_paid=False).all()
-        count = 0
-        for sale in sales:
-            sale.commission_paid = True
-            count += 1
+        totals = payroll.pending(collab_id)
+        count = payroll.mark_sales_paid(collab_id, totals)
+
+        balances.apply_payment(collab_id, totals.total_commission, 0.0)
         
         db.session.commit()
         return jsonify({'success': True, 'message': f'{count} vendas marcadas como pagas.'})
@@ -95,56 +96,21 @@ def new_sale():
         if not data:
              return jsonify({'error': 'No data'}), 400
         
-        collab_id = session['collab_id']
-        total = 0
-        total_comm = 0
+        collab = db.session.get(Collaborator, session['collab_id'])
         
         client_name = data.get('client_name', '')
         payment_method = data.get('payment_method', 'Dinheiro')
-        
-        new_sale = Sale(collaborator_id=collab_id, client_name=client_name, payment_method=payment_method)
-        db.session.add(new_sale)
-        db.session.flush() # Get ID
-        
-        # Process items
-        for item in data.get('items', []):
-            cost = 0
-            comm_val = 0
-            
-            if item['type'] == 'service':
-                svc = Service.query.get(item['id'])
-                if svc:
-                    cost = svc.price
-                    # Service commission uses collaborator's percent
-                    collab = Collaborator.query.get(collab_id)
-                    comm_val = cost * (collab.commission_percent / 100.0)
-                    
-                    sale_item = SaleItem(sale_id=new_sale.id, service_id=svc.id, 
-                                         item_name=svc.name, price=cost, commission=comm_val)
-                    db.session.add(sale_item)
-            
-            elif item['type'] == 'product':
-                prod = Product.query.get(item['id'])
-                if prod:
-                    cost = prod.price
-                    # Product commission uses fixed value now
-                    comm_val = prod.commission_fixed_value or 0.0
-                    
-                    # Deduct Stock
-                    if prod.quantity and prod.quantity > 0:
-                        prod.quantity -= 1
-                        db.session.add(prod)
-                    
-                    sale_item = SaleItem(sale_id=new_sale.id, product_id=prod.id, 
-                                         item_name=prod.name, price=cost, commission=comm_val)
-                    db.session.add(sale_item)
-
-            total += cost
-            total_comm += comm_val
-            
-        new_sale.total_amount = total
-        new_sale.total_commission = total_comm
-        new_sale.date = datetime.utcnow()
+
+        try:
+            lines = parse_cart(data.get('items', []))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            create_sale(collab, lines, client_name=client_name, payment_method=payment_method)
+        except OutOfStock as e:
+            db.session.rollback()
+            return jsonify({'error': str(e), 'product_id': e.product_id}), 409
         
         db.session.commit()
         return jsonify({'success': True, 'redirect': url_for('main.dashboard')})
@@ -184,4 +150,4 @@ def receipt_detail(id):
         return redirect(url_for('main.my_receipts'))
         
     # Unified Template with Collab Mode
-    return render_template('receipt_unified.html', payment=payment, mode='collab')
+    return receipts.serve(payment, 'collab')
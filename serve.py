@@ -0,0 +1,144 @@
+"""Production server launcher.
+
+    python serve.py [--workers 4] [--threads 4] [--host 0.0.0.0] [--port 5000]
+
+Uses gunicorn (Linux/macOS) with ``workers`` processes of ``threads``
+threads each, or waitress (Windows, and wherever gunicorn is missing)
+with ``workers * threads`` threads in one process. Each gunicorn worker
+imports wsgi.py itself (no preload), so no database connection is ever
+shared across a fork; a worker's pool is disposed when it exits.
+
+The live screens (events.py) keep a request open for LIVE_STREAM_SECONDS.
+A sync gunicorn worker would serve nothing else meanwhile and be killed
+by ``--timeout`` mid-stream, so while the live stream is on (> 0) gunicorn
+always runs the threaded ``gthread`` worker with at least 2 threads, whose
+timeout only watches the worker itself, not each request.
+
+SIGTERM/SIGINT (Ctrl+C) stop accepting new connections and let running
+requests finish for up to ``--graceful-timeout`` seconds.
+
+Defaults can be set with WEB_WORKERS, WEB_THREADS, HOST, PORT and
+WEB_GRACEFUL_TIMEOUT. The debugger is never enabled here; use
+``python app.py`` for development.
+"""
+import argparse
+import os
+import signal
+import sys
+
+
+def _dispose_engines(app):
+    from extensions import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _live_stream_seconds():
+    """LIVE_STREAM_SECONDS as the app will see it (defaults < instance/config.py < environment)."""
+    from flask import Config
+    import config
+    settings = Config(os.path.dirname(os.path.abspath(__file__)))
+    settings.from_object(config.Config)
+    settings.from_pyfile(os.path.join('instance', 'config.py'), silent=True)
+    config.from_env(settings)
+    return settings['LIVE_STREAM_SECONDS']
+
+
+def run_gunicorn(options):
+    from gunicorn.app.base import BaseApplication
+
+    threads = options.threads
+    if threads < 2 and _live_stream_seconds() > 0:
+        threads = 2
+        print('Painel ao vivo ligado (LIVE_STREAM_SECONDS): usando 2 threads por processo.')
+
+    def worker_exit(server, worker):
+        import wsgi
+        _dispose_engines(wsgi.app)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            settings = {
+                'bind': f'{options.host}:{options.port}',
+                'workers': options.workers,
+                'threads': threads,
+                'worker_class': 'gthread' if threads > 1 else 'sync',
+                'graceful_timeout': options.graceful_timeout,
+                'timeout': options.timeout,
+                'preload_app': False,
+                'accesslog': '-' if options.access_log else None,
+                'worker_exit': worker_exit,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import wsgi
+            return wsgi.app
+
+    Server().run()
+
+
+def run_waitress(options):
+    import waitress
+    import wsgi
+
+    # waitress stops on SystemExit/KeyboardInterrupt and waits for running requests
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    threads = options.workers * options.threads
+    print(f'Servindo em http://{options.host}:{options.port} com waitress ({threads} threads)')
+    try:
+        waitress.serve(wsgi.app, host=options.host, port=options.port, threads=threads,
+                       channel_timeout=options.timeout)
+    finally:
+        _dispose_engines(wsgi.app)
+
+
+def run_werkzeug(options):
+    from werkzeug.serving import run_simple
+    import wsgi
+
+    print('AVISO: gunicorn/waitress não instalados (pip install -r requirements.txt); '
+          'usando o servidor do Werkzeug com threads, sem debug.')
+    try:
+        run_simple(options.host, options.port, wsgi.app, threaded=True, use_debugger=False, use_reloader=False)
+    finally:
+        _dispose_engines(wsgi.app)
+
+
+def _installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def main(argv=None):
+    env = os.environ
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=env.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(env.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(env.get('WEB_WORKERS', 2)))
+    parser.add_argument('--threads', type=int, default=int(env.get('WEB_THREADS', 4)))
+    parser.add_argument('--graceful-timeout', type=int, default=int(env.get('WEB_GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--timeout', type=int, default=120, help='seconds before a stuck request is dropped')
+    parser.add_argument('--server', choices=('gunicorn', 'waitress', 'werkzeug'),
+                        help='default: gunicorn, else waitress, else werkzeug')
+    parser.add_argument('--access-log', action='store_true')
+    options = parser.parse_args(argv)
+
+    server = options.server
+    if server is None:
+        if os.name != 'nt' and _installed('gunicorn'):
+            server = 'gunicorn'
+        elif _installed('waitress'):
+            server = 'waitress'
+        else:
+            server = 'werkzeug'
+    {'gunicorn': run_gunicorn, 'waitress': run_waitress, 'werkzeug': run_werkzeug}[server](options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Running per-collaborator totals stored on the Collaborator row.
+
+``Collaborator.unpaid_commission``, ``total_earnings`` and
+``outstanding_advances`` are kept in sync by the code paths that create or
+delete sales, register advances and close payments, always with an
+atomic ``col = col + delta`` UPDATE inside the caller's transaction.
+``check`` recomputes everything from the raw rows to detect (and fix) drift.
+"""
+from sqlalchemy import func, update
+
+from extensions import db
+from models import Collaborator, Sale, CashAdvance
+
+FIELDS = ('unpaid_commission', 'total_earnings', 'outstanding_advances')
+
+
+def _add(collaborator_id, **deltas):
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    values = {k: func.coalesce(getattr(Collaborator, k), 0.0) + v for k, v in deltas.items()}
+    db.session.execute(
+        update(Collaborator).where(Collaborator.id == collaborator_id).values(values)
+        .execution_options(synchronize_session=False))
+
+
+def apply_sale(sale, sign=1):
+    """Account a new sale (sign=1) or a deleted one (sign=-1)."""
+    commission = sign * (sale.total_commission or 0.0)
+    _add(sale.collaborator_id,
+         total_earnings=commission,
+         unpaid_commission=0.0 if sale.commission_paid else commission)
+
+
+def apply_payment(collaborator_id, total_commission, total_advances):
+    """Commission and advances settled by a payment leave the open balance."""
+    _add(collaborator_id,
+         unpaid_commission=-(total_commission or 0.0),
+         outstanding_advances=-(total_advances or 0.0))
+
+
+def refresh_advances(collaborator_ids):
+    """Recompute outstanding advances of the given collaborators (one query each)."""
+    for collaborator_id in {cid for cid in collaborator_ids if cid}:
+        total = db.session.query(func.coalesce(func.sum(CashAdvance.amount), 0.0))\
+            .filter(CashAdvance.collaborator_id == collaborator_id, CashAdvance.is_paid == False)\
+            .scalar()
+        db.session.execute(
+            update(Collaborator).where(Collaborator.id == collaborator_id)
+            .values(outstanding_advances=total)
+            .execution_options(synchronize_session=False))
+
+
+def expected_totals():
+    """Totals recomputed from scratch: {collaborator_id: {field: value}}."""
+    earnings = dict(db.session.query(Sale.collaborator_id, func.sum(Sale.total_commission))
+                    .group_by(Sale.collaborator_id))
+    unpaid = dict(db.session.query(Sale.collaborator_id, func.sum(Sale.total_commission))
+                  .filter(Sale.commission_paid == False)
+                  .group_by(Sale.collaborator_id))
+    advances = dict(db.session.query(CashAdvance.collaborator_id, func.sum(CashAdvance.amount))
+                    .filter(CashAdvance.is_paid == False)
+                    .group_by(CashAdvance.collaborator_id))
+
+    return {cid: {
+        'unpaid_commission': unpaid.get(cid) or 0.0,
+        'total_earnings': earnings.get(cid) or 0.0,
+        'outstanding_advances': advances.get(cid) or 0.0,
+    } for (cid,) in db.session.query(Collaborator.id)}
+
+
+def check(fix=False):
+    """Compare stored totals with recomputed ones.
+
+    Returns a list of ``(collaborator, field, stored, expected)`` for every
+    mismatch. With ``fix=True`` the stored values are overwritten and committed.
+    """
+    expected = expected_totals()
+    mismatches = []
+    for collab in Collaborator.query.order_by(Collaborator.id):
+        for field in FIELDS:
+            stored = getattr(collab, field) or 0.0
+            value = expected[collab.id][field]
+            if abs(stored - value) > 0.005:
+                mismatches.append((collab, field, stored, value))
+                if fix:
+                    setattr(collab, field, value)
+    if fix:
+        db.session.commit()
+    return mismatches
@@ -0,0 +1,131 @@
+"""CSV exports of the financial tables for the accountant.
+
+Every dataset is a single Core SELECT. Rows are pulled from the database
+in chunks of CHUNK_SIZE (``yield_per`` turns on server-side cursors where
+the driver supports them, e.g. MySQL) and written out chunk by chunk, so
+an export of several years runs in constant memory and the download
+starts with the first chunk.
+"""
+import csv
+import io
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import select
+
+from extensions import db
+from models import Collaborator, Sale, SaleItem, Expense, CashAdvance, PaymentRecord, Supplier, SupplierPayment
+
+CHUNK_SIZE = 1000
+
+
+def _sales():
+    return select(Sale.id, Sale.date, Collaborator.name, Sale.client_name, Sale.payment_method,
+                  Sale.total_amount, Sale.total_commission, Sale.commission_paid, Sale.payment_record_id)\
+        .join(Collaborator, Collaborator.id == Sale.collaborator_id)
+
+
+def _items():
+    return select(SaleItem.id, Sale.id, Sale.date, Collaborator.name, SaleItem.item_name,
+                  SaleItem.product_id.isnot(None), SaleItem.quantity, SaleItem.price, SaleItem.commission)\
+        .join(Sale, Sale.id == SaleItem.sale_id)\
+        .join(Collaborator, Collaborator.id == Sale.collaborator_id)
+
+
+def _expenses():
+    return select(Expense.id, Expense.date, Expense.category, Expense.description, Expense.amount)
+
+
+def _advances():
+    return select(CashAdvance.id, CashAdvance.date, Collaborator.name, CashAdvance.description,
+                  CashAdvance.amount, CashAdvance.is_paid, CashAdvance.payment_record_id)\
+        .join(Collaborator, Collaborator.id == CashAdvance.collaborator_id)
+
+
+def _payments():
+    return select(PaymentRecord.id, PaymentRecord.date, Collaborator.name, PaymentRecord.start_date,
+                  PaymentRecord.end_date, PaymentRecord.total_commission, PaymentRecord.total_advances,
+                  PaymentRecord.net_amount, PaymentRecord.admin_name)\
+        .join(Collaborator, Collaborator.id == PaymentRecord.collaborator_id)
+
+
+def _supplier_payments():
+    return select(SupplierPayment.id, SupplierPayment.date, Supplier.name, SupplierPayment.description,
+                  SupplierPayment.amount)\
+        .join(Supplier, Supplier.id == SupplierPayment.supplier_id)
+
+
+# name: (title, header, statement builder, date column, collaborator column or None)
+DATASETS = {
+    'sales': ('Vendas',
+              ['ID', 'Data', 'Colaborador', 'Cliente', 'Forma de Pagamento', 'Total', 'Comissão',
+               'Comissão Paga', 'Nota'],
+              _sales, Sale.date, Sale.collaborator_id),
+    'items': ('Itens de Venda',
+              ['ID', 'Venda', 'Data', 'Colaborador', 'Item', 'Produto', 'Quantidade', 'Preço Unit.',
+               'Comissão Unit.'],
+              _items, Sale.date, Sale.collaborator_id),
+    'expenses': ('Despesas',
+                 ['ID', 'Data', 'Categoria', 'Descrição', 'Valor'],
+                 _expenses, Expense.date, None),
+    'advances': ('Vales/Adiantamentos',
+                 ['ID', 'Data', 'Colaborador', 'Descrição', 'Valor', 'Descontado', 'Nota'],
+                 _advances, CashAdvance.date, CashAdvance.collaborator_id),
+    'payments': ('Notas de Pagamento',
+                 ['ID', 'Data', 'Colaborador', 'Início', 'Fim', 'Comissões', 'Vales', 'Líquido', 'Por'],
+                 _payments, PaymentRecord.date, PaymentRecord.collaborator_id),
+    'supplier_payments': ('Pagamentos a Fornecedores',
+                          ['ID', 'Data', 'Fornecedor', 'Descrição', 'Valor'],
+                          _supplier_payments, SupplierPayment.date, None),
+}
+
+
+def statement(name, start=None, end=None, collaborator_id=None):
+    """SELECT for a dataset filtered by an inclusive date range and collaborator.
+
+    Raises ValueError for an unknown dataset or a collaborator filter on a
+    dataset that has no collaborator.
+    """
+    if name not in DATASETS:
+        raise ValueError(f'Exportação desconhecida: {name}')
+    _, _, build, date_column, collaborator_column = DATASETS[name]
+    stmt = build()
+
+    # Date columns compare with dates, DateTime columns with datetimes
+    is_datetime = isinstance(date_column.type, db.DateTime)
+    if start:
+        stmt = stmt.where(date_column >= (datetime.combine(start, time.min) if is_datetime else start))
+    if end:
+        end = end + timedelta(days=1)
+        stmt = stmt.where(date_column < (datetime.combine(end, time.min) if is_datetime else end))
+    if collaborator_id:
+        if collaborator_column is None:
+            raise ValueError(f'{DATASETS[name][0]} não tem filtro por colaborador.')
+        stmt = stmt.where(collaborator_column == collaborator_id)
+    return stmt.order_by(date_column, stmt.selected_columns[0])
+
+
+def _cell(value):
+    if isinstance(value, bool):
+        return 'Sim' if value else 'Não'
+    if isinstance(value, float):
+        return f'{value:.2f}'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return '' if value is None else value
+
+
+def rows(name, stmt):
+    """Yield the CSV text of a dataset, one chunk of CHUNK_SIZE rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff') # BOM so Excel reads the accents as UTF-8
+    writer.writerow(DATASETS[name][1])
+
+    result = db.session.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+    for partition in result.partitions():
+        writer.writerows([_cell(v) for v in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
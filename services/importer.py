@@ -0,0 +1,370 @@
+"""Bulk import of historical sales, expenses and products from CSV.
+
+Rows are validated one by one and resolved to ids through in-memory name
+maps (collaborators, services, products) loaded once per import. Valid
+rows are written CHUNK_SIZE at a time with executemany INSERTs and one
+commit per chunk; invalid rows are skipped and reported with their line
+number. After each chunk the last consumed line can be saved to a
+checkpoint file, so an interrupted import resumes where it stopped.
+
+Sale and product ids are assigned by the database, so an import can run
+while the shop keeps selling; they are read back with INSERT ... RETURNING
+where the database supports it for executemany (SQLite, MariaDB), else one
+INSERT per row. Imported sales are history: they do not move stock, and
+their commission counts as already paid unless the ``paga`` column says
+otherwise. ``finish`` rebuilds the daily summary and the running balances
+once at the end.
+
+Headers are matched case- and accent-insensitively:
+
+- sales: data, colaborador, item, [tipo, quantidade, preco, comissao,
+  cliente, pagamento, paga, venda] -- one line per item; consecutive lines
+  with the same ``venda`` value become one sale.
+- expenses: data, descricao, valor, [categoria]
+- products: nome, preco, [custo, comissao, quantidade]
+"""
+import csv
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from extensions import db
+from models import Collaborator, Service, Product, Sale, SaleItem, Expense
+from services import summary, balances, stock
+
+CHUNK_SIZE = 5000
+
+REQUIRED = {
+    'sales': ('data', 'colaborador', 'item'),
+    'expenses': ('data', 'descricao', 'valor'),
+    'products': ('nome', 'preco'),
+}
+KINDS = {'sales': 'Vendas', 'expenses': 'Despesas', 'products': 'Produtos'}
+
+
+# Brazilian (1.234,56 / 1234,56 / 1.234) or plain (1234.56) amounts; "1.500"
+# could be either, and anything else (1,234.56) is refused rather than guessed
+_MONEY_BR = re.compile(r'\d{1,3}(\.\d{3})+(,\d+)?|\d+(,\d+)?')
+_MONEY_PLAIN = re.compile(r'\d+\.\d+')
+_MONEY_AMBIGUOUS = re.compile(r'\d{1,3}\.\d{3}')
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported (reported, not raised to the caller)."""
+
+
+class Result:
+    def __init__(self):
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []        # [(line, message)]
+        self.resumed_from = 0   # line of the checkpoint the import resumed after
+
+    def error(self, line, message):
+        self.skipped += 1
+        self.errors.append((line, message))
+
+
+@lru_cache(maxsize=4096)
+def _key(text):
+    text = unicodedata.normalize('NFKD', (text or '').strip().lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _date(value):
+    value = (value or '').strip()
+    try:
+        return datetime.fromisoformat(value)  # Fast path: 2023-01-31[ 10:00[:00]]
+    except ValueError:
+        pass
+    for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise RowError(f'Data inválida: {value!r}')
+
+
+def _money(value, field, default=None):
+    value = (value or '').strip().replace('R$', '').strip()
+    if not value:
+        if default is None:
+            raise RowError(f'{field} obrigatório')
+        return default
+    sign, digits = ('-', value[1:].strip()) if value.startswith('-') else ('', value)
+    if _MONEY_AMBIGUOUS.fullmatch(digits):
+        raise RowError(f'{field} ambíguo: {value!r} (use 1.500,00 ou 1500.00)')
+    if _MONEY_BR.fullmatch(digits):
+        digits = digits.replace('.', '').replace(',', '.')  # 1.234,56
+    elif not _MONEY_PLAIN.fullmatch(digits):
+        raise RowError(f'{field} inválido: {value!r}')
+    return float(sign + digits)
+
+
+def _int(value, field, default):
+    value = (value or '').strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f'{field} inválido: {value!r}')
+
+
+def _yes(value, default):
+    value = _key(value)
+    if not value:
+        return default
+    return value in ('sim', 's', '1', 'true', 'x')
+
+
+class _Lookups:
+    """Name -> row maps loaded once per import."""
+
+    def __init__(self):
+        self.collaborators = {_key(c.name): c for c in Collaborator.query}
+        self.services = {_key(s.name): s for s in Service.query}
+        self.products = {_key(p.name): p for p in Product.query}
+
+
+# --- Sales -------------------------------------------------------------
+
+def _sale_line(row, lookups):
+    collab = lookups.collaborators.get(_key(row.get('colaborador')))
+    if not collab:
+        raise RowError(f"Colaborador não encontrado: {row.get('colaborador')!r}")
+
+    name = (row.get('item') or '').strip()
+    if not name:
+        raise RowError('item obrigatório')
+    kind = _key(row.get('tipo'))
+    service = lookups.services.get(_key(name)) if kind in ('', 'servico') else None
+    product = lookups.products.get(_key(name)) if kind in ('', 'produto') and not service else None
+
+    quantity = _int(row.get('quantidade'), 'quantidade', 1)
+    if quantity < 1:
+        raise RowError('quantidade deve ser maior que zero')
+    catalog_price = service.price if service else product.price if product else None
+    price = _money(row.get('preco'), 'preco', catalog_price)
+    if service:
+        default_comm = price * (collab.commission_percent or 0.0) / 100.0
+    elif product:
+        default_comm = product.commission_fixed_value or 0.0
+    else:
+        default_comm = 0.0  # Item no longer in the catalog: kept by name only
+    commission = _money(row.get('comissao'), 'comissao', default_comm)
+
+    return collab, {
+        'service_id': service.id if service else None,
+        'product_id': product.id if product else None,
+        'item_name': service.name if service else product.name if product else name,
+        'quantity': quantity, 'price': price, 'commission': commission,
+    }
+
+
+def _build_sale(group, lookups, result):
+    """``(last_line, sale_dict, items)`` for the lines of one sale, or None."""
+    try:
+        first = group[0][1]
+        date = _date(first.get('data'))
+        lines = []
+        for line, row in group:
+            try:
+                lines.append(_sale_line(row, lookups))
+            except RowError as e:
+                raise RowError(f'linha {line}: {e}')
+        collab = lines[0][0]
+        if any(c.id != collab.id for c, _ in lines):
+            raise RowError('venda com mais de um colaborador')
+    except RowError as e:
+        for line, _ in group:
+            result.error(line, str(e))
+        return None
+
+    items = [item for _, item in lines]
+    return group[-1][0], {
+        'collaborator_id': collab.id, 'date': date,
+        'client_name': (first.get('cliente') or '').strip(),
+        'payment_method': (first.get('pagamento') or '').strip() or 'Dinheiro',
+        'total_amount': sum(i['price'] * i['quantity'] for i in items),
+        'total_commission': sum(i['commission'] * i['quantity'] for i in items),
+        'commission_paid': _yes(first.get('paga'), True) or collab.is_owner,
+    }, items
+
+
+def _sale_groups(rows, lookups, result):
+    """Yield ``(last_line, sale_dict, items)`` for every valid sale."""
+    group, group_key = [], None
+    for line, row in rows:
+        key = (row.get('venda') or '').strip()
+        if group and (not key or key != group_key):
+            sale = _build_sale(group, lookups, result)
+            if sale:
+                yield sale
+            group = []
+        group_key = key
+        group.append((line, row))
+    if group:
+        sale = _build_sale(group, lookups, result)
+        if sale:
+            yield sale
+
+
+def _insert(table, rows):
+    """INSERT ``rows`` into ``table``; returns the ids the database gave them, in order."""
+    if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+        return db.session.execute(stmt, rows).scalars().all()
+    # MySQL: no RETURNING, and a multi-row INSERT may get non-consecutive ids
+    return [db.session.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+
+def _write_sales(batch, result):
+    # Table-level INSERTs: plain executemany, no ORM bulk grouping by key set
+    sale_ids = _insert(Sale.__table__, [sale for _, sale, _ in batch])
+    item_rows = [dict(item, sale_id=sale_id) for sale_id, (_, _, items) in zip(sale_ids, batch) for item in items]
+    db.session.execute(SaleItem.__table__.insert(), item_rows)
+    result.inserted += len(sale_ids)
+
+
+# --- Expenses / products -----------------------------------------------
+
+def _expense_records(rows, lookups, result):
+    for line, row in rows:
+        try:
+            description = (row.get('descricao') or '').strip()
+            if not description:
+                raise RowError('descricao obrigatória')
+            yield line, {'date': _date(row.get('data')).date(), 'description': description,
+                         'amount': _money(row.get('valor'), 'valor'),
+                         'category': (row.get('categoria') or '').strip() or 'Geral'}, None
+        except RowError as e:
+            result.error(line, str(e))
+
+
+def _write_expenses(batch, result):
+    db.session.execute(Expense.__table__.insert(), [record for _, record, _ in batch])
+    result.inserted += len(batch)
+
+
+def _product_records(rows, lookups, result):
+    for line, row in rows:
+        try:
+            name = (row.get('nome') or '').strip()
+            if not name:
+                raise RowError('nome obrigatório')
+            if _key(name) in lookups.products:
+                raise RowError(f'Produto já cadastrado: {name!r}')
+            price = _money(row.get('preco'), 'preco')
+            commission = _money(row.get('comissao'), 'comissao', 0.0)
+            record = {'name': name, 'price': price, 'cost_price': _money(row.get('custo'), 'custo', 0.0),
+                      'commission_fixed_value': commission,
+                      'commission_percent': (commission / price) * 100 if price > 0 else 0.0,
+                      'quantity': _int(row.get('quantidade'), 'quantidade', 0)}
+            lookups.products[_key(name)] = record  # Duplicates inside the same file
+            yield line, record, None
+        except RowError as e:
+            result.error(line, str(e))
+
+
+def _write_products(batch, result):
+    records = [record for _, record, _ in batch]
+    product_ids = _insert(Product.__table__, records)
+    stock.record([(product_id, r['quantity'], stock.OPENING, None) for product_id, r in zip(product_ids, records)])
+    result.inserted += len(records)
+
+
+PIPELINES = {
+    'sales': (_sale_groups, _write_sales),
+    'expenses': (_expense_records, _write_expenses),
+    'products': (_product_records, _write_products),
+}
+
+
+# --- Driver --------------------------------------------------------------
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def _save_checkpoint(path, kind, line, result):
+    if path:
+        with open(path, 'w') as f:
+            json.dump({'kind': kind, 'line': line, 'inserted': result.inserted}, f)
+
+
+def run(kind, lines, chunk_size=None, checkpoint=None):
+    """Import the CSV text ``lines`` (any iterable of lines, e.g. an open file).
+
+    ``checkpoint`` is a file path: lines up to the saved position are
+    skipped, and the position is saved after every committed chunk. It is
+    removed when the import completes. Raises ValueError for an unknown
+    kind or missing columns; row problems end up in ``Result.errors``.
+    """
+    if kind not in PIPELINES:
+        raise ValueError(f'Importação desconhecida: {kind}')
+    chunk_size = chunk_size or CHUNK_SIZE
+    result = Result()
+
+    reader = csv.reader(lines, delimiter=_sniff_delimiter(lines))
+    try:
+        header = [_key(h.lstrip('\ufeff')) for h in next(reader)]
+    except StopIteration:
+        raise ValueError('Arquivo vazio')
+    missing = [c for c in REQUIRED[kind] if c not in header]
+    if missing:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+
+    saved = _load_checkpoint(checkpoint)
+    if saved and saved.get('kind') == kind:
+        result.resumed_from = saved['line']
+        result.inserted = saved.get('inserted', 0)
+
+    def rows():
+        for values in reader:
+            if reader.line_num <= result.resumed_from or not any(v.strip() for v in values):
+                continue
+            yield reader.line_num, dict(zip(header, values))
+
+    parse, write = PIPELINES[kind]
+    batch = []
+    for record in parse(rows(), _Lookups(), result):
+        batch.append(record)
+        if len(batch) >= chunk_size:
+            _commit(kind, batch, write, result, checkpoint)
+            batch = []
+    if batch:
+        _commit(kind, batch, write, result, checkpoint)
+
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return result
+
+
+def _commit(kind, batch, write, result, checkpoint):
+    write(batch, result)
+    db.session.commit()
+    _save_checkpoint(checkpoint, kind, batch[-1][0], result)
+
+
+def _sniff_delimiter(lines):
+    # Spreadsheets saved in pt-BR use ';'. Only peek when we can rewind.
+    if hasattr(lines, 'seek') and hasattr(lines, 'tell'):
+        position = lines.tell()
+        first = lines.readline()
+        lines.seek(position)
+        return ';' if first.count(';') > first.count(',') else ','
+    return ','
+
+
+def finish(kind):
+    """Refresh the derived tables after importing sales (commits)."""
+    if kind == 'sales':
+        summary.rebuild()
+        balances.check(fix=True)
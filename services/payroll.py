@@ -0,0 +1,147 @@
+"""Weekly closing of a collaborator's commission and advances.
+
+Totals come from SQL aggregates and the pending rows are linked to the
+payment with set-based UPDATEs, so closing a month of sales does not load
+a single Sale or CashAdvance into the session. Each UPDATE is bounded by
+the highest id seen when the totals were computed and its rowcount must
+match the counted rows: a sale registered while the closing runs stays
+pending for the next payment, and a row changed in between aborts the
+closing instead of being paid with stale totals.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import func, update
+
+from extensions import db
+from models import Sale, CashAdvance, PaymentRecord
+from services import balances, receipts
+
+Pending = namedtuple('Pending', 'total_commission sale_count max_sale_id start end '
+                                'total_advances advance_count max_advance_id')
+
+
+class PendingChanged(Exception):
+    """Raised when the pending rows changed between the totals and the UPDATE."""
+
+    def __init__(self):
+        super().__init__('Os lançamentos mudaram durante o fechamento. Tente novamente.')
+
+
+def pending(collaborator_id):
+    """Open commission and advances of a collaborator (two aggregate queries)."""
+    comm, sale_count, max_sale_id, start, end = db.session.query(
+        func.coalesce(func.sum(Sale.total_commission), 0.0), func.count(Sale.id),
+        func.max(Sale.id), func.min(Sale.date), func.max(Sale.date))\
+        .filter(Sale.collaborator_id == collaborator_id, Sale.commission_paid == False)\
+        .one()
+    adv, advance_count, max_advance_id = db.session.query(
+        func.coalesce(func.sum(CashAdvance.amount), 0.0), func.count(CashAdvance.id), func.max(CashAdvance.id))\
+        .filter(CashAdvance.collaborator_id == collaborator_id, CashAdvance.is_paid == False)\
+        .one()
+    return Pending(comm, sale_count, max_sale_id, start, end, adv, advance_count, max_advance_id)
+
+
+def pending_all(collaborator_ids):
+    """``pending`` for several collaborators with one grouped query per table.
+
+    Returns ``{collaborator_id: Pending}`` with an entry for every id.
+    """
+    collaborator_ids = list(collaborator_ids)
+    if not collaborator_ids:
+        return {}
+    sales = {row[0]: row[1:] for row in db.session.query(
+        Sale.collaborator_id, func.coalesce(func.sum(Sale.total_commission), 0.0), func.count(Sale.id),
+        func.max(Sale.id), func.min(Sale.date), func.max(Sale.date))
+        .filter(Sale.collaborator_id.in_(collaborator_ids), Sale.commission_paid == False)
+        .group_by(Sale.collaborator_id)}
+    advances = {row[0]: row[1:] for row in db.session.query(
+        CashAdvance.collaborator_id, func.coalesce(func.sum(CashAdvance.amount), 0.0),
+        func.count(CashAdvance.id), func.max(CashAdvance.id))
+        .filter(CashAdvance.collaborator_id.in_(collaborator_ids), CashAdvance.is_paid == False)
+        .group_by(CashAdvance.collaborator_id)}
+    return {cid: Pending(*(sales.get(cid) or (0.0, 0, None, None, None)),
+                         *(advances.get(cid) or (0.0, 0, None)))
+            for cid in collaborator_ids}
+
+
+def mark_sales_paid(collaborator_id, totals, payment_record_id=None):
+    """Flag the sales counted in ``totals`` as paid. Raises PendingChanged."""
+    if not totals.sale_count:
+        return 0
+    values = {'commission_paid': True}
+    if payment_record_id is not None:
+        values['payment_record_id'] = payment_record_id
+    result = db.session.execute(
+        update(Sale)
+        .where(Sale.collaborator_id == collaborator_id, Sale.commission_paid == False,
+               Sale.id <= totals.max_sale_id)
+        .values(values)
+        .execution_options(synchronize_session=False))
+    if result.rowcount != totals.sale_count:
+        raise PendingChanged()
+    return result.rowcount
+
+
+def mark_advances_paid(collaborator_id, totals, payment_record_id):
+    """Flag the advances counted in ``totals`` as paid. Raises PendingChanged."""
+    if not totals.advance_count:
+        return 0
+    result = db.session.execute(
+        update(CashAdvance)
+        .where(CashAdvance.collaborator_id == collaborator_id, CashAdvance.is_paid == False,
+               CashAdvance.id <= totals.max_advance_id)
+        .values(is_paid=True, payment_record_id=payment_record_id)
+        .execution_options(synchronize_session=False))
+    if result.rowcount != totals.advance_count:
+        raise PendingChanged()
+    return result.rowcount
+
+
+def close(collaborator_id, totals, admin_name='Administrador'):
+    """Create the PaymentRecord for ``totals``, link the pending rows to it
+    and freeze its receipt.
+
+    Everything happens in the caller's transaction; on PendingChanged the
+    caller must roll back.
+    """
+    today = datetime.utcnow().date()
+    payment = PaymentRecord(
+        collaborator_id=collaborator_id,
+        total_commission=totals.total_commission,
+        total_advances=totals.total_advances,
+        net_amount=totals.total_commission - totals.total_advances,
+        admin_name=admin_name,
+        start_date=totals.start.date() if totals.start else today,
+        end_date=totals.end.date() if totals.end else today
+    )
+    db.session.add(payment)
+    db.session.flush() # Get ID
+
+    mark_sales_paid(collaborator_id, totals, payment.id)
+    mark_advances_paid(collaborator_id, totals, payment.id)
+    balances.apply_payment(collaborator_id, totals.total_commission, totals.total_advances)
+    receipts.freeze(payment)
+    return payment
+
+
+def close_all(collaborators, admin_name='Administrador'):
+    """Close the payment of every collaborator in one transaction.
+
+    Collaborators with a negative balance or nothing to pay are skipped, as
+    in the single closing. Returns one ``(collaborator, status, net, payment)``
+    per collaborator, ``status`` being ``'pago'``, ``'negativo'`` or
+    ``'nada'``. Raises PendingChanged (nothing is kept after the rollback).
+    """
+    totals = pending_all(c.id for c in collaborators)
+    summary = []
+    for collab in collaborators:
+        pending_totals = totals[collab.id]
+        net = pending_totals.total_commission - pending_totals.total_advances
+        if net < 0:
+            summary.append((collab, 'negativo', net, None))
+        elif pending_totals.total_commission == 0 and pending_totals.total_advances == 0:
+            summary.append((collab, 'nada', net, None))
+        else:
+            summary.append((collab, 'pago', net, close(collab.id, pending_totals, admin_name)))
+    return summary
@@ -0,0 +1,206 @@
+"""Data for the payment receipt (receipt_unified.html).
+
+The receipt lines come from one joined SaleItem/Sale query and the
+headline totals from one aggregate over the payment's sales, so rendering
+a receipt costs the same handful of queries whatever its size. Lines can
+be listed one by one (paginated) or grouped by day or by service.
+
+A closed payment never changes, so ``freeze`` stores a ReceiptSnapshot
+(the receipt data as JSON plus the rendered HTML of both copies) when the
+payment is closed. ``serve`` answers the plain receipt URLs from it with
+ETag/Last-Modified; only grouped or paginated views are rendered live.
+``batch`` streams many frozen receipts as one printable document.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from flask import make_response, render_template, request, stream_template
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Sale, SaleItem, CashAdvance, PaymentRecord, ReceiptSnapshot
+
+GROUPS = ('day', 'service')
+MODES = ('admin', 'collab')
+PAGE_SIZE = 500
+BATCH_CHUNK = 50
+
+Line = namedtuple('Line', 'date client_name item_name quantity is_product gross commission')
+DayLine = namedtuple('DayLine', 'day quantity gross commission')
+ServiceLine = namedtuple('ServiceLine', 'item_name is_product quantity gross commission')
+
+
+def _as_date(value):
+    # func.date() gives a string on SQLite and a date on MySQL
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def totals(payment_id):
+    """Sale count and gross revenue of a payment (one aggregate query)."""
+    count, revenue = db.session.query(func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0.0))\
+        .filter(Sale.payment_record_id == payment_id)\
+        .one()
+    return {'sale_count': count, 'revenue': revenue}
+
+
+def lines(payment_id, group=None, page=None):
+    """Receipt lines of a payment; returns ``(lines, page_count)``.
+
+    ``group`` is None (one line per item), ``'day'`` or ``'service'``.
+    ``page`` (1-based) limits the item lines to PAGE_SIZE per page; grouped
+    views are small and always come whole.
+    """
+    quantity = func.coalesce(SaleItem.quantity, 1)
+    gross = SaleItem.price * quantity
+    commission = SaleItem.commission * quantity
+    base = db.session.query().select_from(SaleItem)\
+        .join(Sale, Sale.id == SaleItem.sale_id)\
+        .filter(Sale.payment_record_id == payment_id)
+
+    if group == 'day':
+        day = func.date(Sale.date)
+        rows = base.add_columns(day, func.sum(quantity), func.sum(gross), func.sum(commission))\
+            .group_by(day).order_by(day)
+        return [DayLine(_as_date(d), int(q), g, c) for d, q, g, c in rows], 1
+
+    if group == 'service':
+        is_product = SaleItem.product_id.isnot(None)
+        rows = base.add_columns(SaleItem.item_name, is_product, func.sum(quantity), func.sum(gross),
+                                func.sum(commission))\
+            .group_by(SaleItem.item_name, is_product)\
+            .order_by(func.sum(gross).desc(), SaleItem.item_name)
+        return [ServiceLine(name, bool(p), int(q), g, c) for name, p, q, g, c in rows], 1
+
+    rows = base.add_columns(Sale.date, Sale.client_name, SaleItem.item_name, quantity,
+                            SaleItem.product_id.isnot(None), gross, commission)\
+        .order_by(Sale.date, Sale.id, SaleItem.id)
+    page_count = 1
+    if page:
+        item_count = base.add_columns(func.count(SaleItem.id)).scalar()
+        page_count = max(1, -(-item_count // PAGE_SIZE))
+        rows = rows.limit(PAGE_SIZE).offset((min(page, page_count) - 1) * PAGE_SIZE)
+    return [Line(d, client, name, q, bool(p), g, c) for d, client, name, q, p, g, c in rows], page_count
+
+
+def context(payment, group=None, page=None):
+    """Template variables for receipt_unified.html (unknown groups list every item)."""
+    if group not in GROUPS:
+        group = None
+    receipt_lines, page_count = lines(payment.id, group, page)
+    return {
+        'group': group,
+        'lines': receipt_lines,
+        'page': min(page, page_count) if page else None,
+        'page_count': page_count,
+        'totals': totals(payment.id),
+        'advances': CashAdvance.query.filter_by(payment_record_id=payment.id)
+            .order_by(CashAdvance.date, CashAdvance.id).all(),
+    }
+
+
+def render(payment, mode, group=None, page=None):
+    """Render receipt_unified.html live from the database."""
+    return render_template('receipt_unified.html', payment=payment, mode=mode,
+                           **context(payment, group, page))
+
+
+def freeze(payment):
+    """Store the snapshot of a closed payment in the caller's transaction.
+
+    Safe to call concurrently: if another request stored it first, that
+    snapshot is kept and returned.
+    """
+    ctx = context(payment)
+    data = {
+        'payment_id': payment.id,
+        'collaborator': payment.collaborator.name,
+        'date': payment.date.isoformat() if payment.date else None,
+        'start_date': payment.start_date.isoformat() if payment.start_date else None,
+        'end_date': payment.end_date.isoformat() if payment.end_date else None,
+        'total_commission': payment.total_commission,
+        'total_advances': payment.total_advances,
+        'net_amount': payment.net_amount,
+        'sale_count': ctx['totals']['sale_count'],
+        'revenue': ctx['totals']['revenue'],
+        'lines': [dict(line._asdict(), date=line.date.isoformat()) for line in ctx['lines']],
+        'advances': [{'date': adv.date.isoformat() if adv.date else None, 'description': adv.description,
+                      'amount': adv.amount} for adv in ctx['advances']],
+    }
+    html = {mode: render_template('receipt_unified.html', payment=payment, mode=mode, **ctx) for mode in MODES}
+    data_json = json.dumps(data, ensure_ascii=False)
+    digest = hashlib.sha1('\0'.join([data_json, html['admin'], html['collab']]).encode('utf-8')).hexdigest()
+
+    snapshot = ReceiptSnapshot(payment_record_id=payment.id, etag=digest, data=data_json,
+                               html_admin=html['admin'], html_collab=html['collab'])
+    try:
+        with db.session.begin_nested():
+            db.session.add(snapshot)
+    except IntegrityError:
+        snapshot = ReceiptSnapshot.query.filter_by(payment_record_id=payment.id).one()
+    return snapshot
+
+
+def serve(payment, mode):
+    """Response for a receipt URL: the frozen snapshot, or a live render for
+    ``?group=``/``?page=`` views.
+
+    Payments closed before snapshots existed are frozen on their first view.
+    """
+    group = request.args.get('group')
+    page = request.args.get('page', type=int)
+    if group or page:
+        return render(payment, mode, group, page)
+
+    snapshot = ReceiptSnapshot.query.filter_by(payment_record_id=payment.id).first()
+    if snapshot is None:
+        snapshot = freeze(payment)
+        db.session.commit()
+
+    response = make_response(snapshot.html_admin if mode == 'admin' else snapshot.html_collab)
+    response.set_etag(f'{snapshot.etag}-{mode}')
+    response.last_modified = snapshot.created_at
+    response.cache_control.private = True
+    response.cache_control.no_cache = True # Always revalidate (answered with 304)
+    return response.make_conditional(request)
+
+
+def _body(html):
+    # The receipt markup inside <body> of a frozen receipt_unified.html page
+    start = html.index('<body>') + len('<body>')
+    return html[start:html.rindex('</body>')]
+
+
+def _bodies(payment_ids, mode):
+    """Yield the frozen receipt bodies, BATCH_CHUNK snapshots per query."""
+    for i in range(0, len(payment_ids), BATCH_CHUNK):
+        chunk = payment_ids[i:i + BATCH_CHUNK]
+        snapshots = {s.payment_record_id: s
+                     for s in ReceiptSnapshot.query.filter(ReceiptSnapshot.payment_record_id.in_(chunk))}
+        missing = [pid for pid in chunk if pid not in snapshots]
+        if missing:
+            for payment in PaymentRecord.query.filter(PaymentRecord.id.in_(missing)):
+                snapshots[payment.id] = freeze(payment)
+            db.session.commit()
+        for pid in chunk:
+            snapshot = snapshots[pid]
+            yield _body(snapshot.html_admin if mode == 'admin' else snapshot.html_collab)
+
+
+def batch(payment_ids, mode, title, filename):
+    """Stream the receipts of ``payment_ids`` as one printable HTML document.
+
+    Each receipt comes from its snapshot (frozen here if missing) and starts
+    on a new printed page, so the browser's "Salvar PDF" produces a single
+    file. The response starts before the later receipts are read.
+    """
+    response = make_response(stream_template('receipt_batch.html', title=title,
+                                             bodies=_bodies(list(payment_ids), mode)))
+    response.headers['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
@@ -0,0 +1,212 @@
+"""Aggregate queries used by the admin reports.
+
+All rollups are computed with GROUP BY in the database and only the
+aggregate rows come back. Sale totals are read from the DailySummary
+table (see services/summary.py), so the cost of a report depends on the
+number of days in the window, not on how many sales were made.
+"""
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, extract
+
+from extensions import db
+from models import Collaborator, Sale, Expense, DailySummary
+
+PERIODS = ('today', 'week', 'month')  # anything else means all time
+
+
+def period_start(period, now=None):
+    """Start datetime for the dashboard period filter (None means all time)."""
+    now = now or datetime.now()
+    if period == 'today':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'week':
+        return now - timedelta(days=7)
+    if period == 'month':
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return None
+
+
+def _first_full_day(start):
+    """First whole day inside a window that begins at ``start``."""
+    first_day = start.date()
+    if start > datetime.combine(first_day, time.min):
+        first_day += timedelta(days=1)
+    return first_day
+
+
+def sales_rollup(start=None, by=(), payment_method=None):
+    """Sale totals since ``start``, grouped by the DailySummary keys in ``by``.
+
+    Whole days are read from DailySummary. When the window starts in the
+    middle of a day, that partial day is read from the raw sales.
+    Returns ``{key_tuple: {'revenue', 'commission', 'count'}}``.
+    """
+    result = {}
+
+    def add(key, revenue, commission, count):
+        if not count:
+            return
+        bucket = result.setdefault(key, {'revenue': 0.0, 'commission': 0.0, 'count': 0})
+        bucket['revenue'] += revenue or 0.0
+        bucket['commission'] += commission or 0.0
+        bucket['count'] += int(count)
+
+    columns = [getattr(DailySummary, k) for k in by]
+    query = db.session.query(*columns,
+                             func.sum(DailySummary.total_amount),
+                             func.sum(DailySummary.total_commission),
+                             func.sum(DailySummary.sale_count))
+    if start:
+        query = query.filter(DailySummary.day >= _first_full_day(start))
+    if payment_method:
+        query = query.filter(DailySummary.payment_method == payment_method)
+    if by:
+        query = query.group_by(*columns)
+    for row in query:
+        add(tuple(row[:len(by)]), *row[len(by):])
+
+    if start and _first_full_day(start) > start.date():
+        raw_columns = {
+            'collaborator_id': Sale.collaborator_id,
+            'payment_method': Sale.payment_method,
+            'is_owner': Collaborator.is_owner,
+        }
+        columns = [raw_columns[k] for k in by if k != 'day']
+        query = db.session.query(*columns,
+                                 func.sum(Sale.total_amount),
+                                 func.sum(Sale.total_commission),
+                                 func.count(Sale.id))\
+            .join(Collaborator, Sale.collaborator_id == Collaborator.id)\
+            .filter(Sale.date >= start, Sale.date < datetime.combine(_first_full_day(start), time.min))
+        if payment_method:
+            query = query.filter(Sale.payment_method == payment_method)
+        if columns:
+            query = query.group_by(*columns)
+        for row in query:
+            values = iter(row[:len(columns)])
+            key = tuple(start.date() if k == 'day' else next(values) for k in by)
+            add(key, *row[len(columns):])
+
+    return result
+
+
+def collaborator_names(ids):
+    """Map of collaborator id -> name, loaded with a single query."""
+    if not ids:
+        return {}
+    rows = db.session.query(Collaborator.id, Collaborator.name).filter(Collaborator.id.in_(ids))
+    return dict(rows)
+
+
+def sales_totals(start=None):
+    """Revenue, commission and sale count split into VIP (owner) and team."""
+    totals = {
+        'vip': {'revenue': 0.0, 'commission': 0.0, 'count': 0},
+        'team': {'revenue': 0.0, 'commission': 0.0, 'count': 0},
+    }
+    for (is_owner,), data in sales_rollup(start, by=('is_owner',)).items():
+        bucket = totals['vip' if is_owner else 'team']
+        for k in bucket:
+            bucket[k] += data[k]
+    return totals
+
+
+def expenses_total(start_day=None):
+    """Sum of expenses dated on or after ``start_day`` (a date)."""
+    query = db.session.query(func.coalesce(func.sum(Expense.amount), 0.0))
+    if start_day:
+        query = query.filter(Expense.date >= start_day)
+    return query.scalar() or 0.0
+
+
+def collaborator_stats(start=None):
+    """Gross revenue and commission per team member (owners excluded)."""
+    rollup = sales_rollup(start, by=('is_owner', 'collaborator_id'))
+    team = {collab_id: data for (is_owner, collab_id), data in rollup.items()
+            if not is_owner and data['revenue'] > 0}
+    if not team:
+        return []
+
+    collabs = db.session.query(Collaborator.id, Collaborator.name, Collaborator.commission_percent)\
+        .filter(Collaborator.id.in_(team.keys()))\
+        .order_by(Collaborator.id)
+
+    return [{
+        'name': name,
+        'gross_revenue': team[collab_id]['revenue'],
+        'commission_percent': percent,
+        'commission_generated': team[collab_id]['commission'],
+    } for collab_id, name, percent in collabs]
+
+
+def finance_since(start):
+    """Revenue, expenses and profit from ``start`` (a datetime) until now."""
+    receita = sales_rollup(start).get((), {}).get('revenue', 0.0)
+    # Expenses only carry a day; a day counts when its midnight is inside the window
+    despesa = expenses_total(_first_full_day(start))
+
+    return {"receita": receita, "despesa": despesa, "lucro": receita - despesa}
+
+
+def monthly_finance():
+    """Revenue/expense/profit per "YYYY-MM", newest month first."""
+    financeiro = {}
+
+    def bucket(year, month):
+        key = f'{int(year):04d}-{int(month):02d}'
+        return financeiro.setdefault(key, {"receita": 0.0, "despesa": 0.0, "lucro": 0.0})
+
+    sale_year = extract('year', DailySummary.day)
+    sale_month = extract('month', DailySummary.day)
+    sales = db.session.query(sale_year, sale_month, func.sum(DailySummary.total_amount))\
+        .group_by(sale_year, sale_month)\
+        .having(func.sum(DailySummary.sale_count) > 0)
+    for year, month, total in sales:
+        bucket(year, month)["receita"] += total or 0.0
+
+    exp_year = extract('year', Expense.date)
+    exp_month = extract('month', Expense.date)
+    expenses = db.session.query(exp_year, exp_month, func.sum(Expense.amount))\
+        .filter(Expense.date.isnot(None))\
+        .group_by(exp_year, exp_month)
+    for year, month, total in expenses:
+        bucket(year, month)["despesa"] += total or 0.0
+
+    for mes in financeiro:
+        financeiro[mes]["lucro"] = financeiro[mes]["receita"] - financeiro[mes]["despesa"]
+
+    return dict(sorted(financeiro.items(), reverse=True))
+
+
+SERIES_BUCKETS = {'day': '%d/%m', 'week': '%d/%m', 'month': '%m/%Y'}
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def revenue_series(days=7, bucket='day', today=None):
+    """Revenue of the last ``days`` days (today included) in day/week/month buckets.
+
+    One range query over DailySummary.day; empty buckets are returned as 0.0.
+    Returns a list of ``(bucket_start, total)`` in chronological order.
+    """
+    today = today or date.today()
+    first_day = today - timedelta(days=days - 1)
+
+    buckets = {}
+    for i in range(days):
+        buckets.setdefault(_bucket_start(first_day + timedelta(days=i), bucket), 0.0)
+
+    rows = db.session.query(DailySummary.day, func.sum(DailySummary.total_amount))\
+        .filter(DailySummary.day >= first_day, DailySummary.day <= today)\
+        .group_by(DailySummary.day)
+    for day, total in rows:
+        buckets[_bucket_start(day, bucket)] += total or 0.0
+
+    return list(buckets.items())
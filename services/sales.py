@@ -0,0 +1,126 @@
+"""Sale creation/removal shared by the checkout, the VIP room and the admin.
+
+``register``/``unregister`` keep the derived data (daily summary, running
+balances, stock returns, the live screens' event) in the caller's transaction; ``create_sale`` builds a complete
+sale from a cart with a fixed number of queries regardless of its size.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, insert
+
+import events
+from extensions import db
+from models import Service, Product, Sale, SaleItem
+from services import summary, balances, stock
+
+
+def parse_cart(items):
+    """Normalize cart lines into ``[(type, id, quantity)]``.
+
+    Repeated entries for the same service/product are merged, so a cart
+    with five identical pomades becomes a single line with quantity 5.
+    Raises ValueError for malformed lines.
+    """
+    merged = {}
+    for item in items:
+        item_type = item.get('type')
+        if item_type not in ('service', 'product'):
+            raise ValueError(f"Tipo de item inválido: {item_type}")
+        try:
+            item_id = int(item['id'])
+            quantity = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Item inválido no carrinho.')
+        if quantity < 1:
+            raise ValueError('Quantidade deve ser maior que zero.')
+        key = (item_type, item_id)
+        merged[key] = merged.get(key, 0) + quantity
+    return [(item_type, item_id, quantity) for (item_type, item_id), quantity in merged.items()]
+
+
+def create_sale(collaborator, lines, client_name='', payment_method='Dinheiro'):
+    """Build and register a sale for ``collaborator`` from parsed cart lines.
+
+    Services and products are resolved with one IN query each and the items
+    are written with a single executemany INSERT, so the number of
+    statements does not depend on the cart size. Lines whose
+    service/product no longer exists are skipped. The caller commits.
+    """
+    service_ids = {item_id for item_type, item_id, _ in lines if item_type == 'service'}
+    product_ids = {item_id for item_type, item_id, _ in lines if item_type == 'product'}
+    services = {s.id: s for s in Service.query.filter(Service.id.in_(service_ids))} if service_ids else {}
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids))} if product_ids else {}
+
+    sale = Sale(collaborator_id=collaborator.id, client_name=client_name,
+                payment_method=payment_method, commission_paid=False,
+                date=datetime.utcnow())
+    items = []
+    stock_lines = []
+    total = 0.0
+    total_comm = 0.0
+
+    for item_type, item_id, quantity in lines:
+        if item_type == 'service':
+            svc = services.get(item_id)
+            if not svc:
+                continue
+            price = svc.price
+            # Service commission uses collaborator's percent
+            comm_val = price * (collaborator.commission_percent / 100.0)
+            items.append({'service_id': svc.id, 'product_id': None, 'item_name': svc.name, 'quantity': quantity,
+                          'price': price, 'commission': comm_val})
+        else:
+            prod = products.get(item_id)
+            if not prod:
+                continue
+            price = prod.price
+            # Product commission uses fixed value now
+            comm_val = prod.commission_fixed_value or 0.0
+
+            stock_lines.append((prod, quantity))
+            items.append({'service_id': None, 'product_id': prod.id, 'item_name': prod.name, 'quantity': quantity,
+                          'price': price, 'commission': comm_val})
+
+        total += price * quantity
+        total_comm += comm_val * quantity
+
+    sale.total_amount = total
+    sale.total_commission = total_comm
+    db.session.add(sale)
+    db.session.flush() # Get ID
+
+    # Deduct Stock (raises stock.OutOfStock; the caller rolls back)
+    if stock_lines:
+        stock.take(stock_lines, sale_id=sale.id)
+
+    if items:
+        db.session.execute(insert(SaleItem), [dict(item, sale_id=sale.id) for item in items])
+
+    register(sale, collaborator)
+    return sale
+
+
+def register(sale, collaborator=None):
+    """Account a new sale in the daily summary and the running balances."""
+    summary.apply_sale(sale, collaborator=collaborator)
+    balances.apply_sale(sale)
+    events.publish_sale(sale, collaborator or sale.collaborator)
+
+
+def unregister(sale):
+    """Reverse ``register`` for a sale that is about to be deleted.
+
+    Products sold in it go back to stock.
+    """
+    summary.apply_sale(sale, sign=-1)
+    balances.apply_sale(sale, sign=-1)
+    events.publish_sale(sale, sale.collaborator, sign=-1)
+
+    returned = db.session.query(SaleItem.product_id, func.sum(func.coalesce(SaleItem.quantity, 1)))\
+        .join(Product, Product.id == SaleItem.product_id)\
+        .filter(SaleItem.sale_id == sale.id)\
+        .group_by(SaleItem.product_id)\
+        .all()
+    if returned:
+        # SUM() is a Decimal on MySQL
+        stock.put([(product_id, int(quantity)) for product_id, quantity in returned], stock.RETURN, sale_id=sale.id)
@@ -0,0 +1,104 @@
+"""Product stock movements.
+
+Stock is never changed with a read-modify-write through the ORM. Sales go
+through ``take``, a conditional ``UPDATE ... SET quantity = quantity - n
+WHERE quantity >= n`` that either reserves every unit or touches nothing,
+so concurrent checkouts can neither oversell nor lose a decrement. Every
+change is also written to the StockMovement ledger, from which ``check``
+can audit (and rebuild) the current quantities. Rows are always updated in
+product id order, so concurrent carts cannot deadlock on MySQL row locks.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, insert, update
+
+from extensions import db
+from models import Product, StockMovement
+
+SALE = 'venda'
+RETURN = 'estorno'
+PURCHASE = 'compra'
+ADJUSTMENT = 'ajuste'
+OPENING = 'saldo inicial'
+
+
+class OutOfStock(Exception):
+    """Raised when a product does not have enough units for a sale."""
+
+    def __init__(self, product_id, name, requested):
+        self.product_id = product_id
+        self.name = name
+        self.requested = requested
+        super().__init__(f'Estoque insuficiente: {name} (pedido {requested})')
+
+
+def take(lines, sale_id=None):
+    """Remove stock for ``[(product, quantity)]`` or raise OutOfStock.
+
+    The caller must roll back on OutOfStock: earlier lines of the same call
+    may already have been decremented inside the transaction.
+    """
+    merged = {}
+    for product, quantity in lines:
+        merged[product.id] = (product, merged.get(product.id, (product, 0))[1] + quantity)
+    # Lock the rows in id order: two carts with the same products in another
+    # order would otherwise deadlock on InnoDB
+    for product, quantity in sorted(merged.values(), key=lambda line: line[0].id):
+        result = db.session.execute(
+            update(Product)
+            .where(Product.id == product.id, Product.quantity >= quantity)
+            .values(quantity=Product.quantity - quantity)
+            .execution_options(synchronize_session=False))
+        if result.rowcount != 1:
+            raise OutOfStock(product.id, product.name, quantity)
+    record([(product.id, -quantity, SALE, sale_id) for product, quantity in lines])
+
+
+def put(lines, reason, sale_id=None):
+    """Add stock back for ``[(product_id, quantity)]`` (returns, purchases)."""
+    for product_id, quantity in sorted(lines):  # Same lock order as ``take``
+        db.session.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(quantity=func.coalesce(Product.quantity, 0) + quantity)
+            .execution_options(synchronize_session=False))
+    record([(product_id, quantity, reason, sale_id) for product_id, quantity in lines])
+
+
+def record(movements):
+    """Write ``(product_id, quantity, reason, sale_id)`` rows to the ledger only.
+
+    Used directly when the product row was already changed by the caller
+    (e.g. the admin form editing the quantity).
+    """
+    now = datetime.utcnow()
+    rows = [{'product_id': product_id, 'quantity': quantity, 'reason': reason,
+             'sale_id': sale_id, 'date': now}
+            for product_id, quantity, reason, sale_id in movements if quantity]
+    if rows:
+        db.session.execute(insert(StockMovement), rows)
+
+
+def check(fix=False, opening=False):
+    """Compare Product.quantity with the sum of its ledger movements.
+
+    Returns ``[(product, stored, ledger_total)]`` for every mismatch.
+    ``fix=True`` rewrites the quantity from the ledger; ``opening=True``
+    instead records the difference as an opening-balance movement (used once
+    to start the ledger for products that existed before it).
+    """
+    totals = dict(db.session.query(StockMovement.product_id, func.sum(StockMovement.quantity))
+                  .group_by(StockMovement.product_id))
+    mismatches = []
+    for product in Product.query.order_by(Product.id):
+        stored = product.quantity or 0
+        ledger = int(totals.get(product.id) or 0) # SUM() is a Decimal on MySQL
+        if stored != ledger:
+            mismatches.append((product, stored, ledger))
+            if opening:
+                record([(product.id, stored - ledger, OPENING, None)])
+            elif fix:
+                product.quantity = ledger
+    if fix or opening:
+        db.session.commit()
+    return mismatches
@@ -0,0 +1,105 @@
+"""Maintenance of the DailySummary rollup table.
+
+Every code path that creates or deletes a Sale calls ``apply_sale`` inside
+its own transaction, so the summary commits (or rolls back) together with
+the sale. ``rebuild`` recomputes the whole table from the raw sales and is
+used for backfilling and repairing drift.
+
+Rows are split by the collaborator's current ``is_owner`` (team vs VIP),
+like the reports always did: the admin calls ``rebuild_collaborator`` in
+the same transaction that changes the flag.
+"""
+from sqlalchemy import delete, false, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Collaborator, Sale, DailySummary
+
+
+def _match(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _increment(key, sale_count, total_amount, total_commission):
+    stmt = update(DailySummary)\
+        .where(*[_match(getattr(DailySummary, k), v) for k, v in key.items()])\
+        .values(sale_count=DailySummary.sale_count + sale_count,
+                total_amount=DailySummary.total_amount + total_amount,
+                total_commission=DailySummary.total_commission + total_commission)\
+        .execution_options(synchronize_session=False)
+
+    if db.session.execute(stmt).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(DailySummary(sale_count=sale_count,
+                                        total_amount=total_amount,
+                                        total_commission=total_commission,
+                                        **key))
+    except IntegrityError:
+        # Another request created the row first; add on top of it
+        db.session.execute(stmt)
+
+
+def apply_sale(sale, sign=1, collaborator=None):
+    """Add (sign=1) or remove (sign=-1) a sale from its summary row."""
+    collaborator = collaborator or sale.collaborator
+    key = {
+        'day': sale.date.date(),
+        'collaborator_id': sale.collaborator_id,
+        'payment_method': sale.payment_method,
+        'is_owner': bool(collaborator.is_owner),
+    }
+    _increment(key,
+               sign,
+               sign * (sale.total_amount or 0.0),
+               sign * (sale.total_commission or 0.0))
+
+
+def _refill(collaborator_id=None):
+    """Replace the summary rows of every sale, or of one collaborator's (no commit)."""
+    day = func.date(Sale.date)
+    is_owner = func.coalesce(Collaborator.is_owner, false())
+    grouped = select(
+        day,
+        Sale.collaborator_id,
+        Sale.payment_method,
+        is_owner,
+        func.count(Sale.id),
+        func.coalesce(func.sum(Sale.total_amount), 0.0),
+        func.coalesce(func.sum(Sale.total_commission), 0.0),
+    ).join(Collaborator, Sale.collaborator_id == Collaborator.id)\
+        .where(Sale.date.isnot(None))\
+        .group_by(day, Sale.collaborator_id, Sale.payment_method, is_owner)
+    stale = delete(DailySummary)
+    if collaborator_id is not None:
+        grouped = grouped.where(Sale.collaborator_id == collaborator_id)
+        stale = stale.where(DailySummary.collaborator_id == collaborator_id)
+
+    db.session.execute(stale)
+    return db.session.execute(insert(DailySummary).from_select(
+        ['day', 'collaborator_id', 'payment_method', 'is_owner',
+         'sale_count', 'total_amount', 'total_commission'], grouped)).rowcount
+
+
+def rebuild():
+    """Recompute DailySummary from scratch. Returns the number of rows written.
+
+    The DELETE and the INSERT ... SELECT run in one transaction, so a sale
+    committed meanwhile is either in the SELECT or applied on top of the new
+    rows once the lock taken by the DELETE is released - never lost.
+    """
+    written = _refill()
+    db.session.commit()
+    return written
+
+
+def rebuild_collaborator(collaborator_id):
+    """Recompute one collaborator's rows, in the caller's transaction.
+
+    Rows are keyed on the collaborator's current ``is_owner``: when it
+    changes, the collaborator's past sales move between team and VIP.
+    """
+    db.session.flush()  # The new is_owner must be visible to the SELECT
+    return _refill(collaborator_id)
@@ -0,0 +1,32 @@
+from app import create_app
+from extensions import db
+import replica
+import sys
+import time
+
+app = create_app()
+
+def snapshot_replica(every):
+    with app.app_context():
+        engine = db.engines.get(replica.BIND)
+        if engine is None:
+            print("ERRO: defina REPLICA_DATABASE_URL (ex. sqlite:///instance/replica.db) para usar a réplica.")
+            sys.exit(1)
+        if db.engine.dialect.name != 'sqlite' or engine.dialect.name != 'sqlite':
+            print("ERRO: a cópia por arquivo só vale para SQLite; no MySQL use a replicação do próprio servidor.")
+            sys.exit(1)
+        primary, target = db.engine.url.database, engine.url.database
+
+    while True:
+        start = time.perf_counter()
+        replica.snapshot(primary, target)
+        print(f"{time.strftime('%H:%M:%S')} Réplica atualizada em {time.perf_counter() - start:.1f}s: {target}")
+        if not every:
+            break
+        time.sleep(every)
+
+if __name__ == "__main__":
+    # --every N: refresh the copy every N seconds until interrupted
+    args = sys.argv[1:]
+    every = int(args[args.index('--every') + 1]) if '--every' in args else 0
+    snapshot_replica(every)
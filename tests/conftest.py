@@ -0,0 +1,92 @@
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from extensions import db as _db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # create_app registers the admin views on a module-level Admin, so one app per session
+    db_path = tmp_path_factory.mktemp('db') / 'barber.db'
+    return create_app({
+        'TESTING': True,
+        # Every request recomputes (tests/test_cache.py turns it back on)
+        'CACHE_TTL': 0,
+        # Live streams send what is pending and end (tests/test_events.py)
+        'LIVE_STREAM_SECONDS': 0,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(db_path),
+    })
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        _db.drop_all()
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@contextmanager
+def count_queries(engine):
+    """Collect the SQL statements executed on ``engine`` inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed(n_sales):
+    """Fill the (empty) test database with a small shop and ``n_sales`` sales."""
+    from models import Collaborator, Service, Product, Sale, SaleItem, Expense, CashAdvance
+    from services import summary, balances, stock
+
+    owner = Collaborator(name='Dono', is_owner=True, commission_percent=0.0, token='owner')
+    team = [Collaborator(name=f'Barbeiro {i}', commission_percent=50.0, token=f'team-{i}') for i in range(3)]
+    services = [Service(name='Corte', price=40.0), Service(name='Barba', price=25.0)]
+    products = [Product(name='Pomada', price=30.0, cost_price=12.0, commission_fixed_value=3.0, quantity=100)]
+    _db.session.add_all([owner] + team + services + products)
+    _db.session.flush()
+
+    collabs = [owner] + team
+    methods = ['Dinheiro', 'Pix', 'Débito', 'Crédito']
+    now = datetime.now()
+    for i in range(n_sales):
+        collab = collabs[i % len(collabs)]
+        svc = services[i % len(services)]
+        comm = 0.0 if collab.is_owner else svc.price * collab.commission_percent / 100.0
+        sale = Sale(collaborator=collab, date=now - timedelta(hours=i * 7),
+                    total_amount=svc.price, total_commission=comm,
+                    payment_method=methods[i % len(methods)], client_name=f'Cliente {i}',
+                    commission_paid=collab.is_owner)
+        sale.items.append(SaleItem(service_id=svc.id, item_name=svc.name, price=svc.price, commission=comm))
+        _db.session.add(sale)
+
+    for collab in team:
+        _db.session.add(CashAdvance(collaborator=collab, amount=10.0, description='Vale', date=now.date()))
+    _db.session.add(Expense(description='Aluguel', amount=500.0, category='Aluguel', date=now.date()))
+    _db.session.commit()
+
+    summary.rebuild()
+    balances.check(fix=True)
+    stock.check(opening=True)
+    return {'owner': owner.id, 'team': [c.id for c in team]}
@@ -0,0 +1,52 @@
+from conftest import seed
+from models import Collaborator, CashAdvance, Sale
+from services import balances
+
+
+def test_running_balances_follow_sales_advances_and_payments(client, db):
+    ids = seed(30)
+    collab_id = ids['team'][0]
+    assert balances.check() == []
+
+    with client.session_transaction() as sess:
+        sess['collab_id'] = collab_id
+    response = client.post('/sale/new', json={
+        'payment_method': 'Pix',
+        'items': [{'type': 'service', 'id': 1}, {'type': 'product', 'id': 1}],
+    })
+    assert response.json['success']
+
+    client.post('/admin/vip/', data={'type': 'service', 'item_id': 1, 'price': '40',
+                                     'payment_method': 'Dinheiro', 'client_name': 'VIP'})
+    db.session.add(CashAdvance(collaborator_id=collab_id, amount=15.0, description='Vale extra'))
+    db.session.flush()
+    balances.refresh_advances([collab_id])
+    db.session.commit()
+
+    sale_id = Sale.query.filter_by(collaborator_id=ids['team'][1]).first().id
+    client.post(f'/admin/dashboard/delete_sale/{sale_id}')
+    assert balances.check() == []
+
+    collab = db.session.get(Collaborator, collab_id)
+    expected_net = collab.balance
+    assert expected_net > 0
+
+    client.post(f'/admin/payments/confirm/{collab_id}')
+    db.session.expire_all()
+    collab = db.session.get(Collaborator, collab_id)
+    assert collab.unpaid_commission == 0.0
+    assert collab.outstanding_advances == 0.0
+    assert balances.check() == []
+
+
+def test_check_reports_and_fixes_drift(db):
+    ids = seed(10)
+    collab = db.session.get(Collaborator, ids['team'][0])
+    collab.unpaid_commission = 999.0
+    db.session.commit()
+
+    mismatches = balances.check()
+    assert [(c.id, field) for c, field, _, _ in mismatches] == [(collab.id, 'unpaid_commission')]
+
+    balances.check(fix=True)
+    assert balances.check() == []
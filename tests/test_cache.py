@@ -0,0 +1,103 @@
+from datetime import date
+
+import pytest
+
+import cache
+from conftest import count_queries, seed
+from extensions import db as _db
+from models import CashAdvance, Expense, Service
+
+
+@pytest.fixture
+def cached(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, 'CACHE_TTL', 60)
+    cache.backend.clear()
+    yield
+    cache.backend.clear()
+
+
+def _load(client, url):
+    with count_queries(_db.engine) as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.get_data(as_text=True), len(statements)
+
+
+def test_local_backend_evicts_least_recently_used(monkeypatch):
+    backend = cache.LocalBackend(max_entries=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    assert backend.get('a') == 1  # b is now the oldest
+    backend.set('c', 3, 60)
+    assert backend.get('b') is None
+    assert (backend.get('a'), backend.get('c')) == (1, 3)
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now + 61)
+    assert backend.get('a') is None
+
+
+def test_sqlite_backend_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    worker, other = cache.SqliteBackend(path), cache.SqliteBackend(path)
+    worker.set('dashboard:month', {'total': 12.5}, 60)
+    assert other.get('dashboard:month') == {'total': 12.5}
+    worker.incr('gen:sale')
+    worker.incr('gen:sale')
+    assert other.counters(['gen:sale', 'gen:expense']) == [2, 0]
+    assert cache.backend_from_url('sqlite:///' + path).get('dashboard:month') == {'total': 12.5}
+    with pytest.raises(ValueError):
+        cache.backend_from_url('redis://localhost')
+
+
+def test_dashboard_is_cached_until_an_expense_is_written(client, cached):
+    seed(20)
+    first, queries = _load(client, '/admin/dashboard/?period=all')
+    again, cached_queries = _load(client, '/admin/dashboard/?period=all')
+    assert again == first
+    assert cached_queries < queries
+
+    assert 'R$ 500<' in first
+    _db.session.add(Expense(description='Conta de luz', amount=1000.0, date=date.today()))
+    _db.session.commit()
+    fresh, fresh_queries = _load(client, '/admin/dashboard/?period=all')
+    assert fresh_queries == queries
+    assert 'R$ 1500<' in fresh
+
+
+def test_new_sale_refreshes_financial_control(client, cached):
+    ids = seed(0)
+    _, queries = _load(client, '/admin/financial/')
+    _, cached_queries = _load(client, '/admin/financial/')
+    assert cached_queries < queries
+
+    with client.session_transaction() as sess:
+        sess['collab_id'] = ids['team'][0]
+    response = client.post('/sale/new', json={'items': [{'type': 'service', 'id': 1}], 'payment_method': 'Pix'})
+    assert response.json['success']
+    page, fresh_queries = _load(client, '/admin/financial/')
+    assert fresh_queries >= queries > cached_queries
+    assert 'Barbeiro 0' in page
+
+
+def test_unrelated_and_rolled_back_writes_keep_the_entry(client, cached):
+    ids = seed(5)
+    _load(client, '/admin/financial/')
+
+    _db.session.add(Service(name='Hidratação', price=45.0))
+    _db.session.commit()
+    _db.session.add(CashAdvance(collaborator_id=ids['team'][0], amount=50.0, description='Vale'))
+    _db.session.flush()
+    _db.session.rollback()
+    _, queries = _load(client, '/admin/financial/')
+    assert queries == 0
+
+    # Bulk UPDATEs count as writes too
+    _db.session.execute(_db.update(CashAdvance).values(is_paid=True))
+    _db.session.execute(_db.update(Expense).values(amount=1.0))
+    _db.session.commit()
+    assert _load(client, '/admin/financial/')[1] == 0
+    _, dashboard_queries = _load(client, '/admin/dashboard/')
+    _db.session.execute(_db.update(Expense).values(amount=2.0))
+    _db.session.commit()
+    assert _load(client, '/admin/dashboard/')[1] == dashboard_queries
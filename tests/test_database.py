@@ -0,0 +1,37 @@
+import sqlite3
+
+from sqlalchemy import text
+
+import database
+
+
+def test_sqlite_connections_are_tuned(db):
+    with db.engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+
+
+def test_reader_is_not_blocked_by_open_write(db):
+    path = db.engine.url.database
+    writer = sqlite3.connect(path, isolation_level=None)
+    reader = sqlite3.connect(path, timeout=0)
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute("INSERT INTO expense (description, amount, category) VALUES ('Luz', 10, 'Geral')")
+        # Under the rollback journal this read would wait for the writer; with WAL it sees the last commit
+        assert reader.execute('SELECT COUNT(*) FROM expense').fetchone() == (0,)
+        writer.execute('COMMIT')
+        assert reader.execute('SELECT COUNT(*) FROM expense').fetchone() == (1,)
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_engine_options_per_backend():
+    assert 'pool_size' not in database.engine_options('sqlite:///x.db')
+    assert database.engine_options('sqlite:///x.db', lock_timeout=2500)['connect_args'] == {'timeout': 2.5}
+    options = database.engine_options('mysql+pymysql://u:p@host/barber', pool_size=5)
+    assert options['pool_pre_ping'] is True
+    assert options['pool_size'] == 5
+    assert options['pool_recycle'] == database.POOL_RECYCLE
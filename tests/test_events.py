@@ -0,0 +1,93 @@
+import json
+import threading
+
+import events
+from conftest import seed
+from extensions import db as _db
+from models import Collaborator, LiveEvent, Sale
+from services import sales
+
+
+def _login(client, collab_id):
+    with client.session_transaction() as sess:
+        sess['collab_id'] = collab_id
+
+
+def _published():
+    return [(e.kind, json.loads(e.data)) for e in LiveEvent.query.order_by(LiveEvent.id)]
+
+
+def _stream(client, since):
+    response = client.get(f'/admin/live/?since={since}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    return response.get_data(as_text=True)
+
+
+def test_checkout_and_deletion_publish_their_deltas(client, db):
+    ids = seed(0)
+    since = events.head()
+    _login(client, ids['team'][0])
+    response = client.post('/sale/new', json={'client_name': 'Ana', 'payment_method': 'Pix',
+                                              'items': [{'type': 'service', 'id': 1, 'quantity': 2}]})
+    assert response.json['success']
+
+    [(kind, sale)] = _published()
+    assert kind == 'sale'
+    assert (sale['client_name'], sale['collaborator'], sale['payment_method']) == ('Ana', 'Barbeiro 0', 'Pix')
+    assert sale['items'] == [['Corte', 2]]
+    assert sale['delta'] == {'revenue': 80.0, 'vip_revenue': 0.0, 'team_revenue': 80.0,
+                             'commission': 40.0, 'services': 1, 'net_profit': 40.0}
+
+    sale_id = Sale.query.one().id
+    assert client.post(f'/admin/dashboard/delete_sale/{sale_id}').status_code == 302
+    kind, deleted = _published()[-1]
+    assert (kind, deleted['id']) == ('sale_deleted', sale_id)
+    assert deleted['delta']['revenue'] == -80.0 and deleted['delta']['services'] == -1
+
+    body = _stream(client, since)
+    assert body.startswith('retry: 3000\n\n')
+    assert body.count('event: sale\n') == 1 and body.count('event: sale_deleted\n') == 1
+    # A screen rendered after both events gets nothing
+    assert 'event:' not in _stream(client, events.head())
+
+
+def test_rolled_back_sale_publishes_nothing(db):
+    ids = seed(0)
+    collab = db.session.get(Collaborator, ids['team'][0])
+    sale = Sale(collaborator=collab, total_amount=40.0, total_commission=20.0, payment_method='Pix')
+    db.session.add(sale)
+    db.session.flush()
+    sales.register(sale)
+    db.session.rollback()
+    assert _published() == []
+    assert 'live_events' not in db.session.info
+
+
+def test_screens_render_the_event_they_start_from(client, db):
+    ids = seed(5)
+    _login(client, ids['owner'])
+    client.post('/sale/new', json={'payment_method': 'Dinheiro', 'items': [{'type': 'service', 'id': 2}]})
+    head = events.head()
+    assert head > 0
+    for url in ('/admin/dashboard/', '/admin/financial/'):
+        page = client.get(url).get_data(as_text=True)
+        assert f'/admin/live/?since={head}' in page
+
+
+def test_stream_asks_far_behind_screens_to_reload(client, db, monkeypatch):
+    seed(0)
+    monkeypatch.setattr(events, 'BUFFER', 2)
+    for i in range(3):
+        events.publish('sale', {'id': i})
+    _db.session.commit()
+    body = _stream(client, 0)
+    assert 'event: reload\n' in body and 'event: sale\n' not in body
+
+
+def test_finished_stream_leaves_no_broker_thread(client, db):
+    seed(0)
+    for _ in range(3):
+        _stream(client, 0)
+    assert events.broker.thread is None and events.broker.subscribers == 0
+    assert not any(t.name == 'live-events' for t in threading.enumerate())
@@ -0,0 +1,52 @@
+import csv
+import io
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import seed
+from services import exports
+
+
+def _csv(response):
+    return _parse(response.get_data(as_text=True))
+
+
+def _parse(text):
+    return list(csv.reader(io.StringIO(text.lstrip('\ufeff'))))
+
+
+@pytest.mark.parametrize('name', list(exports.DATASETS))
+def test_every_dataset_exports(client, db, name):
+    seed(20)
+    response = client.get(f'/admin/exports/{name}.csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.is_streamed
+    assert _csv(response)[0] == exports.DATASETS[name][1]
+
+
+def test_sales_export_filters_and_chunks(client, db, monkeypatch):
+    ids = seed(60)
+    monkeypatch.setattr(exports, 'CHUNK_SIZE', 7)
+    collab_id = ids['team'][0]
+    today = date.today()
+
+    response = client.get(f'/admin/exports/sales.csv?collaborator_id={collab_id}')
+    chunks = [chunk.decode('utf-8') for chunk in response.response]
+    assert len(chunks) > 2  # written as it is read, not in one piece
+    rows = _parse(''.join(chunks))[1:]
+    assert len(rows) == 15
+    assert {row[2] for row in rows} == {'Barbeiro 0'}
+
+    start = (today - timedelta(days=3)).isoformat()
+    rows = _csv(client.get(f'/admin/exports/items.csv?start={start}&end={today.isoformat()}'))[1:]
+    assert 0 < len(rows) < 60
+    assert all(row[2][:10] >= start for row in rows)
+
+
+def test_export_rejects_bad_filters(client, db):
+    assert client.get('/admin/exports/nope.csv').status_code == 400
+    assert client.get('/admin/exports/sales.csv?start=ontem').status_code == 400
+    assert client.get('/admin/exports/expenses.csv?collaborator_id=1').status_code == 400
+    assert client.get('/admin/exports/').status_code == 200
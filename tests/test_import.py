@@ -0,0 +1,139 @@
+import io
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from conftest import seed
+from models import DailySummary, Expense, Product, Sale, SaleItem
+from services import balances, importer, summary
+
+
+SALES_CSV = """data;colaborador;item;quantidade;preco;cliente;pagamento;paga;venda
+01/02/2023 10:00;Barbeiro 0;Corte;;;Ana;Pix;;A1
+01/02/2023 10:00;Barbeiro 0;Pomada;2;;Ana;Pix;;A1
+02/02/2023;barbeiro 1;Barba;;;;;não;
+03/02/2023;Ninguém;Corte;;;;;;
+04/02/2023;Barbeiro 2;Escova Antiga;;35,50;;;;
+05/02/2023;Barbeiro 2;Corte;zero;;;;;
+"""
+
+
+def test_sales_import_resolves_names_and_reports_errors(db):
+    ids = seed(0)
+    result = importer.run('sales', io.StringIO(SALES_CSV))
+    importer.finish('sales')
+
+    assert result.inserted == 3
+    assert [line for line, _ in result.errors] == [5, 7]
+    assert 'Ninguém' in result.errors[0][1]
+
+    first = Sale.query.filter_by(client_name='Ana').one()
+    assert first.collaborator_id == ids['team'][0]
+    assert first.total_amount == 40.0 + 2 * 30.0
+    assert first.total_commission == 20.0 + 2 * 3.0
+    assert first.commission_paid is True
+    assert SaleItem.query.filter_by(sale_id=first.id).count() == 2
+
+    unpaid = Sale.query.filter_by(collaborator_id=ids['team'][1]).one()
+    assert unpaid.commission_paid is False
+    legacy = SaleItem.query.filter_by(item_name='Escova Antiga').one()
+    assert legacy.price == 35.5 and legacy.service_id is None and legacy.product_id is None
+
+    # History does not move stock; derived tables are rebuilt
+    assert Product.query.filter_by(name='Pomada').one().quantity == 100
+    assert balances.check() == []
+    assert summary.rebuild() > 0
+
+
+def test_import_resumes_from_checkpoint(db, tmp_path):
+    seed(0)
+    rows = ''.join(f'2023-01-{day:02d},Conta {n},{n}.00,Geral\n'
+                   for n, day in enumerate(range(1, 29), start=1))
+    text = 'data,descricao,valor,categoria\n' + rows
+    checkpoint = str(tmp_path / 'despesas.checkpoint')
+
+    def failing_lines():
+        for i, line in enumerate(io.StringIO(text)):
+            if i == 20:
+                raise RuntimeError('queda de energia')
+            yield line
+
+    with pytest.raises(RuntimeError):
+        importer.run('expenses', failing_lines(), chunk_size=5, checkpoint=checkpoint)
+    db.session.rollback()
+    assert Expense.query.count() == 1 + 15  # the seed's expense + three committed chunks
+
+    result = importer.run('expenses', io.StringIO(text), chunk_size=5, checkpoint=checkpoint)
+    assert result.resumed_from == 16
+    assert Expense.query.count() == 1 + 28
+    assert Expense.query.filter_by(description='Conta 16').count() == 1
+
+
+def test_products_import_records_opening_stock(db):
+    from services import stock
+    seed(0)
+    text = 'nome,preco,custo,comissao,quantidade\nShampoo,45,20,5,12\nPomada,30,,,\nCera,,,,\n'
+    result = importer.run('products', io.StringIO(text))
+    assert result.inserted == 1
+    assert len(result.errors) == 2
+    assert Product.query.filter_by(name='Shampoo').one().quantity == 12
+    assert stock.check() == []
+
+
+def test_missing_columns_and_admin_upload(client, db):
+    seed(0)
+    with pytest.raises(ValueError):
+        importer.run('expenses', io.StringIO('data,valor\n2023-01-01,10\n'))
+
+    data = {'kind': 'expenses',
+            'file': (io.BytesIO('data;descrição;valor\n01/01/2023;Luz;150,90\n'.encode('utf-8-sig')), 'x.csv')}
+    response = client.post('/admin/imports/', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert Expense.query.filter_by(description='Luz').one().amount == 150.9
+
+
+def test_admin_upload_reports_database_errors(client, db, monkeypatch):
+    seed(0)
+    parse, write = importer.PIPELINES['sales']
+
+    def write_once(batch, result):
+        if result.inserted:
+            raise IntegrityError('INSERT INTO sale', {}, Exception('UNIQUE constraint failed: sale.id'))
+        write(batch, result)
+
+    monkeypatch.setattr(importer, 'CHUNK_SIZE', 1)
+    monkeypatch.setitem(importer.PIPELINES, 'sales', (parse, write_once))
+    text = 'data,colaborador,item\n2023-03-01,Barbeiro 0,Corte\n2023-03-02,Barbeiro 1,Barba\n'
+    data = {'kind': 'sales', 'file': (io.BytesIO(text.encode()), 'vendas.csv')}
+    response = client.post('/admin/imports/', data=data, content_type='multipart/form-data',
+                           follow_redirects=True)
+    assert response.status_code == 200
+    assert 'Erro na importação' in response.get_data(as_text=True)
+
+    # The first chunk was committed; the summary was rebuilt to include it
+    sale = Sale.query.one()
+    assert [i.item_name for i in SaleItem.query.filter_by(sale_id=sale.id)] == ['Corte']
+    assert DailySummary.query.one().sale_count == 1
+
+
+@pytest.mark.parametrize('text,amount', [
+    ('150,90', 150.9), ('R$ 1.500,00', 1500.0), ('1.500.000', 1500000.0), ('1500,5', 1500.5),
+    ('12.50', 12.5), ('1.5', 1.5), ('10', 10.0),
+])
+def test_money_accepts_brazilian_and_plain_amounts(text, amount):
+    assert importer._money(text, 'valor') == amount
+
+
+@pytest.mark.parametrize('text', ['1.500', 'R$ 2.000', '1,234.56', '1.23.456', '1,2,3', 'dez'])
+def test_money_refuses_ambiguous_amounts(text):
+    with pytest.raises(importer.RowError):
+        importer._money(text, 'valor')
+
+
+def test_ambiguous_amounts_are_reported_not_guessed(db):
+    text = 'data;descricao;valor\n01/01/2023;Aluguel;1.500\n02/01/2023;Luz;1.500,00\n03/01/2023;Água;1,234.56\n'
+    result = importer.run('expenses', io.StringIO(text))
+    assert result.inserted == 1
+    assert [line for line, _ in result.errors] == [2, 4]
+    assert 'ambíguo' in result.errors[0][1]
+    assert Expense.query.one().amount == 1500.0
@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+
+import instrumentation
+from conftest import count_queries, seed
+from extensions import db as _db
+
+
+@pytest.fixture
+def metrics(app, client):
+    seed(20)
+    instrumentation.registry.reset()
+    app.config.update(METRICS_HEADER=True)
+    yield instrumentation.registry
+    app.config.update(METRICS_HEADER=False, SLOW_REQUEST_MS=instrumentation.SLOW_REQUEST_MS, METRICS_TOKEN=None)
+
+
+def _get(client, url):
+    # Requests are recorded when the server closes the response, after the body
+    response = client.get(url)
+    response.get_data()
+    response.close()
+    return response
+
+
+def test_debug_header_counts_queries(client, metrics):
+    response = client.get('/admin/financial/')
+    assert response.status_code == 200
+    fields = dict(part.split('=') for part in response.headers['X-Debug-Queries'].split('; '))
+    assert int(fields['count']) > 0
+    assert float(fields['template_ms']) > 0
+    assert float(fields['total_ms']) >= float(fields['sql_ms'])
+
+
+def test_metrics_endpoint_reports_percentiles(client, metrics):
+    for _ in range(3):
+        _get(client, '/admin/financial/')
+    text = client.get('/admin/metrics/').get_data(as_text=True)
+
+    assert '# TYPE barbearia_request_seconds summary' in text
+    assert 'barbearia_request_seconds_count{endpoint="financial.index"} 3' in text
+    assert 'barbearia_request_queries{endpoint="financial.index",quantile="0.5"}' in text
+    assert 'metrics.index' not in text
+
+
+def test_metrics_token(app, client, metrics):
+    app.config['METRICS_TOKEN'] = 'segredo'
+    assert client.get('/admin/metrics/').status_code == 401
+    assert client.get('/admin/metrics/', headers={'Authorization': 'Bearer segredo'}).status_code == 200
+
+
+def test_slow_request_is_logged_with_its_queries(app, client, metrics, caplog):
+    app.config['SLOW_REQUEST_MS'] = 0
+    with caplog.at_level(logging.WARNING, logger='barbearia.slow'):
+        _get(client, '/admin/financial/')
+    report = caplog.records[-1].getMessage()
+    assert report.startswith('GET /admin/financial/ (financial.index)')
+    assert 'SELECT' in report
+
+
+def test_streamed_export_counts_the_statements_of_its_body(client, metrics):
+    with count_queries(_db.engine) as statements:
+        response = _get(client, '/admin/exports/sales.csv')
+    assert response.status_code == 200
+    assert len(response.get_data(as_text=True).splitlines()) == 21
+
+    header = dict(part.split('=') for part in response.headers['X-Debug-Queries'].split('; '))
+    count, totals, _ = metrics.snapshot()['exports.download']
+    assert count == 1
+    assert totals['queries'] == len(statements) > int(header['count'])
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import inspect, text
+
+import migrations
+from conftest import seed
+from models import Collaborator, DailySummary, SaleItem
+from services import balances
+
+
+@pytest.fixture
+def engine(db):
+    yield db.engine
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS schema_version'))
+
+
+def _columns(engine, table):
+    return {c['name'] for c in inspect(engine).get_columns(table)}
+
+
+def test_fresh_database_gets_every_table(db, engine):
+    db.drop_all()
+    applied = migrations.run(engine, out=lambda line: None)
+    assert applied == sorted(v for v, _, _, _ in migrations.STEPS)
+    assert set(inspect(engine).get_table_names()) == set(db.metadata.tables) | {'schema_version'}
+    assert migrations.run(engine, out=lambda line: None) == []
+
+
+def test_legacy_database_is_upgraded_in_place(db, engine):
+    ids = seed(30)
+    with engine.begin() as conn:
+        # Roll the schema back to what the old migrate_*.py scripts left behind
+        conn.execute(text('DROP TABLE daily_summary'))
+        conn.execute(text('ALTER TABLE sale_item DROP COLUMN quantity'))
+        for column in ('unpaid_commission', 'total_earnings', 'outstanding_advances'):
+            conn.execute(text(f'ALTER TABLE collaborator DROP COLUMN {column}'))
+        for name, _, _ in migrations.INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+
+    lines = []
+    migrations.run(engine, dry_run=True, out=lines.append)
+    assert any('ADD COLUMN quantity' in line for line in lines)
+    assert not inspect(engine).has_table('schema_version')
+    assert 'quantity' not in _columns(engine, 'sale_item')
+
+    migrations.run(engine, out=lambda line: None, chunk_size=7)
+    db.session.expire_all()
+    assert 'quantity' in _columns(engine, 'sale_item')
+    assert {i['name'] for i in inspect(engine).get_indexes('sale')} >= {'ix_sale_date', 'ix_sale_collaborator_paid'}
+    assert SaleItem.query.filter(SaleItem.quantity != 1).count() == 0
+    assert db.session.get(Collaborator, ids['team'][0]).unpaid_commission > 0
+    assert balances.check() == []
+    assert DailySummary.query.count() > 0
+
+
+def test_backfill_updates_in_chunks(db, engine):
+    seed(30)
+    with engine.begin() as conn:
+        conn.execute(text('UPDATE sale SET client_name = NULL'))
+    m = migrations.Migrator(engine, out=lambda line: None, chunk_size=4)
+    m.backfill('sale', "client_name = 'Cliente'", 'client_name IS NULL')
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM sale WHERE client_name IS NULL')).scalar() == 0
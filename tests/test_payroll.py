@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import count_queries, seed
+from models import CashAdvance, PaymentRecord, Sale
+from services import balances, payroll
+
+
+def test_confirm_payment_links_rows_with_bounded_queries(client, db):
+    ids = seed(400)
+    collab_id = ids['team'][0]
+    totals = payroll.pending(collab_id)
+    assert totals.sale_count == 100
+
+    with count_queries(db.engine) as statements:
+        response = client.post(f'/admin/payments/confirm/{collab_id}')
+    assert response.status_code == 302
+    assert len(statements) < 20
+
+    payment = PaymentRecord.query.one()
+    assert payment.total_commission == pytest.approx(totals.total_commission)
+    assert payment.total_advances == 10.0
+    assert payment.start_date == totals.start.date()
+    assert payment.end_date == totals.end.date()
+    assert Sale.query.filter_by(payment_record_id=payment.id).count() == 100
+    assert Sale.query.filter_by(collaborator_id=collab_id, commission_paid=False).count() == 0
+    assert CashAdvance.query.filter_by(payment_record_id=payment.id, is_paid=True).count() == 1
+    assert balances.check() == []
+
+
+def test_sale_registered_mid_closing_stays_pending(db):
+    ids = seed(40)
+    collab_id = ids['team'][0]
+    totals = payroll.pending(collab_id)
+
+    late = Sale(collaborator_id=collab_id, date=datetime.now(), total_amount=40.0,
+                total_commission=20.0, payment_method='Pix', commission_paid=False)
+    db.session.add(late)
+    db.session.flush()
+    payment = payroll.close(collab_id, totals)
+    db.session.commit()
+
+    assert late.id > totals.max_sale_id
+    db.session.expire_all()
+    assert db.session.get(Sale, late.id).commission_paid is False
+    assert Sale.query.filter_by(payment_record_id=payment.id).count() == totals.sale_count
+
+
+def test_changed_rows_abort_the_closing(db):
+    ids = seed(40)
+    collab_id = ids['team'][0]
+    totals = payroll.pending(collab_id)
+
+    # Someone else pays one of the counted sales in the meantime
+    sale = Sale.query.filter_by(collaborator_id=collab_id, commission_paid=False).first()
+    sale.commission_paid = True
+    db.session.flush()
+
+    with pytest.raises(payroll.PendingChanged):
+        payroll.close(collab_id, totals)
+    db.session.rollback()
+    assert PaymentRecord.query.count() == 0
+
+
+def test_confirm_all_closes_every_positive_balance(client, db):
+    ids = seed(120)
+    broke, paid_a, paid_b = ids['team']
+    db.session.add(CashAdvance(collaborator_id=broke, amount=10000.0, description='Vale alto'))
+    db.session.flush()
+    balances.refresh_advances([broke])
+    db.session.commit()
+
+    with count_queries(db.engine) as statements:
+        response = client.post('/admin/payments/confirm-all')
+    assert response.status_code == 200
+    assert 'Saldo negativo' in response.get_data(as_text=True)
+    assert len(statements) < 40
+
+    payments = {p.collaborator_id: p for p in PaymentRecord.query}
+    assert set(payments) == {paid_a, paid_b}
+    for collab_id in (paid_a, paid_b):
+        assert Sale.query.filter_by(collaborator_id=collab_id, commission_paid=False).count() == 0
+        assert Sale.query.filter_by(payment_record_id=payments[collab_id].id).count() == 30
+    assert Sale.query.filter_by(collaborator_id=broke, commission_paid=False).count() == 30
+    assert balances.check() == []
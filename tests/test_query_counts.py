@@ -0,0 +1,179 @@
+"""Every route and admin view must run the same number of SQL statements
+whatever the size of the history.
+
+The same synthetic shop (benchmarks/synthetic.py, same catalog and the
+same DAYS of history) is generated once with each of SIZES sales and kept
+as a file; before each request the file is copied over the test database,
+so POSTs start from the same state at both sizes. A lazy load inside a
+loop over sales, items or payments makes the larger shop run more
+statements and fails here instead of in the shop.
+"""
+import io
+import os
+import sys
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from conftest import count_queries
+from extensions import db as _db
+import replica
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import synthetic  # noqa: E402
+
+SIZES = (100, 10_000)
+DAYS = 28
+
+# Flask-Admin plumbing that no page of the app links to
+SKIPPED = {'static', 'admin.static'}
+SKIPPED_ACTIONS = ('.ajax_lookup', '.ajax_update', '.action_view', '.delete_view', '.export', '.details_view')
+
+MODEL_VIEWS = ('collaborator', 'service', 'product', 'expense', 'cashadvance', 'supplier', 'supplierpayment')
+
+CART = {'items': [{'type': 'service', 'id': 1}, {'type': 'product', 'id': 1}],
+        'payment_method': 'Pix', 'client_name': 'Teste'}
+EXPENSES_CSV = 'data;descricao;valor\n01/02/2023;Café;12,50\n02/02/2023;Papel;8,00\n'
+
+# (endpoint, method, url, who, request kwargs). who: None, 'admin' or 'collab'
+# (the barber with the id {barber}). {payment} is that barber's last closed
+# week, {payments} the last three closed payments, {sale} the newest sale.
+CASES = [
+    ('main.index', 'GET', '/', None, {}),
+    ('main.admin_login', 'GET', '/admin/login', None, {}),
+    ('main.magic_login', 'GET', '/login/synthetic-1', None, {}),
+    ('main.magic_login', 'POST', '/login/synthetic-1', None, {'data': {'password': synthetic.PASSWORD}}),
+    ('main.logout', 'GET', '/logout', 'collab', {}),
+    ('main.dashboard', 'GET', '/dashboard', 'collab', {}),
+    ('main.new_sale', 'GET', '/sale/new', 'collab', {}),
+    ('main.new_sale', 'POST', '/sale/new', 'collab', {'json': CART}),
+    ('main.reset_commissions', 'POST', '/reset-commissions', 'collab', {}),
+    ('main.my_receipts', 'GET', '/my-receipts', 'collab', {}),
+    ('main.receipt_detail', 'GET', '/my-receipts/{payment}', 'collab', {}),
+    ('admin.index', 'GET', '/admin/', 'admin', {}),
+    ('dashboard.index', 'GET', '/admin/dashboard/', 'admin', {}),
+    ('dashboard.index', 'GET', '/admin/dashboard/?period=today', 'admin', {}),
+    ('dashboard.index', 'GET', '/admin/dashboard/?period=week', 'admin', {}),
+    ('dashboard.index', 'GET', '/admin/dashboard/?period=all', 'admin', {}),
+    ('dashboard.series', 'GET', '/admin/dashboard/series?days=90&bucket=week', 'admin', {}),
+    ('dashboard.delete_sale', 'POST', '/admin/dashboard/delete_sale/{sale}', 'admin', {}),
+    ('vip.index', 'GET', '/admin/vip/', 'admin', {}),
+    ('financial.index', 'GET', '/admin/financial/', 'admin', {}),
+    ('payments.index', 'GET', '/admin/payments/', 'admin', {}),
+    ('payments.confirm_payment', 'POST', '/admin/payments/confirm/{barber}', 'admin', {}),
+    ('payments.confirm_all', 'POST', '/admin/payments/confirm-all', 'admin', {}),
+    ('payments.export_receipts', 'GET', '/admin/payments/export?ids={payments}', 'admin', {}),
+    ('payments.receipt_view', 'GET', '/admin/payments/receipt/{payment}', 'admin', {}),
+    ('payments.receipt_view', 'GET', '/admin/payments/receipt/{payment}?group=day', 'admin', {}),
+    ('payments.collab_report_view', 'GET', '/admin/payments/collab_report/{payment}', 'admin', {}),
+    ('paymentrecord.index_view', 'GET', '/admin/paymentrecord/', 'admin', {}),
+    ('supplier.statement_view', 'GET', '/admin/supplier/statement/1', 'admin', {}),
+    ('exports.index', 'GET', '/admin/exports/', 'admin', {}),
+    *[('exports.download', 'GET', f'/admin/exports/{name}.csv', 'admin', {})
+      for name in ('sales', 'items', 'expenses', 'advances', 'payments', 'supplier_payments')],
+    ('imports.index', 'GET', '/admin/imports/', 'admin', {}),
+    ('imports.index', 'POST', '/admin/imports/', 'admin', {'data': {'kind': 'expenses'}, 'csv': EXPENSES_CSV}),
+    ('metrics.index', 'GET', '/admin/metrics/', 'admin', {}),
+    ('live.index', 'GET', '/admin/live/?since=0', 'admin', {}),
+    *[(f'{view}.{action}', 'GET', f'/admin/{view}/{path}', 'admin', {})
+      for view in MODEL_VIEWS for action, path in (('index_view', ''), ('create_view', 'new/'),
+                                                    ('edit_view', 'edit/?id=1'))],
+    ('paymentrecord.edit_view', 'GET', '/admin/paymentrecord/edit/?id={payment}', 'admin', {}),
+    ('paymentrecord.create_view', 'GET', '/admin/paymentrecord/new/', 'admin', {}),
+]
+
+
+def _case_id(case):
+    endpoint, method, url, _, _ = case
+    return f'{method} {url}'
+
+
+def _reset():
+    _db.session.remove()
+    _db.drop_all()
+    _db.create_all()
+
+
+@pytest.fixture(scope='module')
+def shops(app, tmp_path_factory):
+    """``{size: path}`` of the generated shops, plus the path of the live test database."""
+    from models import CashAdvance, Collaborator
+    from services import balances
+    from services.sales import create_sale, parse_cart
+
+    folder = tmp_path_factory.mktemp('shops')
+    paths = {}
+    with app.app_context():
+        live = _db.engine.url.database
+        for size in SIZES:
+            _reset()
+            synthetic.generate(sales=size, days=DAYS, out=lambda line: None)
+            # Whatever the weekday, every barber has an advance and more commission than advances
+            # to close in the open week
+            team = Collaborator.query.filter_by(is_owner=False).all()
+            for collab in team:
+                create_sale(collab, parse_cart([{'type': 'service', 'id': 9, 'quantity': 5}]))
+                _db.session.add(CashAdvance(collaborator_id=collab.id, amount=10.0, description='Vale',
+                                            date=date.today()))
+            balances.refresh_advances([c.id for c in team])
+            _db.session.commit()
+            _db.session.remove()
+            paths[size] = str(folder / f'{size}.db')
+            replica.snapshot(live, paths[size])
+        _reset()
+    return paths, live
+
+
+def _run(app, path, live, case):
+    from models import PaymentRecord, Sale
+
+    _, method, url, who, kwargs = case
+    with app.app_context():
+        _db.session.remove()
+        _db.engine.dispose()
+        replica.snapshot(path, live)
+        engine = _db.engine
+        barber = 2
+        ids = {
+            'barber': barber,
+            'payment': _db.session.query(_db.func.max(PaymentRecord.id)).filter_by(collaborator_id=barber).scalar(),
+            'payments': ','.join(str(pid) for (pid,) in _db.session.query(PaymentRecord.id)
+                                 .order_by(PaymentRecord.id.desc()).limit(3)),
+            'sale': _db.session.query(_db.func.max(Sale.id)).scalar(),
+        }
+        _db.session.remove()
+
+    client = app.test_client()
+    if who == 'collab':
+        with client.session_transaction() as sess:
+            sess['collab_id'] = barber
+    kwargs = dict(kwargs)
+    if 'csv' in kwargs:
+        kwargs['data'] = dict(kwargs['data'], file=(io.BytesIO(kwargs.pop('csv').encode()), 'dados.csv'))
+    with count_queries(engine) as statements:
+        response = client.open(url.format(**ids), method=method, **kwargs)
+        response.get_data()  # Streamed responses run their queries while being read
+    assert response.status_code < 400, f'{method} {url}: HTTP {response.status_code}'
+    return statements
+
+
+@pytest.mark.parametrize('case', CASES, ids=_case_id)
+def test_query_count_does_not_grow_with_history(app, shops, case):
+    paths, live = shops
+    small, large = (_run(app, paths[size], live, case) for size in SIZES)
+    if len(small) != len(large):
+        before, after = Counter(small), Counter(large)
+        changed = sorted(((after[s] - before[s], s) for s in set(before) | set(after) if after[s] != before[s]),
+                         key=lambda change: -abs(change[0]))
+        detail = '\n'.join(f'  {n:+d}x {" ".join(statement.split())[:200]}' for n, statement in changed[:5])
+        pytest.fail(f'{case[1]} {case[2]}: {len(small)} comandos SQL com {SIZES[0]} vendas, '
+                    f'{len(large)} com {SIZES[1]}\n{detail}')
+
+
+def test_every_route_is_covered(app):
+    covered = {case[0] for case in CASES}
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+    missing = {e for e in endpoints - covered - SKIPPED if not e.endswith(SKIPPED_ACTIONS)}
+    assert not missing, f'Rotas sem teste de quantidade de consultas: {sorted(missing)}'
@@ -0,0 +1,105 @@
+import pytest
+
+from conftest import count_queries, seed
+from models import PaymentRecord
+from services import receipts
+
+
+def _closed_payment(client, n_sales):
+    ids = seed(n_sales)
+    collab_id = ids['team'][0]
+    client.post(f'/admin/payments/confirm/{collab_id}')
+    return PaymentRecord.query.filter_by(collaborator_id=collab_id).one()
+
+
+def _receipt_queries(client, db, n_sales, url):
+    payment = _closed_payment(client, n_sales)
+    db.session.expire_all()
+    with count_queries(db.engine) as statements:
+        response = client.get(url.format(id=payment.id))
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', [
+    '/admin/payments/receipt/{id}',
+    '/admin/payments/collab_report/{id}?group=day',
+    '/admin/payments/receipt/{id}?group=service',
+    '/admin/payments/receipt/{id}?page=1',
+])
+def test_receipt_query_count_is_flat(client, db, url):
+    small = _receipt_queries(client, db, 8, url)
+    db.drop_all()
+    db.create_all()
+    large = _receipt_queries(client, db, 400, url)
+    assert large == small
+
+
+def test_grouped_lines_add_up(client, db):
+    payment = _closed_payment(client, 40)
+    detail, _ = receipts.lines(payment.id)
+    assert len(detail) == 10
+    for group in receipts.GROUPS:
+        grouped, _ = receipts.lines(payment.id, group)
+        assert sum(line.commission for line in grouped) == pytest.approx(payment.total_commission)
+        assert sum(line.gross for line in grouped) == pytest.approx(sum(line.gross for line in detail))
+    assert receipts.totals(payment.id)['sale_count'] == 10
+
+
+def test_receipt_pages(client, db, monkeypatch):
+    payment = _closed_payment(client, 40)
+    monkeypatch.setattr(receipts, 'PAGE_SIZE', 4)
+    first, page_count = receipts.lines(payment.id, page=1)
+    last, _ = receipts.lines(payment.id, page=3)
+    assert page_count == 3
+    assert len(first) == 4 and len(last) == 2
+
+
+def test_snapshot_is_frozen_and_revalidated(client, db):
+    from models import Collaborator, ReceiptSnapshot
+    payment = _closed_payment(client, 40)
+    assert ReceiptSnapshot.query.filter_by(payment_record_id=payment.id).count() == 1
+
+    url = f'/admin/payments/receipt/{payment.id}'
+    first = client.get(url)
+    assert first.headers['ETag'] and first.headers['Last-Modified']
+    name = payment.collaborator.name
+    assert name in first.get_data(as_text=True)
+
+    with count_queries(db.engine) as statements:
+        again = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert len(statements) <= 3
+
+    # Renaming the collaborator does not change a closed receipt
+    db.session.get(Collaborator, payment.collaborator_id).name = 'Outro Nome'
+    db.session.commit()
+    later = client.get(url)
+    assert later.get_data() == first.get_data()
+    collab_copy = client.get(f'/admin/payments/collab_report/{payment.id}')
+    assert collab_copy.headers['ETag'] != first.headers['ETag']
+
+
+def test_batch_export_streams_every_receipt(client, db):
+    from models import ReceiptSnapshot
+    seed(120)
+    response = client.post('/admin/payments/confirm-all')
+    assert 'Imprimir Todas' in response.get_data(as_text=True)
+    payments = PaymentRecord.query.all()
+    assert len(payments) == 3
+
+    # A payment closed before snapshots existed is frozen on export
+    ReceiptSnapshot.query.filter_by(payment_record_id=payments[0].id).delete()
+    db.session.commit()
+
+    response = client.get('/admin/payments/export?mode=collab')
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert html.count('receipt-container position-relative') == 3
+    assert html.count('<body>') == 1
+    assert ReceiptSnapshot.query.count() == 3
+
+    ids = f'{payments[1].id},{payments[2].id}'
+    html = client.get(f'/admin/payments/export?ids={ids}').get_data(as_text=True)
+    assert html.count('receipt-container position-relative') == 2
+    assert client.get('/admin/payments/export?mode=x').status_code == 400
@@ -0,0 +1,60 @@
+import pytest
+from flask import g
+from sqlalchemy import create_engine
+
+import replica
+from conftest import seed
+from extensions import db as _db
+from models import Expense
+
+
+@pytest.fixture
+def replica_count(app, db, tmp_path):
+    seed(3)
+    _db.session.add(Expense(description='Aluguel', amount=1000.0))
+    _db.session.commit()
+    before = Expense.query.count()
+    path = str(tmp_path / 'replica.db')
+    replica.snapshot(_db.engine.url.database, path)
+
+    engine = create_engine('sqlite:///' + path)
+    _db.engines[replica.BIND] = engine
+    yield before  # Expenses in the snapshot
+    del _db.engines[replica.BIND]
+    engine.dispose()
+
+
+def _add_expense_on_primary():
+    _db.session.add(Expense(description='Luz', amount=200.0))
+    _db.session.commit()
+
+
+def test_read_only_request_reads_the_replica(app, replica_count):
+    _add_expense_on_primary()  # Not in the snapshot yet
+    with app.test_request_context():
+        assert Expense.query.count() == replica_count + 1
+        g.db_read_only = True
+        assert Expense.query.count() == replica_count
+
+
+def test_reads_after_a_write_stay_on_primary(app, replica_count):
+    with app.test_request_context():
+        g.db_read_only = True
+        assert Expense.query.count() == replica_count
+        _add_expense_on_primary()
+        assert g.db_wrote
+        assert Expense.query.count() == replica_count + 1
+
+
+def test_read_only_view_uses_replica(app, replica_count):
+    _add_expense_on_primary()
+    client = app.test_client()
+    response = client.get('/admin/exports/expenses.csv')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'Aluguel' in body and 'Luz' not in body
+
+    # The browser that wrote reads from the primary for a while
+    with client.session_transaction() as sess:
+        sess['db_primary_until'] = 2 ** 40
+    assert 'Luz' in client.get('/admin/exports/expenses.csv').get_data(as_text=True)
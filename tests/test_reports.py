@@ -0,0 +1,53 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import seed
+from models import Sale
+from services import reports
+
+
+def _raw_buckets(days, bucket):
+    """Revenue per bucket straight from the sales, for the last ``days`` days."""
+    first_day = date.today() - timedelta(days=days - 1)
+    totals = defaultdict(float)
+    for sale in Sale.query.all():
+        if sale.date.date() >= first_day:
+            totals[reports._bucket_start(sale.date.date(), bucket)] += sale.total_amount
+    return totals
+
+
+@pytest.mark.parametrize('days,bucket', [(7, 'day'), (30, 'day'), (90, 'week'), (365, 'month')])
+def test_revenue_series_matches_the_raw_sales(db, days, bucket):
+    seed(200)  # one sale every 7 hours: about 58 days of history
+    series = reports.revenue_series(days, bucket)
+    expected = _raw_buckets(days, bucket)
+
+    starts = [start for start, _ in series]
+    assert starts == sorted(set(starts))
+    assert starts[-1] == reports._bucket_start(date.today(), bucket)
+    assert set(expected) <= set(starts)
+    for start, total in series:
+        assert total == pytest.approx(expected.get(start, 0.0))
+    if bucket == 'day':
+        assert len(series) == days
+
+
+def test_series_endpoint_labels_the_buckets(client, db):
+    seed(30)
+    data = client.get('/admin/dashboard/series?days=90&bucket=week').json
+    series = reports.revenue_series(90, 'week')
+    assert data['labels'] == [start.strftime('%d/%m') for start, _ in series]
+    assert data['values'] == pytest.approx([total for _, total in series])
+    assert sum(data['values']) == pytest.approx(sum(s.total_amount for s in Sale.query))
+
+    labels = client.get('/admin/dashboard/series?days=365&bucket=month').json['labels']
+    assert labels[-1] == date.today().strftime('%m/%Y')
+
+
+@pytest.mark.parametrize('query', ['days=abc', 'days=0', 'days=-7', 'days=731', 'days=7&bucket=year'])
+def test_series_endpoint_rejects_bad_parameters(client, db, query):
+    response = client.get(f'/admin/dashboard/series?{query}')
+    assert response.status_code == 400
+    assert 'error' in response.json
@@ -0,0 +1,84 @@
+from conftest import count_queries, seed
+from extensions import db as _db
+from models import Product, Sale, SaleItem, Service, Supplier
+
+
+def _login(client, collab_id):
+    with client.session_transaction() as sess:
+        sess['collab_id'] = collab_id
+
+
+def test_new_sale_merges_repeated_lines(client, db):
+    ids = seed(0)
+    _login(client, ids['team'][0])
+    product = Product.query.filter_by(name='Pomada').one()
+    stock = product.quantity
+
+    response = client.post('/sale/new', json={
+        'payment_method': 'Pix',
+        'items': [{'type': 'product', 'id': product.id}] * 3 + [
+            {'type': 'product', 'id': product.id, 'quantity': 2},
+            {'type': 'service', 'id': 1},
+        ],
+    })
+    assert response.json['success']
+
+    sale = Sale.query.one()
+    items = {item.item_name: item for item in SaleItem.query.filter_by(sale_id=sale.id)}
+    assert items['Pomada'].quantity == 5
+    assert items['Corte'].quantity == 1
+    assert sale.total_amount == 5 * 30.0 + 40.0
+    assert sale.total_commission == 5 * 3.0 + 40.0 * 0.5
+
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).quantity == stock - 5
+
+
+def test_new_sale_uses_fixed_product_commission(client, db):
+    ids = seed(0)
+    barber = ids['team'][0]
+    supplier = Supplier(name='TestSupplier')
+    db.session.add(supplier)
+    db.session.flush()
+    product = Product(name='FixedComb', price=50.0, cost_price=20.0, commission_fixed_value=5.0, quantity=10,
+                      supplier_id=supplier.id, collaborator_id=barber)
+    db.session.add(product)
+    db.session.commit()
+    _login(client, barber)
+
+    response = client.post('/sale/new', json={'client_name': 'Test Client', 'payment_method': 'Dinheiro',
+                                              'items': [{'type': 'product', 'id': product.id}]})
+    assert response.json['success']
+
+    sale = Sale.query.filter_by(collaborator_id=barber).order_by(Sale.id.desc()).first()
+    assert sale.total_commission == 5.0
+    assert SaleItem.query.filter_by(sale_id=sale.id).one().commission == 5.0
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).quantity == 9
+
+
+def test_new_sale_rejects_bad_quantity(client, db):
+    ids = seed(0)
+    _login(client, ids['team'][0])
+    response = client.post('/sale/new', json={'items': [{'type': 'service', 'id': 1, 'quantity': 0}]})
+    assert response.status_code == 400
+    assert Sale.query.count() == 0
+
+
+def test_new_sale_query_count_does_not_grow_with_cart(client, db):
+    ids = seed(0)
+    _db.session.add_all([Service(name=f'Serviço {i}', price=10.0 + i) for i in range(20)])
+    _db.session.commit()
+    service_ids = [s.id for s in Service.query]
+    _login(client, ids['team'][0])
+
+    def checkout(ids):
+        with count_queries(_db.engine) as statements:
+            response = client.post('/sale/new', json={
+                'items': [{'type': 'service', 'id': i} for i in ids] + [{'type': 'product', 'id': 1}],
+            })
+        assert response.json['success']
+        return len(statements)
+
+    checkout(service_ids[:1])  # creates today's summary row
+    assert checkout(service_ids[:1]) == checkout(service_ids)
@@ -0,0 +1,114 @@
+import threading
+
+from sqlalchemy import event
+
+from conftest import seed
+from extensions import db as _db
+from models import Product, Sale, StockMovement
+from services import stock
+
+
+def _client_for(app, collab_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['collab_id'] = collab_id
+    return client
+
+
+def test_concurrent_checkouts_never_oversell(app, db):
+    ids = seed(0)
+    product = Product.query.filter_by(name='Pomada').one()
+    product.quantity = 20
+    _db.session.commit()
+    stock.check(fix=False, opening=True)
+    product_id = product.id
+    team = ids['team']
+
+    threads, attempts = 8, 5
+    statuses = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(n):
+        client = _client_for(app, team[n % len(team)])
+        barrier.wait()
+        for _ in range(attempts):
+            response = client.post('/sale/new', json={'items': [{'type': 'product', 'id': product_id}]})
+            with lock:
+                statuses.append(response.status_code)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    assert statuses.count(200) == 20
+    assert statuses.count(409) == threads * attempts - 20
+
+    _db.session.expire_all()
+    assert _db.session.get(Product, product_id).quantity == 0
+    assert Sale.query.count() == 20
+    sold = _db.session.query(_db.func.sum(StockMovement.quantity))\
+        .filter_by(product_id=product_id, reason=stock.SALE).scalar()
+    assert sold == -20
+    assert stock.check() == []
+
+
+def test_out_of_stock_rolls_back_whole_sale(client, db):
+    ids = seed(0)
+    product = Product.query.filter_by(name='Pomada').one()
+    with client.session_transaction() as sess:
+        sess['collab_id'] = ids['team'][0]
+
+    response = client.post('/sale/new', json={'items': [
+        {'type': 'service', 'id': 1},
+        {'type': 'product', 'id': product.id, 'quantity': product.quantity + 1},
+    ]})
+    assert response.status_code == 409
+    assert Sale.query.count() == 0
+    _db.session.expire_all()
+    assert _db.session.get(Product, product.id).quantity == 100
+
+
+def test_deleted_sale_returns_stock(client, db):
+    ids = seed(0)
+    product = Product.query.filter_by(name='Pomada').one()
+    with client.session_transaction() as sess:
+        sess['collab_id'] = ids['team'][0]
+    client.post('/sale/new', json={'items': [{'type': 'product', 'id': product.id, 'quantity': 4}]})
+    sale = Sale.query.one()
+
+    from services import sales
+    sales.unregister(sale)
+    _db.session.delete(sale)
+    _db.session.commit()
+
+    _db.session.expire_all()
+    assert _db.session.get(Product, product.id).quantity == 100
+    assert stock.check() == []
+
+
+def test_take_locks_products_in_id_order(db):
+    seed(0)
+    first = Product.query.filter_by(name='Pomada').one()
+    second = Product(name='Cera', price=20.0, quantity=10)
+    _db.session.add(second)
+    _db.session.commit()
+
+    updates = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE product'):
+            updates.append(parameters)
+
+    event.listen(_db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        stock.take([(second, 1), (first, 2), (second, 2)])
+    finally:
+        event.remove(_db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    # One UPDATE per product, lowest id first, whatever the cart order
+    assert [params[1] for params in updates] == [first.id, second.id]
+    assert [params[0] for params in updates] == [2, 3]
+    assert StockMovement.query.filter_by(reason=stock.SALE).count() == 3
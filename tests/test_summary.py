@@ -0,0 +1,60 @@
+from conftest import seed
+from models import DailySummary, Sale
+from services import summary
+
+
+def _rollup():
+    return sorted((str(r.day), r.collaborator_id, r.payment_method, bool(r.is_owner),
+                   r.sale_count, round(r.total_amount, 2), round(r.total_commission, 2))
+                  for r in DailySummary.query.filter(DailySummary.sale_count != 0))
+
+
+def test_sales_keep_the_summary_in_step_with_a_rebuild(client, db):
+    ids = seed(12)
+    with client.session_transaction() as sess:
+        sess['collab_id'] = ids['team'][1]
+    for method in ('Pix', 'Pix', 'Dinheiro'):
+        response = client.post('/sale/new', json={'payment_method': method,
+                                                  'items': [{'type': 'service', 'id': 1, 'quantity': 2}]})
+        assert response.json['success']
+    response = client.post('/admin/vip/', data={'type': 'service', 'item_id': 2, 'price': '60',
+                                                'payment_method': 'Crédito', 'client_name': 'VIP'})
+    assert response.status_code == 302
+    for sale in Sale.query.order_by(Sale.id).limit(3).all() + [Sale.query.filter_by(payment_method='Dinheiro')
+                                                                 .order_by(Sale.id.desc()).first()]:
+        assert client.post(f'/admin/dashboard/delete_sale/{sale.id}').status_code == 302
+
+    db.session.expire_all()
+    incremental = _rollup()
+    team = [r for r in incremental if r[1] == ids['team'][1] and r[2] == 'Pix' and r[4] == 2]
+    assert team and team[0][5:] == (160.0, 80.0)
+    vip = [r for r in incremental if r[3] and r[2] == 'Crédito' and r[5] == 60.0]
+    assert vip and vip[0][6] == 0.0
+
+    summary.rebuild()
+    assert _rollup() == incremental
+    assert sum(r[4] for r in incremental) == Sale.query.count() == 12 + 4 - 4
+
+
+def test_owner_flag_change_moves_the_collaborators_rows(client, db):
+    ids = seed(0)
+    barber = ids['team'][0]
+    with client.session_transaction() as sess:
+        sess['collab_id'] = barber
+    response = client.post('/sale/new', json={'payment_method': 'Pix', 'items': [{'type': 'service', 'id': 2}]})
+    assert response.json['success']
+
+    # Admin marks the barber as owner: the past sale becomes VIP revenue
+    response = client.post(f'/admin/collaborator/edit/?id={barber}', data={
+        'name': 'Barbeiro 0', 'phone': '', 'password': '', 'commission_percent': '50', 'active': 'y',
+        'is_owner': 'y'})
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert [(r.is_owner, r.sale_count, r.total_amount) for r in DailySummary.query] == [(True, 1, 25.0)]
+
+    sale = Sale.query.one()
+    assert client.post(f'/admin/dashboard/delete_sale/{sale.id}').status_code == 302
+    db.session.expire_all()
+    assert [(r.is_owner, r.sale_count, r.total_amount) for r in DailySummary.query] == [(True, 0, 0.0)]
+    summary.rebuild()
+    assert DailySummary.query.count() == 0
@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -w 4 --threads 4 wsgi:app      (Linux)
+    waitress-serve --threads 8 wsgi:app     (Windows)
+
+or simply ``python serve.py``. Settings come from config.py /
+instance/config.py / environment variables, never from debug defaults.
+"""
+from app import create_app
+
+app = create_app()